@@ -0,0 +1,41 @@
+import logging
+from fastapi import APIRouter, HTTPException, Body, Query, status
+from starlette.concurrency import run_in_threadpool
+from app.api.v1.schemas.request import ResearchRequest
+from app.api.v1.schemas.job import ResearchJobResponse
+from app.core.jobs import job_manager, JobNotFoundError, JobStateError
+logger = logging.getLogger(__name__)
+router = APIRouter()
+@router.post("/", response_model=ResearchJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_research_job(
+    request: ResearchRequest = Body(...),
+    merge_results: bool = Query(True, description="Merge results from different sources into a single response")
+):
+    logger.info(f"Received research job request for query: '{request.query}' (Merge Results: {merge_results})")
+    try:
+        return await run_in_threadpool(job_manager.submit, request.query, merge_results=merge_results)
+    except RuntimeError as rte:
+        logger.error(f"Could not queue research job: {rte}")
+        raise HTTPException(status_code=503, detail=f"Job queue unavailable: {rte}")
+@router.get("/{job_id}", response_model=ResearchJobResponse)
+async def get_research_job(job_id: str):
+    try:
+        return await run_in_threadpool(job_manager.get, job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+@router.post("/{job_id}/cancel", response_model=ResearchJobResponse)
+async def cancel_research_job(job_id: str):
+    try:
+        return await run_in_threadpool(job_manager.cancel, job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+@router.post("/{job_id}/resume", response_model=ResearchJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def resume_research_job(job_id: str):
+    try:
+        return await run_in_threadpool(job_manager.resume, job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
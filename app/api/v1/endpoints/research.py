@@ -1,38 +1,84 @@
+import asyncio
+import json
 import logging
-from typing import Any, List, Dict, Union
-from fastapi import APIRouter, HTTPException, Body, Query
+from typing import Any, AsyncIterator, List, Dict, Literal, Optional, Union
+from fastapi import APIRouter, HTTPException, Body, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from starlette.concurrency import run_in_threadpool
 from pydantic import ValidationError
 from google.api_core import exceptions as google_exceptions
-from app.api.v1.schemas.request import ResearchRequest
-from app.core.llm import generate_dynamic_schema, SchemaGenerationError
-from app.core.dynamic_models import create_dynamic_model
-from app.core.scraper import run_search_graph
+from app.api.v1.schemas.request import ResearchRequest, BatchResearchRequest
+from app.core.llm import SchemaGenerationError
+from app.core.admission import admission_controller, AdmissionRejectedError
+from app.core.batch import BatchResearch
+from app.core.config import settings
+from app.core.research import run_research, run_research_profiled, research_flight, research_key
+from app.scrapegraph.utils import usage_scope
 logger = logging.getLogger(__name__)
 router = APIRouter()
 ResearchResponse = Union[Dict[str, Any], List[Dict[str, Any]]]
 @router.post("/", response_model=ResearchResponse)
 async def perform_research(
+    response: Response,
     request: ResearchRequest = Body(...),
-    merge_results: bool = Query(True, description="Merge results from different sources into a single response")
+    merge_results: bool = Query(True, description="Merge results from different sources into a single response"),
+    mode: Literal["full", "fast", "decompose"] = Query("full", description="'fast' answers from search snippets and only fetches pages for fields the snippets left empty; 'decompose' splits compound queries into concurrent sub-searches"),
+    x_research_profile: Optional[str] = Header(None, description="Set to 1 to profile this request (requires PROFILING_ENABLED); the report id is returned in the X-Research-Profile header")
 ):
     query = request.query
-    logger.info(f"Received research request for query: '{query}' (Merge Results: {merge_results})")
+    profile = settings.PROFILING_ENABLED and x_research_profile in ("1", "true")
+    logger.info(f"Received research request for query: '{query}' (Merge Results: {merge_results}, Mode: {mode})")
+    if mode == "decompose" and not merge_results:
+        raise HTTPException(status_code=400, detail="mode=decompose assembles one merged answer; it cannot be combined with merge_results=false.")
     try:
-        logger.info("Generating dynamic schema.")
-        schema_definition = generate_dynamic_schema(query=query)
-        logger.info(f"Using schema definition: {schema_definition.get('model_name', 'N/A')}")
-        logger.info("Creating dynamic Pydantic model.")
-        DynamicModel = create_dynamic_model(schema_definition)
-        logger.info("Executing internal SearchGraph with Gemini...")
-        result = await run_in_threadpool(
-             run_search_graph,
-             query=query,
-             dynamic_schema_model=DynamicModel,
-             merge_results=merge_results
-        )
-        logger.info("Research task completed successfully.")
+        max_results = settings.SCRAPER_MAX_RESULTS
+        # Joining the flight decides atomically whether this request leads the execution.
+        # Followers only await the leader's result on the event loop, holding no thread, so they
+        # are not admitted and cost nothing.
+        # Profiled requests always run their own execution.
+        # A decomposed query runs up to MAX_SUB_QUERIES searches, and is charged for all of them.
+        units = settings.MAX_SUB_QUERIES if mode == "decompose" else 1
+        key = research_key(query, merge_results, max_results, mode)
+        call, leader = (None, True) if profile else research_flight.join(key)
+        with usage_scope() as usage:
+            if not leader:
+                result, degraded_max_results = await research_flight.await_result(key, call)
+                logger.info(f"Served query '{query}' from an identical in-flight research execution.")
+            else:
+                try:
+                    async with admission_controller.admit(max_results, units=units) as admission:
+                        degraded_max_results = admission.max_results if admission.degraded else None
+                        if profile:
+                            result, report_id = await run_in_threadpool(
+                                 run_research_profiled,
+                                 query=query,
+                                 merge_results=merge_results,
+                                 max_results=admission.max_results,
+                                 mode=mode
+                            )
+                            response.headers["X-Research-Profile"] = report_id
+                        else:
+                            result = await run_in_threadpool(
+                                 run_research,
+                                 query=query,
+                                 merge_results=merge_results,
+                                 max_results=admission.max_results,
+                                 mode=mode
+                            )
+                except BaseException as e:
+                    if call is not None:
+                        research_flight.finish(key, call, error=e)
+                    raise
+                if call is not None:
+                    research_flight.finish(key, call, result=(result, degraded_max_results))
+            if degraded_max_results is not None:
+                response.headers["X-Research-Degraded"] = f"max_results={degraded_max_results}"
+        usage_summary = usage.summary()
+        response.headers["X-Research-Usage"] = "; ".join(f"{key}={usage_summary[key]}" for key in ("calls", "prompt_tokens", "completion_tokens", "cost_usd"))
+        logger.info(f"Research task completed successfully. LLM usage: {usage_summary}")
         return result
+    except AdmissionRejectedError as are:
+         raise HTTPException(status_code=503, detail=str(are), headers={"Retry-After": str(are.retry_after)})
     except SchemaGenerationError as sge:
          logger.error(f"Schema generation failed: {sge}")
          raise HTTPException(status_code=500, detail=f"Schema generation failed: {sge}")
@@ -66,3 +112,45 @@ async def perform_research(
     except Exception as e:
         logger.exception(f"An unexpected error occurred during the research process: {e}")
         raise HTTPException(status_code=500, detail="Internal server error: An unexpected error occurred.")
+@router.post("/batch", response_class=StreamingResponse)
+async def perform_batch_research(
+    request: BatchResearchRequest = Body(...),
+    merge_results: bool = Query(True, description="Merge results from different sources into a single response per query")
+):
+    """
+    Researches a list of related queries with shared search, fetch and parse work.
+    Results are streamed back as newline-delimited JSON, one line per query in completion order.
+    A batch shed by admission control streams a single error line with a `retry_after` hint.
+    """
+    logger.info(f"Received batch research request with {len(request.queries)} queries (Merge Results: {merge_results})")
+    max_results = settings.SCRAPER_MAX_RESULTS
+    async def stream_results() -> AsyncIterator[str]:
+        # Admission is held by the body itself, so a response that is never streamed holds no capacity.
+        # Each query runs its own pipeline, but at most BATCH_MAX_CONCURRENCY of them at once,
+        # so the batch is charged for that many concurrent pipelines rather than for every query.
+        try:
+            async with admission_controller.admit(max_results, units=min(len(request.queries), settings.BATCH_MAX_CONCURRENCY)) as admission:
+                if admission.degraded:
+                    logger.warning(f"Batch admitted in degraded mode with {admission.max_results} sources per query.")
+                batch = BatchResearch(request.queries, merge_results=merge_results, shared_schema=request.shared_schema, max_results=admission.max_results)
+                try:
+                    await run_in_threadpool(batch.prepare, settings.BATCH_MAX_CONCURRENCY)
+                except Exception as e:
+                    logger.exception(f"Batch preparation failed: {e}")
+                    yield json.dumps({"error": f"Batch preparation failed: {e}"}) + "\n"
+                    return
+                semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+                async def run_query(index: int) -> Dict[str, Any]:
+                    async with semaphore:
+                        return await run_in_threadpool(batch.run_query, index)
+                tasks = [asyncio.ensure_future(run_query(index)) for index in range(len(request.queries))]
+                try:
+                    for completed in asyncio.as_completed(tasks):
+                        yield json.dumps(await completed, default=str) + "\n"
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                logger.info("Batch research task completed.")
+        except AdmissionRejectedError as are:
+            yield json.dumps({"error": str(are), "retry_after": are.retry_after}) + "\n"
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,18 @@
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+
+class ResearchJobResponse(BaseModel):
+    """
+    Pydantic model describing the status, per-node progress and (once finished)
+    the result of an asynchronous research job.
+    """
+    id: str = Field(..., description="Unique identifier of the research job.")
+    query: str = Field(..., description="The natural language query of the research job.")
+    merge_results: bool = Field(..., description="Whether results from different sources are merged.")
+    status: str = Field(..., description="One of 'queued', 'running', 'succeeded', 'failed' or 'cancelled'.")
+    current_node: Optional[str] = Field(None, description="The graph node currently being executed.")
+    progress: List[Dict[str, Any]] = Field(default_factory=list, description="Execution info of every completed graph node.")
+    result: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = Field(None, description="The research result once the job succeeded.")
+    error: Optional[str] = Field(None, description="The error message if the job failed.")
+    created_at: float = Field(..., description="Creation time as a UNIX timestamp.")
+    updated_at: float = Field(..., description="Last update time as a UNIX timestamp.")
@@ -1,3 +1,4 @@
+from typing import Annotated, List
 from pydantic import BaseModel, Field
 
 class ResearchRequest(BaseModel):
@@ -11,3 +12,19 @@ class ResearchRequest(BaseModel):
         max_length=1000,
         description="The natural language query for the research task."
     )
+
+class BatchResearchRequest(BaseModel):
+    """
+    Pydantic model defining the expected structure of the request body
+    for the batch research endpoint.
+    """
+    queries: List[Annotated[str, Field(min_length=3, max_length=1000)]] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="The natural language queries of the batch, e.g. the same question about several companies."
+    )
+    shared_schema: bool = Field(
+        False,
+        description="Generate a single schema from the first query and use it for every query in the batch."
+    )
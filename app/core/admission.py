@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class Admission:
+    cost: int
+    max_results: int
+    degraded: bool = False
+    queued_for: float = 0.0
+
+
+class AdmissionController:
+    """
+    Admission control in front of the research pipeline. Every request is charged a
+    cost (one unit for the schema, search and merge LLM work plus one unit per
+    browser slot it can occupy) against a global budget. Requests that do not fit
+    wait in a bounded queue; when the queue is full they are shed immediately with
+    a Retry-After hint. In degraded mode a saturated system answers with fewer
+    sources instead of queueing.
+    """
+
+    def __init__(
+        self,
+        max_cost: int,
+        max_queue: int,
+        queue_timeout: float,
+        batchsize: int,
+        degraded_mode: bool = False,
+        degraded_max_results: int = 2,
+    ):
+        self.max_cost = max(1, max_cost)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.batchsize = max(1, batchsize)
+        self.degraded_mode = degraded_mode
+        self.degraded_max_results = max(1, degraded_max_results)
+        self.in_use = 0
+        self.active = 0
+        self.waiting = 0
+        self.avg_duration = 30.0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def estimate_cost(self, max_results: int, units: int = 1) -> int:
+        browser_slots = min(max(max_results, 0), self.batchsize)
+        return min(max(1, units) * (1 + browser_slots), self.max_cost)
+
+    def _fits(self, cost: int) -> bool:
+        return self.in_use + cost <= self.max_cost
+
+    def retry_after(self) -> int:
+        slots = max(1, self.active)
+        return max(1, math.ceil(self.avg_duration * (self.waiting + 1) / slots))
+
+    def _acquire(self, admission: Admission) -> Admission:
+        self.in_use += admission.cost
+        self.active += 1
+        return admission
+
+    async def _release(self, admission: Admission, started: float) -> None:
+        duration = time.monotonic() - started
+        self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+        async with self._condition:
+            self.in_use -= admission.cost
+            self.active -= 1
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def admit(self, max_results: int, cost: Optional[int] = None, units: int = 1) -> AsyncIterator[Admission]:
+        """
+        Admits a request running `units` research pipelines (e.g. the queries of a batch),
+        each charged for `max_results` sources, unless an explicit `cost` is given.
+        """
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        cost = self.estimate_cost(max_results, units) if cost is None else cost
+        requested = time.monotonic()
+        async with self._condition:
+            if self._fits(cost) and not self.waiting:
+                admission = self._acquire(Admission(cost=cost, max_results=max_results))
+            elif self.degraded_mode and max_results > self.degraded_max_results and self._fits(self.estimate_cost(self.degraded_max_results, units)):
+                logger.warning(f"System saturated ({self.in_use}/{self.max_cost} cost units). Admitting request in degraded mode with {self.degraded_max_results} sources.")
+                admission = self._acquire(Admission(
+                    cost=self.estimate_cost(self.degraded_max_results, units),
+                    max_results=self.degraded_max_results,
+                    degraded=True,
+                ))
+            elif self.waiting >= self.max_queue:
+                retry_after = self.retry_after()
+                logger.warning(f"Admission queue full ({self.waiting}/{self.max_queue}). Shedding request, retry after {retry_after}s.")
+                raise AdmissionRejectedError("Research service is saturated, the wait queue is full.", retry_after)
+            else:
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(self._condition.wait_for(lambda: self._fits(cost)), timeout=self.queue_timeout)
+                except asyncio.TimeoutError:
+                    retry_after = self.retry_after()
+                    logger.warning(f"Request waited {self.queue_timeout}s without being admitted. Shedding request, retry after {retry_after}s.")
+                    raise AdmissionRejectedError("Research service is saturated, timed out waiting for capacity.", retry_after)
+                finally:
+                    self.waiting -= 1
+                admission = self._acquire(Admission(cost=cost, max_results=max_results))
+            admission.queued_for = time.monotonic() - requested
+        started = time.monotonic()
+        try:
+            yield admission
+        finally:
+            await self._release(admission, started)
+
+
+admission_controller = AdmissionController(
+    max_cost=settings.ADMISSION_MAX_COST,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    batchsize=settings.SCRAPEGRAPH_BATCHSIZE,
+    degraded_mode=settings.ADMISSION_DEGRADED_MODE,
+    degraded_max_results=settings.ADMISSION_DEGRADED_MAX_RESULTS,
+)
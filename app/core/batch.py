@@ -0,0 +1,116 @@
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from app.core.dynamic_models import create_dynamic_model
+from app.core.llm import generate_dynamic_schema
+from app.core.scraper import load_documents, run_search_graph, search_urls
+from app.scrapegraph.utils import DocumentStore, normalize_query, usage_scope
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResearch:
+    """
+    Runs a set of related research queries with shared work:
+    schemas are generated once per distinct (normalized) query and models once per
+    distinct schema structure, the union of all search results is fetched and parsed
+    once into a shared document store, and extraction then runs per query over it.
+    """
+
+    def __init__(self, queries: List[str], merge_results: bool = True, shared_schema: bool = False, max_results: Optional[int] = None):
+        self.queries = queries
+        self.merge_results = merge_results
+        self.shared_schema = shared_schema
+        self.max_results = max_results
+        self.document_store = DocumentStore()
+        self.models: Dict[int, Type[BaseModel]] = {}
+        self.urls: Dict[int, List[str]] = {}
+        self.errors: Dict[int, str] = {}
+
+    def _distinct_queries(self) -> Dict[str, List[int]]:
+        groups: Dict[str, List[int]] = {}
+        for index, query in enumerate(self.queries):
+            groups.setdefault(normalize_query(query), []).append(index)
+        return groups
+
+    def _generate_schemas(self, groups: Dict[str, List[int]], max_workers: int) -> None:
+        representatives = {key: self.queries[indices[0]] for key, indices in groups.items()}
+        if self.shared_schema:
+            first_query = self.queries[0]
+            logger.info(f"Generating one shared schema for {len(self.queries)} queries from: '{first_query}'")
+            schema_definition = generate_dynamic_schema(query=first_query)
+            schemas = {key: schema_definition for key in representatives}
+        else:
+            logger.info(f"Generating schemas for {len(representatives)} distinct queries out of {len(self.queries)}.")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, generate_dynamic_schema, query) for query in representatives.values()]
+                schemas = dict(zip(representatives.keys(), (future.result() for future in futures)))
+        models_by_structure: Dict[str, Type[BaseModel]] = {}
+        for key, schema_definition in schemas.items():
+            fingerprint = json.dumps(schema_definition, sort_keys=True)
+            if fingerprint not in models_by_structure:
+                models_by_structure[fingerprint] = create_dynamic_model(schema_definition)
+            for index in groups[key]:
+                self.models[index] = models_by_structure[fingerprint]
+        logger.info(f"Created {len(models_by_structure)} dynamic model(s) for {len(self.queries)} queries.")
+
+    def _search(self, groups: Dict[str, List[int]], max_workers: int) -> None:
+        def _search_group(indices: List[int]) -> None:
+            query = self.queries[indices[0]]
+            try:
+                urls = search_urls(query, self.models[indices[0]], max_results=self.max_results)
+            except Exception as e:
+                logger.error(f"Search failed for batch query '{query}': {e}")
+                for index in indices:
+                    self.errors[index] = f"Search failed: {e}"
+                return
+            for index in indices:
+                self.urls[index] = urls
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, _search_group, indices) for indices in groups.values()]
+            for future in futures:
+                future.result()
+
+    def prepare(self, max_workers: int = 4) -> None:
+        """Generates the schemas, runs the searches and loads the shared document store."""
+        groups = self._distinct_queries()
+        with usage_scope() as usage:
+            self._generate_schemas(groups, max_workers)
+            self._search(groups, max_workers)
+        logger.info(f"Shared batch preparation LLM usage: {usage.totals()}")
+        url_union: List[str] = []
+        seen = set()
+        for index in sorted(self.urls):
+            for url in self.urls[index]:
+                if url not in seen:
+                    seen.add(url)
+                    url_union.append(url)
+        total_urls = sum(len(urls) for urls in self.urls.values())
+        logger.info(f"Fetching {len(url_union)} distinct pages for {total_urls} search results across {len(self.queries)} queries.")
+        load_documents(url_union, self.document_store)
+
+    def run_query(self, index: int) -> Dict[str, Any]:
+        """Runs the per-query extraction over the shared document store."""
+        query = self.queries[index]
+        if index in self.errors:
+            return {"index": index, "query": query, "error": self.errors[index]}
+        with usage_scope() as usage:
+            try:
+                result = run_search_graph(
+                    query=query,
+                    dynamic_schema_model=self.models[index],
+                    merge_results=self.merge_results,
+                    max_results=self.max_results,
+                    resume_state={"urls": self.urls.get(index, [])},
+                    resume_from="GraphIterator",
+                    document_store=self.document_store,
+                )
+                return {"index": index, "query": query, "result": result, "usage": usage.summary()}
+            except Exception as e:
+                logger.error(f"Batch query '{query}' failed: {e}")
+                return {"index": index, "query": query, "error": str(e), "usage": usage.summary()}
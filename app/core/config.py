@@ -1,4 +1,5 @@
 import logging
+from typing import Any, Dict, List
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -14,12 +15,95 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str = Field(default=..., env="GEMINI_API_KEY")
     SCHEMA_GENERATION_MODEL: str = "gemini-2.5-flash"
     SCRAPEGRAPH_EXTRACTION_MODEL: str = "gemini-2.5-flash"
+    LLM_PROVIDER: str = "google_genai"
+    LLM_PROVIDER_OPTIONS: Dict[str, Any] = {}
 
     SCRAPER_MAX_RESULTS: int = 5
     SCRAPER_HEADLESS: bool = True
     SCRAPEGRAPH_MAX_TOKENS: int = 8192
     SCRAPEGRAPH_BATCHSIZE: int = 16
 
+    JOBS_DB_PATH: str = "research_jobs.db"
+    JOBS_MAX_WORKERS: int = 2
+    JOBS_SHUTDOWN_TIMEOUT: float = 30.0
+
+    ADMISSION_MAX_COST: int = 32
+    ADMISSION_MAX_QUEUE: int = 16
+    ADMISSION_QUEUE_TIMEOUT: float = 30.0
+    ADMISSION_DEGRADED_MODE: bool = False
+    ADMISSION_DEGRADED_MAX_RESULTS: int = 2
+
+    BATCH_MAX_CONCURRENCY: int = 4
+
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_PATH: str = "search_cache.db"
+    SEARCH_CACHE_QUERY_TTL: int = 86400
+    SEARCH_CACHE_RESULTS_TTL: int = 3600
+    SEARCH_CACHE_MAX_ENTRIES: int = 10000
+
+    SEARCH_ENGINES: str = "duckduckgo"
+    SEARCH_ENGINE_TIMEOUT: float = 10.0
+    SEARXNG_URL: str = ""
+    LOCAL_SEARCH_CORPUS_PATH: str = ""
+
+    DOMAIN_QUALITY_ENABLED: bool = True
+    DOMAIN_QUALITY_PATH: str = "domain_quality.db"
+    DOMAIN_QUALITY_MIN_SAMPLES: int = 5
+    DOMAIN_QUALITY_MAX_FAILURE_RATE: float = 0.8
+    DOMAIN_QUALITY_HALF_LIFE: float = 604800.0
+
+    ADAPTIVE_FANOUT_ENABLED: bool = False
+    ADAPTIVE_FANOUT_INITIAL_WAVE: int = 2
+    ADAPTIVE_FANOUT_COVERAGE_THRESHOLD: float = 1.0
+
+    MAX_SUB_QUERIES: int = 4
+
+    LLM_MAX_IN_FLIGHT_PER_MODEL: int = 32
+    LLM_PRICING: Dict[str, List[float]] = {}
+
+    METRICS_ENABLED: bool = False
+
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_INTERVAL: float = 0.005
+    PROFILING_TOP_N: int = 25
+    PROFILING_TRACE_ALLOCATIONS: bool = True
+    PROFILING_REPORT_DIR: str = "profiles"
+
+    CASSETTE_MODE: str = ""
+    CASSETTE_PATH: str = "cassette.json.gz"
+    CASSETTE_REPLAY_LATENCY: bool = False
+    CASSETTE_MAX_MB: int = 1024
+
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "file"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = ""
+
+    MODEL_ROUTING_ENABLED: bool = False
+    SCRAPEGRAPH_LITE_MODEL: str = "gemini-2.5-flash-lite"
+    SCRAPEGRAPH_MERGE_MODEL: str = ""
+    MODEL_ROUTING_LITE_MAX_INPUT_TOKENS: int = 32000
+
+    STRUCTURED_OUTPUT_ENABLED: bool = True
+    PROMPT_COMPACTION_ENABLED: bool = True
+
+    FIELD_REPAIR_ENABLED: bool = False
+    FIELD_REPAIR_MAX_TOKENS: int = 2000
+
+    DOCUMENT_PACKING_ENABLED: bool = False
+    DOCUMENT_PACKING_MAX_TOKENS: int = 12000
+
+    ADAPTIVE_CHUNKING_ENABLED: bool = False
+    ADAPTIVE_CHUNKING_MAX_CHUNKS: int = 8
+    ADAPTIVE_CHUNKING_MIN_CHUNK_TOKENS: int = 4000
+
+    SCHEMA_CLASSIFIER_ENABLED: bool = True
+    SCHEMA_CLASSIFIER_MODEL_PATH: str = ""
+    SCHEMA_CACHE_ENABLED: bool = True
+    SCHEMA_CACHE_PATH: str = "schema_cache.db"
+    SCHEMA_CACHE_TTL: int = 604800
+    SCHEMA_CACHE_MAX_ENTRIES: int = 10000
+
     model_config = SettingsConfigDict(env_file=".env", extra='ignore')
 
 settings = Settings()
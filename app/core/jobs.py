@@ -0,0 +1,313 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.dynamic_models import create_dynamic_model
+from app.core.llm import generate_dynamic_schema
+from app.core.scraper import run_search_graph
+from app.scrapegraph.graphs import GraphInterruptedError
+from app.scrapegraph.utils import start_span, usage_scope
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+TERMINAL_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class JobNotFoundError(Exception):
+    pass
+
+
+class JobStateError(Exception):
+    pass
+
+
+class JobCancelledError(GraphInterruptedError):
+    pass
+
+
+class JobInterruptedError(GraphInterruptedError):
+    pass
+
+
+_JSON_COLUMNS = ("schema_definition", "progress", "checkpoint", "result")
+
+
+class JobStore:
+    """
+    SQLite-backed persistence for research jobs so queued, running and failed jobs
+    survive a restart of the service.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS research_jobs (
+                    id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    merge_results INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    current_node TEXT,
+                    schema_definition TEXT,
+                    progress TEXT,
+                    checkpoint TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] else None
+        job["merge_results"] = bool(job["merge_results"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        job["progress"] = job["progress"] or []
+        return job
+
+    def create(self, query: str, merge_results: bool) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO research_jobs (id, query, merge_results, status, progress, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, query, int(merge_results), JobStatus.QUEUED.value, "[]", now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM research_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"Job '{job_id}' not found.")
+        return self._row_to_job(row)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if not fields:
+            return
+        values = []
+        for column, value in fields.items():
+            if column in _JSON_COLUMNS and value is not None:
+                value = json.dumps(value, default=str)
+            elif isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, bool):
+                value = int(value)
+            values.append(value)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE research_jobs SET {assignments}, updated_at = ? WHERE id = ?",
+                (*values, time.time(), job_id),
+            )
+
+    def list_ids_by_status(self, statuses: List[JobStatus]) -> List[str]:
+        placeholders = ", ".join("?" for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM research_jobs WHERE status IN ({placeholders}) ORDER BY created_at",
+                [status.value for status in statuses],
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    Runs research jobs on a bounded local worker pool. Progress and a checkpoint of
+    the graph state are persisted after every completed node, so a failed or
+    interrupted job can be resumed from the last completed node.
+    """
+
+    def __init__(self, db_path: str, max_workers: int):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.store: Optional[JobStore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._futures_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        self._stopping.clear()
+        self.store = JobStore(self.db_path)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="research-job")
+        logger.info(f"Job worker pool started with {self.max_workers} workers (store: {self.db_path}).")
+        for job_id in self.store.list_ids_by_status([JobStatus.RUNNING, JobStatus.QUEUED]):
+            logger.info(f"Re-queuing job '{job_id}' left unfinished by a previous run.")
+            self.store.update(job_id, status=JobStatus.QUEUED)
+            self._schedule(job_id)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the worker pool. Queued jobs stay queued, running jobs stop at their next node
+        boundary and are re-queued from their checkpoint; both are picked up by the next start.
+        Jobs still running after `timeout` seconds (JOBS_SHUTDOWN_TIMEOUT by default) are
+        marked failed, so they can be resumed, before the store is closed.
+        """
+        if self._executor is None:
+            return
+        timeout = settings.JOBS_SHUTDOWN_TIMEOUT if timeout is None else timeout
+        self._stopping.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._futures_lock:
+            futures = dict(self._futures)
+        _, not_done = wait(futures.values(), timeout=timeout)
+        for job_id, future in futures.items():
+            if future in not_done:
+                logger.warning(f"Research job '{job_id}' still running after {timeout}s; marking it failed.")
+                self.store.update(
+                    job_id,
+                    status=JobStatus.FAILED,
+                    error="Interrupted by a service shutdown; resume the job to continue from its last checkpoint.",
+                )
+        self._executor = None
+        self.store.close()
+        self.store = None
+        logger.info("Job worker pool stopped.")
+
+    def _require_started(self) -> JobStore:
+        if self.store is None:
+            raise RuntimeError("Job manager is not running.")
+        return self.store
+
+    def _schedule(self, job_id: str) -> None:
+        future = self._executor.submit(self._run, job_id)
+        with self._futures_lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id: str) -> None:
+        with self._futures_lock:
+            self._futures.pop(job_id, None)
+
+    def submit(self, query: str, merge_results: bool = True) -> Dict[str, Any]:
+        store = self._require_started()
+        job = store.create(query, merge_results)
+        logger.info(f"Queued research job '{job['id']}' for query: '{query}'")
+        self._schedule(job["id"])
+        return job
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        return self._require_started().get(job_id)
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        store = self._require_started()
+        job = store.get(job_id)
+        if JobStatus(job["status"]) in TERMINAL_STATUSES:
+            raise JobStateError(f"Job '{job_id}' is already {job['status']}.")
+        store.update(job_id, cancel_requested=True)
+        with self._futures_lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            store.update(job_id, status=JobStatus.CANCELLED)
+        logger.info(f"Cancellation requested for job '{job_id}'.")
+        return store.get(job_id)
+
+    def resume(self, job_id: str) -> Dict[str, Any]:
+        store = self._require_started()
+        job = store.get(job_id)
+        if JobStatus(job["status"]) not in (JobStatus.FAILED, JobStatus.CANCELLED):
+            raise JobStateError(f"Only failed or cancelled jobs can be resumed, job '{job_id}' is {job['status']}.")
+        store.update(job_id, status=JobStatus.QUEUED, error=None, cancel_requested=False)
+        resume_from = (job["checkpoint"] or {}).get("next_node")
+        logger.info(f"Resuming job '{job_id}' from node '{resume_from or 'start'}'.")
+        self._schedule(job_id)
+        return store.get(job_id)
+
+    def _run(self, job_id: str) -> None:
+        # Worker threads don't inherit the submitting request's context, so each job run is its own trace.
+        with start_span("research job", {"job.id": job_id}), usage_scope() as usage:
+            try:
+                self._run_job(job_id)
+            except sqlite3.ProgrammingError as e:
+                # The store was closed by a shutdown that stopped waiting for this job and marked it failed.
+                logger.warning(f"Research job '{job_id}' outlived the job store: {e}")
+                return
+        logger.info(f"Research job '{job_id}' LLM usage: {usage.summary()}")
+
+    def _run_job(self, job_id: str) -> None:
+        store = self.store
+        if self._stopping.is_set():
+            return
+        job = store.get(job_id)
+        if job["cancel_requested"]:
+            store.update(job_id, status=JobStatus.CANCELLED)
+            return
+        store.update(job_id, status=JobStatus.RUNNING)
+        progress = job["progress"]
+        checkpoint = job["checkpoint"] or {}
+
+        def on_node_complete(node_name: str, node_info: dict, state: dict, next_node: Optional[str]) -> None:
+            progress.append(node_info)
+            store.update(
+                job_id,
+                progress=progress,
+                current_node=next_node,
+                checkpoint={"next_node": next_node, "state": state},
+            )
+            if store.get(job_id)["cancel_requested"]:
+                raise JobCancelledError(f"Job '{job_id}' was cancelled after node '{node_name}'.")
+            if self._stopping.is_set():
+                raise JobInterruptedError(f"Job '{job_id}' was interrupted by a shutdown after node '{node_name}'.")
+
+        try:
+            schema_definition = job["schema_definition"]
+            if schema_definition is None:
+                store.update(job_id, current_node="SchemaGeneration")
+                schema_definition = generate_dynamic_schema(query=job["query"])
+                store.update(job_id, schema_definition=schema_definition)
+            DynamicModel = create_dynamic_model(schema_definition)
+            result = run_search_graph(
+                query=job["query"],
+                dynamic_schema_model=DynamicModel,
+                merge_results=job["merge_results"],
+                resume_state=checkpoint.get("state"),
+                resume_from=checkpoint.get("next_node"),
+                on_node_complete=on_node_complete,
+            )
+            store.update(job_id, status=JobStatus.SUCCEEDED, result=result, current_node=None)
+            logger.info(f"Research job '{job_id}' completed successfully.")
+        except JobInterruptedError:
+            store.update(job_id, status=JobStatus.QUEUED)
+            logger.info(f"Research job '{job_id}' interrupted by shutdown; it resumes from node '{store.get(job_id)['current_node']}' on the next start.")
+        except Exception as e:
+            if store.get(job_id)["cancel_requested"]:
+                store.update(job_id, status=JobStatus.CANCELLED)
+                logger.info(f"Research job '{job_id}' cancelled.")
+            else:
+                logger.exception(f"Research job '{job_id}' failed: {e}")
+                store.update(job_id, status=JobStatus.FAILED, error=str(e))
+
+
+job_manager = JobManager(settings.JOBS_DB_PATH, settings.JOBS_MAX_WORKERS)
@@ -1,4 +1,5 @@
 import logging
+import time
 from typing import Dict, Any, List, Optional
 
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -8,6 +9,10 @@ from langchain_core.exceptions import OutputParserException
 from google.api_core import exceptions as google_exceptions
 
 from app.core.config import settings
+from app.core.schema_classifier import SchemaNeed, schema_classifier
+from app.scrapegraph.models import FakeChatModel, with_cassette
+from app.scrapegraph.utils import PersistentCache, get_persistent_cache, normalize_query, usage_scope
+from app.scrapegraph.utils.usage_ledger import record_llm_call
 
 logger = logging.getLogger(__name__)
 
@@ -45,13 +50,56 @@ DEFAULT_SCHEMA_DEFINITION = {
         {"name": "sources", "type": "array", "items": "string", "description": "List of source URLs from which the information was primarily derived."}
     ]
 }
+# Same structure as the default schema, returned when generation failed and therefore never cached.
+DEFAULT_SCHEMA_FALLBACK = dict(DEFAULT_SCHEMA_DEFINITION)
+
+
+def _get_schema_cache() -> Optional[PersistentCache]:
+    if not settings.SCHEMA_CACHE_ENABLED:
+        return None
+    try:
+        return get_persistent_cache(settings.SCHEMA_CACHE_PATH, "schema", settings.SCHEMA_CACHE_TTL, settings.SCHEMA_CACHE_MAX_ENTRIES)
+    except Exception as e:
+        logger.warning(f"Schema cache unavailable, continuing without it: {e}")
+        return None
 
 
 def generate_dynamic_schema(query: str) -> Dict[str, Any]:
+    """
+    Returns the schema definition for a query. Generated schemas are cached by
+    normalized query, and queries the local classifier recognizes as general
+    questions get the default schema without an LLM call. Everything else goes to
+    the schema generation LLM.
+    (This function runs synchronously).
+    """
+    cache = _get_schema_cache()
+    cache_key = normalize_query(query)
+    if cache is not None:
+        cached_schema = cache.get(cache_key)
+        if cached_schema is not None:
+            schema_classifier.record_skipped_call(cached=True)
+            with usage_scope(node="SchemaGeneration"):
+                record_llm_call(settings.SCHEMA_GENERATION_MODEL, None, 0.0, cached=True)
+            logger.info(f"Using cached schema definition: {cached_schema.get('model_name', 'N/A')}")
+            return cached_schema
+    if settings.SCHEMA_CLASSIFIER_ENABLED and schema_classifier.classify(query) == SchemaNeed.GENERAL:
+        schema_classifier.record_skipped_call()
+        logger.info("Classifier found no requested structure. Using the default schema without calling the LLM.")
+        return DEFAULT_SCHEMA_DEFINITION
+    start_time = time.perf_counter()
+    with usage_scope(node="SchemaGeneration"):
+        schema_definition = _generate_schema_with_llm(query)
+    schema_classifier.record_llm_call(time.perf_counter() - start_time)
+    logger.info(f"Schema classifier stats: {schema_classifier.stats()}")
+    if cache is not None and schema_definition is not DEFAULT_SCHEMA_FALLBACK:
+        cache.set(cache_key, schema_definition)
+    return schema_definition
+
+
+def _generate_schema_with_llm(query: str) -> Dict[str, Any]:
     """
     Uses Langchain's ChatGoogleGenerativeAI with structured output to generate a schema definition.
     Falls back to a default schema if the query doesn't imply a structure or if generation fails.
-    (This function runs synchronously).
     """
 
     system_prompt = f"""
@@ -65,13 +113,18 @@ def generate_dynamic_schema(query: str) -> Dict[str, Any]:
     """
 
     try:
-        llm = ChatGoogleGenerativeAI(
-            model=settings.SCHEMA_GENERATION_MODEL,
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0.0
-        )
+        if settings.LLM_PROVIDER == "fake":
+            llm = FakeChatModel(model=settings.SCHEMA_GENERATION_MODEL, **settings.LLM_PROVIDER_OPTIONS)
+        else:
+            llm = ChatGoogleGenerativeAI(
+                model=settings.SCHEMA_GENERATION_MODEL,
+                google_api_key=settings.GEMINI_API_KEY,
+                temperature=0.0
+            )
+        # Records or replays the schema answers when a cassette is active.
+        llm = with_cassette(llm)
 
-        structured_llm = llm.with_structured_output(GeneratedSchema)
+        structured_llm = llm.with_structured_output(GeneratedSchema, include_raw=True)
 
         logger.info(f"Requesting schema generation.")
 
@@ -80,7 +133,16 @@ def generate_dynamic_schema(query: str) -> Dict[str, Any]:
             HumanMessage(content=f"<query>{query}</query>")
         ]
 
-        response_schema: GeneratedSchema = structured_llm.invoke(messages)
+        start_time = time.time()
+        try:
+            response = structured_llm.invoke(messages)
+        except Exception:
+            record_llm_call(settings.SCHEMA_GENERATION_MODEL, None, time.time() - start_time, error=True)
+            raise
+        record_llm_call(settings.SCHEMA_GENERATION_MODEL, response["raw"], time.time() - start_time)
+        if response["parsing_error"] is not None:
+            raise OutputParserException(str(response["parsing_error"]))
+        response_schema: Optional[GeneratedSchema] = response["parsed"]
 
         sources_field_definition = {
             "name": "sources",
@@ -105,7 +167,7 @@ def generate_dynamic_schema(query: str) -> Dict[str, Any]:
 
     except OutputParserException as ope:
         logger.warning(f"Langchain failed to parse LLM output into schema. Error: {ope}. Falling back to default schema.")
-        return DEFAULT_SCHEMA_DEFINITION
+        return DEFAULT_SCHEMA_FALLBACK
     except (google_exceptions.PermissionDenied, google_exceptions.ResourceExhausted, google_exceptions.InvalidArgument) as google_error:
          logger.error(f"Google API error during schema generation: {google_error}")
          raise google_error
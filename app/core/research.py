@@ -0,0 +1,63 @@
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+from app.core.config import settings
+from app.core.dynamic_models import create_dynamic_model
+from app.core.llm import generate_dynamic_schema
+from app.core.scraper import run_search_graph
+from app.scrapegraph.utils import SingleFlight, normalize_query, profile_execution
+logger = logging.getLogger(__name__)
+research_flight = SingleFlight("research")
+def research_key(query: str, merge_results: bool = True, max_results: Optional[int] = None, mode: str = "full") -> Hashable:
+    """
+    Identity of a research request in `research_flight`: identical concurrent requests share
+    one execution. `max_results` is the requested value; the leader may run degraded.
+    """
+    return (normalize_query(query), merge_results, max_results, mode)
+def run_research(
+    query: str,
+    merge_results: bool = True,
+    max_results: Optional[int] = None,
+    mode: str = "full",
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Runs the research pipeline synchronously: schema generation, dynamic model
+    creation and the internal SearchGraph (or FastSearchGraph in "fast" mode).
+    """
+    logger.info("Generating dynamic schema.")
+    schema_definition = generate_dynamic_schema(query=query)
+    logger.info(f"Using schema definition: {schema_definition.get('model_name', 'N/A')}")
+    logger.info("Creating dynamic Pydantic model.")
+    DynamicModel = create_dynamic_model(schema_definition)
+    logger.info("Executing internal SearchGraph with Gemini...")
+    return run_search_graph(
+        query=query,
+        dynamic_schema_model=DynamicModel,
+        merge_results=merge_results,
+        max_results=max_results,
+        mode=mode
+    )
+def run_research_profiled(
+    query: str,
+    merge_results: bool = True,
+    max_results: Optional[int] = None,
+    mode: str = "full",
+) -> Tuple[Union[Dict[str, Any], List[Dict[str, Any]]], str]:
+    """
+    Runs `run_research` (never attached to an in-flight execution) under the profiler and
+    stores the report, wall and CPU time per node, hot functions and top allocation sites,
+    as JSON in PROFILING_REPORT_DIR. Returns the result and the report id.
+    """
+    report_id = uuid.uuid4().hex
+    with profile_execution(settings.PROFILING_SAMPLE_INTERVAL, settings.PROFILING_TOP_N, settings.PROFILING_TRACE_ALLOCATIONS) as report:
+        result = run_research(query, merge_results, max_results, mode)
+    report.update({"id": report_id, "query": query, "mode": mode, "created_at": time.time()})
+    os.makedirs(settings.PROFILING_REPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILING_REPORT_DIR, f"{report_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Profiled research for '{query}' in {report['wall_s']}s ({report['process_cpu_s']}s process CPU). Report: {path}")
+    return result, report_id
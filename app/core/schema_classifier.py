@@ -0,0 +1,144 @@
+import json
+import logging
+import re
+import threading
+from enum import Enum
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.scrapegraph.utils.metrics import schema_classifier_decisions_total, schema_generation_total, schema_latency_saved_seconds_total
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaNeed(str, Enum):
+    GENERAL = "general"
+    STRUCTURED = "structured"
+    AMBIGUOUS = "ambiguous"
+
+
+# Positive weights point towards an explicitly requested structure, negative ones
+# towards a general question answered with the default report.
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "general_opening": -2.5,
+    "news_request": -2.0,
+    "short_query": -1.0,
+    "question_mark": -0.5,
+    "extraction_verb": 2.5,
+    "structure_keyword": 3.0,
+    "per_item_phrase": 2.5,
+    "field_enumeration": 2.0,
+    "top_n": 1.5,
+    "comparison": 1.5,
+}
+DEFAULT_BIAS = 0.0
+DEFAULT_MARGIN = 1.5
+
+_patterns = {
+    "general_opening": re.compile(
+        r"^\s*(what\s+(is|are|was|were)|who\s+(is|was)|tell\s+me\s+about|explain|describe|how\s+(does|do|did|is|are|to)|why\s|"
+        r"overview\s+of|give\s+me\s+an?\s+overview|summari[sz]e\s+(the\s+)?(topic|history))\b",
+        re.IGNORECASE,
+    ),
+    "news_request": re.compile(r"\b(latest|recent|current)\s+(news|updates|developments)\b", re.IGNORECASE),
+    "extraction_verb": re.compile(r"\b(list|extract|enumerate|tabulate|itemi[sz]e|collect|gather)\b", re.IGNORECASE),
+    "structure_keyword": re.compile(r"\b(fields?|columns?|table|json|csv|schema|attributes|properties|format\s+as)\b", re.IGNORECASE),
+    "per_item_phrase": re.compile(r"\b(and\s+their|with\s+their|along\s+with|for\s+each|each\s+of|per\s+(company|product|item|country|person))\b", re.IGNORECASE),
+    "top_n": re.compile(r"\b(top|best|largest|biggest)\s+\d+\b", re.IGNORECASE),
+    "comparison": re.compile(r"\b(compare|comparison|versus|vs\.?)\b", re.IGNORECASE),
+}
+_enumeration_pattern = re.compile(r"\w[\w\s-]{0,30},\s*\w[\w\s-]{0,30}(,\s*|\s+and\s+)\w")
+
+
+class SchemaNeedClassifier:
+    """
+    Fast local classifier deciding whether a query explicitly asks for an output
+    structure. Keyword and pattern features are combined with a linear model; queries
+    clearly outside the margin are decided locally, everything else is reported as
+    ambiguous and left to the schema generation LLM. The weights can be replaced by a
+    small JSON model file of the form {"weights": {...}, "bias": 0.0, "margin": 1.5}.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, bias: float = DEFAULT_BIAS, margin: float = DEFAULT_MARGIN):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.bias = bias
+        self.margin = margin
+        self._lock = threading.Lock()
+        self.decisions: Dict[str, int] = {need.value: 0 for need in SchemaNeed}
+        self.cache_hits = 0
+        self.llm_calls = 0
+        self.avg_llm_latency = 0.0
+        self.latency_saved = 0.0
+
+    @classmethod
+    def from_file(cls, path: str) -> "SchemaNeedClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            model = json.load(f)
+        return cls(weights=model.get("weights"), bias=model.get("bias", DEFAULT_BIAS), margin=model.get("margin", DEFAULT_MARGIN))
+
+    def features(self, query: str) -> Dict[str, float]:
+        features = {name: 1.0 if pattern.search(query) else 0.0 for name, pattern in _patterns.items()}
+        features["short_query"] = 1.0 if len(query.split()) <= 6 else 0.0
+        features["question_mark"] = 1.0 if query.strip().endswith("?") else 0.0
+        features["field_enumeration"] = 1.0 if _enumeration_pattern.search(query) else 0.0
+        return features
+
+    def score(self, query: str) -> float:
+        return self.bias + sum(self.weights.get(name, 0.0) * value for name, value in self.features(query).items())
+
+    def classify(self, query: str) -> SchemaNeed:
+        score = self.score(query)
+        if score <= -self.margin:
+            need = SchemaNeed.GENERAL
+        elif score >= self.margin:
+            need = SchemaNeed.STRUCTURED
+        else:
+            need = SchemaNeed.AMBIGUOUS
+        with self._lock:
+            self.decisions[need.value] += 1
+        schema_classifier_decisions_total.labels(need.value).inc()
+        logger.debug(f"Schema need for query '{query}': {need.value} (score {score:.2f})")
+        return need
+
+    def record_llm_call(self, latency: float) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.avg_llm_latency += (latency - self.avg_llm_latency) / self.llm_calls
+        schema_generation_total.labels("llm").inc()
+
+    def record_skipped_call(self, cached: bool = False) -> None:
+        """Counts a schema generation LLM call avoided by the classifier or the schema cache."""
+        source = "cache" if cached else "classifier"
+        with self._lock:
+            if cached:
+                self.cache_hits += 1
+            self.latency_saved += self.avg_llm_latency
+            saved = self.avg_llm_latency
+        schema_generation_total.labels(source).inc()
+        schema_latency_saved_seconds_total.labels(source).inc(saved)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            classified = sum(self.decisions.values())
+            return {
+                "classified": classified,
+                "classifier_hit_rate": self.decisions[SchemaNeed.GENERAL.value] / classified if classified else 0.0,
+                "cache_hits": self.cache_hits,
+                "llm_calls": self.llm_calls,
+                "avg_llm_latency": self.avg_llm_latency,
+                "latency_saved": self.latency_saved,
+                **{f"decisions_{name}": count for name, count in self.decisions.items()},
+            }
+
+
+def _load_classifier() -> SchemaNeedClassifier:
+    if settings.SCHEMA_CLASSIFIER_MODEL_PATH:
+        try:
+            return SchemaNeedClassifier.from_file(settings.SCHEMA_CLASSIFIER_MODEL_PATH)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load schema classifier model '{settings.SCHEMA_CLASSIFIER_MODEL_PATH}', using built-in weights: {e}")
+    return SchemaNeedClassifier()
+
+
+schema_classifier = _load_classifier()
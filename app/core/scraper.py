@@ -1,46 +1,159 @@
+import contextvars
 import logging
-from typing import Type, Dict, Any, Union, List
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Type, Dict, Any, Union, List, Optional, Callable
 from pydantic import BaseModel
-from app.scrapegraph.graphs import SearchGraph
-from app.scrapegraph.utils import prettify_exec_info
+from app.scrapegraph.graphs import DecomposedSearchGraph, FastSearchGraph, SearchGraph, SmartScraperGraph
+from app.scrapegraph.utils import DocumentStore, compaction_stats, llm_request, llm_scheduler, output_mode_stats, prettify_exec_info, routing_stats
 from app.core.config import settings
 logger = logging.getLogger(__name__)
-def run_search_graph(
-    query: str,
-    dynamic_schema_model: Type[BaseModel],
-    merge_results: bool = True
-) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
-    logger.info(f"Initializing internal SearchGraph for query: '{query}' with schema: {dynamic_schema_model.__name__}")
+def build_graph_config(
+    merge_results: bool = True,
+    max_results: Optional[int] = None,
+    document_store: Optional[DocumentStore] = None,
+) -> Dict[str, Any]:
     graph_config = {
         "llm": {
-            "provider": "google_genai",
+            "provider": settings.LLM_PROVIDER,
             "model": settings.SCRAPEGRAPH_EXTRACTION_MODEL,
             "api_key": settings.GEMINI_API_KEY,
             "temperature": 0.1,
+            "options": settings.LLM_PROVIDER_OPTIONS,
         },
         "scraper": {
             "headless": settings.SCRAPER_HEADLESS,
         },
         "verbose": True,
-        "max_results": settings.SCRAPER_MAX_RESULTS,
+        "max_results": max_results or settings.SCRAPER_MAX_RESULTS,
         "merge_results": merge_results,
         "timeout": 480,
         "batchsize": settings.SCRAPEGRAPH_BATCHSIZE,
-        "loader_kwargs": {}
+        "loader_kwargs": {},
+        "structured_output": settings.STRUCTURED_OUTPUT_ENABLED,
+        "prompt_compaction": settings.PROMPT_COMPACTION_ENABLED,
+        "reattempt": settings.FIELD_REPAIR_ENABLED,
+        "repair_max_tokens": settings.FIELD_REPAIR_MAX_TOKENS,
+        "max_sub_queries": settings.MAX_SUB_QUERIES,
+        "adaptive_fanout": settings.ADAPTIVE_FANOUT_ENABLED,
+        "initial_wave": settings.ADAPTIVE_FANOUT_INITIAL_WAVE,
+        "coverage_threshold": settings.ADAPTIVE_FANOUT_COVERAGE_THRESHOLD,
+        "pack_documents": settings.DOCUMENT_PACKING_ENABLED,
+        "pack_max_tokens": settings.DOCUMENT_PACKING_MAX_TOKENS,
+        "search_engine": settings.SEARCH_ENGINES,
+        "search_timeout": settings.SEARCH_ENGINE_TIMEOUT,
+        "search_backends": {
+            "searxng": {"base_url": settings.SEARXNG_URL},
+            "local": {"path": settings.LOCAL_SEARCH_CORPUS_PATH or None},
+        },
     }
-    try:
-        search_graph = SearchGraph(
-            prompt=query,
-            config=graph_config,
-            schema=dynamic_schema_model
+    if settings.SEARCH_CACHE_ENABLED:
+        graph_config["search_cache"] = {
+            "path": settings.SEARCH_CACHE_PATH,
+            "query_ttl": settings.SEARCH_CACHE_QUERY_TTL,
+            "results_ttl": settings.SEARCH_CACHE_RESULTS_TTL,
+            "max_entries": settings.SEARCH_CACHE_MAX_ENTRIES,
+        }
+    if settings.DOMAIN_QUALITY_ENABLED:
+        graph_config["domain_quality"] = {
+            "path": settings.DOMAIN_QUALITY_PATH,
+            "min_samples": settings.DOMAIN_QUALITY_MIN_SAMPLES,
+            "max_failure_rate": settings.DOMAIN_QUALITY_MAX_FAILURE_RATE,
+            "half_life": settings.DOMAIN_QUALITY_HALF_LIFE,
+        }
+    if settings.ADAPTIVE_CHUNKING_ENABLED:
+        graph_config["adaptive_chunking"] = {
+            "max_chunks": settings.ADAPTIVE_CHUNKING_MAX_CHUNKS,
+            "min_chunk_tokens": settings.ADAPTIVE_CHUNKING_MIN_CHUNK_TOKENS,
+        }
+    if settings.MODEL_ROUTING_ENABLED:
+        graph_config["model_routing"] = build_model_routes()
+    if document_store is not None:
+        graph_config["document_store"] = document_store
+    return graph_config
+def build_model_routes() -> Dict[str, Any]:
+    """
+    Lite model for query rewriting and planning, a lite-first cascade escalating to the
+    extraction model for per-page answers, and the merge model for the final merge.
+    """
+    lite_model = settings.SCRAPEGRAPH_LITE_MODEL
+    extraction_model = settings.SCRAPEGRAPH_EXTRACTION_MODEL
+    return {
+        "SearchInternetNode": [lite_model],
+        "QueryDecompositionNode": [lite_model],
+        "GenerateAnswerNode": [
+            {"model": lite_model, "max_input_tokens": settings.MODEL_ROUTING_LITE_MAX_INPUT_TOKENS},
+            extraction_model,
+        ],
+        "MergeAnswersNode": [settings.SCRAPEGRAPH_MERGE_MODEL or extraction_model],
+    }
+SEARCH_GRAPHS_BY_MODE = {
+    "fast": FastSearchGraph,
+    "decompose": DecomposedSearchGraph,
+}
+def run_search_graph(
+    query: str,
+    dynamic_schema_model: Type[BaseModel],
+    merge_results: bool = True,
+    max_results: Optional[int] = None,
+    resume_state: Optional[Dict[str, Any]] = None,
+    resume_from: Optional[str] = None,
+    on_node_complete: Optional[Callable] = None,
+    document_store: Optional[DocumentStore] = None,
+    mode: str = "full",
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    # The LLM scheduler shares model slots fairly between the searches running at once.
+    with llm_request(uuid.uuid4().hex):
+        return _run_search_graph(
+            query, dynamic_schema_model, merge_results, max_results,
+            resume_state, resume_from, on_node_complete, document_store, mode,
         )
-        logger.info(f"Running internal SearchGraph with Gemini model: {settings.SCRAPEGRAPH_EXTRACTION_MODEL}...")
-        result = search_graph.run()
+def _run_search_graph(
+    query: str,
+    dynamic_schema_model: Type[BaseModel],
+    merge_results: bool,
+    max_results: Optional[int],
+    resume_state: Optional[Dict[str, Any]],
+    resume_from: Optional[str],
+    on_node_complete: Optional[Callable],
+    document_store: Optional[DocumentStore],
+    mode: str,
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    logger.info(f"Initializing internal SearchGraph for query: '{query}' with schema: {dynamic_schema_model.__name__} (mode: {mode})")
+    graph_config = build_graph_config(merge_results, max_results, document_store)
+    try:
+        if mode in SEARCH_GRAPHS_BY_MODE:
+            graph_class = SEARCH_GRAPHS_BY_MODE[mode]
+            search_graph = graph_class(
+                prompt=query,
+                config=graph_config,
+                schema=dynamic_schema_model
+            )
+            logger.info(f"Running internal {graph_class.__name__} with Gemini model: {settings.SCRAPEGRAPH_EXTRACTION_MODEL}...")
+            result = search_graph.run()
+        else:
+            search_graph = SearchGraph(
+                prompt=query,
+                config=graph_config,
+                schema=dynamic_schema_model
+            )
+            logger.info(f"Running internal SearchGraph with Gemini model: {settings.SCRAPEGRAPH_EXTRACTION_MODEL}...")
+            result = search_graph.run(
+                resume_state=resume_state,
+                resume_from=resume_from,
+                on_node_complete=on_node_complete,
+            )
         logger.info("Internal SearchGraph execution finished.")
         logger.info("--- Internal Graph Execution Information ---")
         try:
             graph_exec_info = search_graph.get_execution_info()
             logger.info(prettify_exec_info(graph_exec_info))
+            if settings.MODEL_ROUTING_ENABLED:
+                logger.info(f"Model routing stats: {routing_stats.snapshot()}")
+            logger.info(f"Output mode stats: {output_mode_stats.snapshot()}")
+            logger.info(f"LLM scheduler stats: {llm_scheduler.snapshot()}")
+            if settings.PROMPT_COMPACTION_ENABLED:
+                logger.info(f"Prompt compaction stats: {compaction_stats.snapshot()}")
         except Exception as e:
             logger.warning(f"Could not retrieve execution info: {e}")
         return result
@@ -56,3 +169,24 @@ def run_search_graph(
     except Exception as e:
         logger.exception(f"An unexpected error occurred during internal SearchGraph execution: {e}")
         raise e
+def search_urls(
+    query: str,
+    dynamic_schema_model: Type[BaseModel],
+    max_results: Optional[int] = None,
+) -> List[str]:
+    """Runs only the search stage of the SearchGraph and returns the URLs found for the query."""
+    graph_config = build_graph_config(max_results=max_results)
+    search_graph = SearchGraph(prompt=query, config=graph_config, schema=dynamic_schema_model)
+    return search_graph.search_urls()
+def load_documents(urls: List[str], document_store: DocumentStore) -> DocumentStore:
+    """Fetches and parses every URL once into the shared document store, at most `SCRAPEGRAPH_BATCHSIZE` at a time."""
+    graph_config = build_graph_config()
+    def _load(url: str) -> None:
+        graph = SmartScraperGraph(prompt="", source=url, config=graph_config)
+        document_store.get_or_load(url, graph.load_document)
+    with ThreadPoolExecutor(max_workers=settings.SCRAPEGRAPH_BATCHSIZE) as executor:
+        # Each fetch runs in a copy of the caller's context, so usage ledgers and trace spans follow it.
+        futures = [executor.submit(contextvars.copy_context().run, _load, url) for url in urls]
+        for future in futures:
+            future.result()
+    return document_store
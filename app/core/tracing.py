@@ -0,0 +1,57 @@
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_provider = None
+_trace_file = None
+
+
+def configure_tracing() -> bool:
+    """
+    Installs an OpenTelemetry tracer provider exporting the spans opened by the pipeline
+    (requests, graphs, nodes, fetches and LLM calls). Spans are written as JSON lines to
+    TRACING_FILE_PATH, or sent to an OTLP/HTTP collector at TRACING_OTLP_ENDPOINT.
+    Returns False when the OpenTelemetry SDK (or the OTLP exporter) is not installed.
+    """
+    global _provider, _trace_file
+    if _provider is not None:
+        return True
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        logger.warning("TRACING_ENABLED is set but opentelemetry-sdk is not installed; spans are not exported.")
+        return False
+
+    if settings.TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACING_EXPORTER is 'otlp' but opentelemetry-exporter-otlp-proto-http is not installed; spans are not exported.")
+            return False
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT or None)
+        destination = settings.TRACING_OTLP_ENDPOINT or "the default OTLP endpoint"
+    else:
+        _trace_file = open(settings.TRACING_FILE_PATH, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=_trace_file, formatter=lambda span: span.to_json(indent=None) + "\n")
+        destination = settings.TRACING_FILE_PATH
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": settings.PROJECT_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    logger.info(f"Tracing enabled, exporting spans to {destination}.")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flushes the pending spans and closes the exporter."""
+    global _trace_file
+    if _provider is not None:
+        _provider.shutdown()
+    if _trace_file is not None:
+        _trace_file.close()
+        _trace_file = None
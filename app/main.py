@@ -1,18 +1,80 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 import nest_asyncio
 nest_asyncio.apply()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from app.core.config import settings
-from app.api.v1.endpoints import research
+from app.api.v1.endpoints import research, jobs
+from app.core.jobs import job_manager
+from app.core.tracing import configure_tracing, shutdown_tracing
+from app.scrapegraph.utils import METRICS_CONTENT_TYPE, Cassette, configure_pricing, llm_scheduler, metrics_available, render_metrics, start_span, use_cassette
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    llm_scheduler.configure(settings.LLM_MAX_IN_FLIGHT_PER_MODEL)
+    configure_pricing(settings.LLM_PRICING)
+    if settings.TRACING_ENABLED:
+        configure_tracing()
+    cassette = None
+    if settings.CASSETTE_MODE:
+        max_bytes = settings.CASSETTE_MAX_MB * 1024 * 1024 if settings.CASSETTE_MAX_MB > 0 else None
+        cassette = Cassette(settings.CASSETTE_PATH, settings.CASSETTE_MODE, settings.CASSETTE_REPLAY_LATENCY, max_bytes)
+        use_cassette(cassette)
+    job_manager.start()
+    yield
+    # Waits up to JOBS_SHUTDOWN_TIMEOUT for running jobs, off the event loop.
+    await asyncio.to_thread(job_manager.shutdown)
+    if cassette is not None:
+        if cassette.mode == "record":
+            cassette.save()
+        use_cassette(None)
+    shutdown_tracing()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
+)
+
+async def _end_span_after(body_iterator, span):
+    """Streams the response body, then ends the request span."""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        span.end()
+
+if settings.TRACING_ENABLED:
+    @app.middleware("http")
+    async def trace_request(request: Request, call_next):
+        """
+        Root span of each API request; the graphs, fetches and LLM calls it runs are its children.
+        Streamed responses (e.g. /batch) keep running after call_next returns, so the span
+        ends once the body has been sent.
+        """
+        attributes = {"http.method": request.method, "http.target": request.url.path}
+        span = None
+        try:
+            with start_span(f"{request.method} {request.url.path}", attributes, end_on_exit=False) as span:
+                response = await call_next(request)
+                span.set_attribute("http.status_code", response.status_code)
+        except BaseException:
+            if span is not None:
+                span.end()
+            raise
+        response.body_iterator = _end_span_after(response.body_iterator, span)
+        return response
+
+app.include_router(
+    jobs.router,
+    prefix=settings.API_V1_STR + "/research/jobs",
+    tags=["Research Jobs"]
 )
 
 app.include_router(
@@ -27,6 +89,16 @@ async def read_root():
     logger.info("Root endpoint '/' accessed.")
     return {"message": f"Welcome to the {settings.PROJECT_NAME}!"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Monitoring"], include_in_schema=False)
+    async def read_metrics():
+        """Prometheus metrics: node, fetch and LLM latencies, queue waits, token usage, cache lookups, schema generation sources and errors."""
+        if not metrics_available():
+            return Response("prometheus_client is not installed.\n", status_code=503, media_type="text/plain")
+        return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+    if not metrics_available():
+        logger.warning("METRICS_ENABLED is set but prometheus_client is not installed; /metrics will answer 503.")
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting server with Uvicorn directly...")
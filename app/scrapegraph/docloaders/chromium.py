@@ -1,4 +1,5 @@
 import asyncio
+import time
 from typing import Any, AsyncIterator, Iterator, List, Optional
 import aiohttp
 import async_timeout
@@ -13,6 +14,7 @@ except ImportError:
     )
 from undetected_playwright import Malenia
 
+from ..utils.cassette import active_cassette
 from ..utils.logging import get_logger
 logger = get_logger(__name__)
 class ChromiumLoader(BaseLoader):
@@ -37,6 +39,21 @@ class ChromiumLoader(BaseLoader):
         self.retry_limit = retry_limit
         self.timeout = timeout
     async def ascrape_playwright(self, url: str, browser_name: str = "chromium") -> str:
+        cassette = active_cassette()
+        if cassette is None:
+            return await self._ascrape_playwright(url, browser_name)
+        key = cassette.key("fetch", url, browser_name)
+        if cassette.replaying:
+            return (await cassette.areplay(key))["html"]
+        start_time = time.time()
+        try:
+            html = await self._ascrape_playwright(url, browser_name)
+        except Exception as e:
+            cassette.record_error(key, e, time.time() - start_time)
+            raise
+        cassette.record(key, {"html": html}, time.time() - start_time)
+        return html
+    async def _ascrape_playwright(self, url: str, browser_name: str = "chromium") -> str:
         logger.info(f"Starting scraping with playwright for {url}...")
         results = ""
         attempt = 0
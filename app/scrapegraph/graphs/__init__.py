@@ -1,10 +1,15 @@
 from .abstract_graph import AbstractGraph
-from .base_graph import BaseGraph
+from .base_graph import BaseGraph, GraphInterruptedError
 from .search_graph import SearchGraph
+from .fast_search_graph import FastSearchGraph
+from .decomposed_search_graph import DecomposedSearchGraph
 from .smart_scraper_graph import SmartScraperGraph
 __all__ = [
     "AbstractGraph",
     "BaseGraph",
+    "GraphInterruptedError",
     "SearchGraph",
+    "FastSearchGraph",
+    "DecomposedSearchGraph",
     "SmartScraperGraph",
 ]
@@ -2,7 +2,9 @@ from abc import ABC, abstractmethod
 from typing import Optional, Type
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel
+from ..models import FakeChatModel, with_cassette
 from ..utils.logging import get_logger
+from ..utils.model_routing import ModelRouter
 from ..helpers.models_tokens import models_tokens
 class AbstractGraph(ABC):
     def __init__(
@@ -17,7 +19,14 @@ class AbstractGraph(ABC):
         self.config = config
         self.schema = schema
         self.logger = get_logger(__name__)
+        self.model_token = self._model_token(config["llm"])
+        self.logger.info(f"Using token limit for {config['llm'].get('model')}: {self.model_token}")
         self.llm_model = self._create_llm(config["llm"])
+        self.model_router = ModelRouter(
+            config.get("model_routing"),
+            lambda model_name: self._create_llm({**config["llm"], "model": model_name}),
+            lambda model_name: self._model_token({**config["llm"], "model": model_name}),
+        )
         self.verbose = config.get("verbose", False)
         self.headless = config.get("headless", True)
         self.loader_kwargs = config.get("loader_kwargs", {})
@@ -31,8 +40,25 @@ class AbstractGraph(ABC):
             "loader_kwargs": self.loader_kwargs,
             "llm_model": self.llm_model,
             "timeout": self.timeout,
+            "domain_quality": config.get("domain_quality"),
+            "structured_output": config.get("structured_output", False),
+            "prompt_compaction": config.get("prompt_compaction", False),
         }
         self.set_common_params(common_params, overwrite=True)
+        self._apply_model_routing()
+    def _apply_model_routing(self) -> None:
+        """
+        Gives every node with a route its first-tier model and the whole cascade as
+        `llm_cascade`; nodes without a route keep the graph's default model.
+        """
+        for node in self.graph.nodes:
+            tiers = self.model_router.tiers_for(node)
+            if not tiers:
+                continue
+            node.llm_model = tiers[0].llm
+            node.node_config["llm_model"] = tiers[0].llm
+            node.node_config["llm_cascade"] = tiers
+            self.logger.debug(f"Routing node '{node.node_name}' to models {[tier.name for tier in tiers]}")
     def set_common_params(self, params: dict, overwrite=False):
         for node in self.graph.nodes:
             for key, val in params.items():
@@ -43,28 +69,33 @@ class AbstractGraph(ABC):
                  for key, val in params.items():
                      if key not in node.node_config or overwrite:
                          node.node_config[key] = val
+    @staticmethod
+    def _model_token(llm_config: dict) -> int:
+        """Returns the context window of the configured model, in tokens."""
+        # The fake provider stands in for Gemini models, so chunking behaves alike.
+        provider = "google_genai" if llm_config.get("provider") == "fake" else llm_config.get("provider", "google_genai")
+        return models_tokens.get(provider, {}).get(llm_config.get("model"), 8192)
     def _create_llm(self, llm_config: dict) -> object:
         llm_provider = llm_config.get("provider", "google_genai")
         model_name = llm_config.get("model")
         api_key = llm_config.get("api_key")
         temperature = llm_config.get("temperature", 0.1)
-        if llm_provider != "google_genai":
-            raise ValueError("This internal Scrapegraph implementation only supports 'google_genai'.")
+        if llm_provider not in ("google_genai", "fake"):
+            raise ValueError("This internal Scrapegraph implementation only supports 'google_genai' (and 'fake' for offline benchmarks).")
         if not model_name:
             raise ValueError("LLM model name ('model') is required in the config.")
+        if llm_provider == "fake":
+            return with_cassette(FakeChatModel(model=model_name, temperature=temperature, **llm_config.get("options", {})))
         if not api_key:
             raise ValueError("LLM API key ('api_key') is required in the config.")
         try:
-            provider_models = models_tokens.get(llm_provider, {})
-            self.model_token = provider_models.get(model_name, 8192)
-            self.logger.info(f"Using token limit for {model_name}: {self.model_token}")
             llm = ChatGoogleGenerativeAI(
                 model=model_name,
                 google_api_key=api_key,
                 temperature=temperature,
                 convert_system_message_to_human=True
             )
-            return llm
+            return with_cassette(llm)
         except ImportError:
             raise ImportError(
                 "langchain_google_genai is not installed. Please install it using 'pip install langchain-google-genai'."
@@ -80,6 +111,19 @@ class AbstractGraph(ABC):
         return self.final_state
     def get_execution_info(self):
         return self.execution_info
+    def _absorb_execution_info(self, sub_info: Optional[list], add_exec_time: bool = True) -> None:
+        """
+        Splices the node entries of a sub-graph's execution info in before this graph's
+        TOTAL RESULT entry and adds the sub-graph's token and cost totals to it.
+        """
+        sub_info = sub_info or []
+        self.execution_info[-1:-1] = [info for info in sub_info if info.get("node_name") != "TOTAL RESULT"]
+        sub_total = next((info for info in sub_info if info.get("node_name") == "TOTAL RESULT"), {})
+        keys = ["total_tokens", "prompt_tokens", "completion_tokens", "successful_requests", "total_cost_USD"]
+        if add_exec_time:
+            keys.append("exec_time")
+        for key in keys:
+            self.execution_info[-1][key] = self.execution_info[-1].get(key, 0) + sub_total.get(key, 0)
     @abstractmethod
     def _create_graph(self):
         pass
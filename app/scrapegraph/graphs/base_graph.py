@@ -1,8 +1,12 @@
 import time
 import warnings
-from typing import Tuple
+from typing import Callable, Optional, Tuple
 from ..utils.logging import get_logger
-from ..utils.llm_callback_manager import CustomLLMCallbackManager
+from ..utils.metrics import node_exec_seconds, stage_errors_total
+from ..utils.profiling import profile_node
+from ..utils.tracing import start_span
+from ..utils.usage_ledger import UsageLedger, usage_scope
+from ..nodes.base_node import GraphInterruptedError
 class BaseGraph:
     def __init__(
         self,
@@ -18,7 +22,6 @@ class BaseGraph:
         self.graph_name = graph_name
         self.initial_state = {}
         self.logger = get_logger(__name__)
-        self.callback_manager = CustomLLMCallbackManager()
         if nodes and nodes[0].node_name != entry_point.node_name:
             warnings.warn(
                 f"Entry point node '{entry_point.node_name}' is not the first node in the graph list."
@@ -65,57 +68,74 @@ class BaseGraph:
         curr_time = time.time()
         result = None
         cb_data = None
-        # Reset callback manager counts before executing a node that might use LLM
-        if hasattr(current_node, "llm_model"):
-             self.callback_manager.reset_counts()
-        try:
-            result = current_node.execute(state, self.callback_manager)
-            node_exec_time = time.time() - curr_time
-
-            # Retrieve token counts from the callback manager after execution
-            total_tokens = self.callback_manager.total_tokens
-            prompt_tokens = self.callback_manager.prompt_tokens
-            completion_tokens = self.callback_manager.completion_tokens
-            total_cost_usd = self.callback_manager.total_cost_USD # Assuming cost is handled by callback
-
-            cb_data = {
-                "node_name": current_node.node_name,
-                "total_tokens": total_tokens,
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "successful_requests": 1, # Assuming a successful execution means at least one request
-                "total_cost_USD": total_cost_usd,
-                "exec_time": node_exec_time,
-            }
-        except Exception as e:
-             node_exec_time = time.time() - curr_time
-             self.logger.error(f"Error executing node {current_node.node_name}: {e}")
-             # If an error occurs, capture the current state of the callback manager's counts
-             total_tokens = self.callback_manager.total_tokens
-             prompt_tokens = self.callback_manager.prompt_tokens
-             completion_tokens = self.callback_manager.completion_tokens
-             total_cost_usd = self.callback_manager.total_cost_USD
-
-             cb_data = {
-                 "node_name": current_node.node_name,
-                 "total_tokens": total_tokens,
-                 "prompt_tokens": prompt_tokens,
-                 "completion_tokens": completion_tokens,
-                 "successful_requests": 0,
-                 "total_cost_USD": total_cost_usd,
-                 "exec_time": node_exec_time,
-                 "error": str(e)
-             }
-             raise
+        if hasattr(current_node, "exec_metrics"):
+            current_node.exec_metrics.clear()
+        # Each node counts its own LLM calls, including those of its sub-graphs and parallel chains.
+        with usage_scope(node=current_node.node_name) as usage:
+            try:
+                result = current_node.execute(state)
+                node_exec_time = time.time() - curr_time
+                node_exec_seconds.labels(self.graph_name, current_node.node_name).observe(node_exec_time)
+                cb_data = self._usage_info(current_node.node_name, usage, node_exec_time)
+                cb_data.update(getattr(current_node, "exec_metrics", {}))
+            except Exception as e:
+                node_exec_time = time.time() - curr_time
+                node_exec_seconds.labels(self.graph_name, current_node.node_name).observe(node_exec_time)
+                stage_errors_total.labels(current_node.node_name).inc()
+                self.logger.error(f"Error executing node {current_node.node_name}: {e}")
+                cb_data = self._usage_info(current_node.node_name, usage, node_exec_time)
+                cb_data["error"] = str(e)
+                raise
         return result, node_exec_time, cb_data
+    def _usage_info(self, node_name: str, usage: UsageLedger, exec_time: float) -> dict:
+        totals = usage.totals()
+        info = {
+            "node_name": node_name,
+            "total_tokens": totals["total_tokens"],
+            "prompt_tokens": totals["prompt_tokens"],
+            "completion_tokens": totals["completion_tokens"],
+            "successful_requests": totals["calls"] - totals["cached_calls"] - totals["failed_calls"],
+            "total_cost_USD": totals["cost_usd"],
+            "exec_time": exec_time,
+        }
+        if totals["calls"]:
+            # Time the node's LLM calls were running, without the time they queued for a slot.
+            info["llm_time"] = usage.active_time()
+        return info
     def _get_next_node_name(self, current_node, result):
         if hasattr(current_node, 'node_type') and current_node.node_type == "conditional_node":
             return result
         else:
             return self.edges.get(current_node.node_name)
-    def execute(self, initial_state: dict) -> Tuple[dict, list]:
+    def execute(
+        self,
+        initial_state: dict,
+        start_node: Optional[str] = None,
+        on_node_complete: Optional[Callable[[str, dict, dict, Optional[str]], None]] = None,
+    ) -> Tuple[dict, list]:
+        """
+        Runs the graph from the entry point, or from `start_node` when resuming a
+        previously checkpointed state.
+        `on_node_complete(node_name, node_info, state, next_node_name)` is called after
+        every successful node so callers can report progress or persist checkpoints;
+        a `GraphInterruptedError` it raises stops the run and propagates as is.
+        The run is traced as one span, tagged with its source URL, with a child span per node.
+        Its LLM usage is labelled with the source URL in the request's usage ledger.
+        """
+        attributes = {"graph.name": self.graph_name, "graph.start_node": start_node, "source.url": initial_state.get("url")}
+        with start_span(f"graph {self.graph_name}", attributes) as span, usage_scope(source=initial_state.get("url")):
+            state, exec_info = self._execute(initial_state, start_node, on_node_complete)
+            total = exec_info[-1]
+            span.set_attributes({f"llm.{key}": total[key] for key in ("prompt_tokens", "completion_tokens", "total_tokens")})
+            return state, exec_info
+    def _execute(
+        self,
+        initial_state: dict,
+        start_node: Optional[str],
+        on_node_complete: Optional[Callable[[str, dict, dict, Optional[str]], None]],
+    ) -> Tuple[dict, list]:
         self.initial_state = initial_state
-        current_node_name = self.entry_point
+        current_node_name = start_node or self.entry_point
         state = initial_state.copy()
         total_exec_time = 0.0
         exec_info = []
@@ -139,15 +159,22 @@ class BaseGraph:
                         llm_model_name = llm_model.model_name
                     elif hasattr(llm_model, "model"):
                         llm_model_name = llm_model.model
-                result, node_exec_time, cb_data = self._execute_node(
-                    current_node, state, llm_model, llm_model_name
-                )
+                with start_span(f"node {current_node.node_name}", {"graph.name": self.graph_name, "node.name": current_node.node_name}) as span, profile_node(self.graph_name, current_node.node_name):
+                    result, node_exec_time, cb_data = self._execute_node(
+                        current_node, state, llm_model, llm_model_name
+                    )
+                    span.set_attributes({f"llm.{key}": cb_data[key] for key in ("prompt_tokens", "completion_tokens", "total_tokens")})
                 total_exec_time += node_exec_time
                 if cb_data:
                     exec_info.append(cb_data)
                     for key in cb_total:
                         cb_total[key] += cb_data.get(key, 0)
                 current_node_name = self._get_next_node_name(current_node, result)
+                if on_node_complete:
+                    on_node_complete(current_node.node_name, cb_data, state, current_node_name)
+            except GraphInterruptedError as e:
+                self.logger.info(f"Graph run stopped after node '{current_node.node_name}': {e}")
+                raise
             except Exception as e:
                 error_node = current_node_name
                 self.logger.exception(f"Graph execution failed at node '{error_node}': {e}")
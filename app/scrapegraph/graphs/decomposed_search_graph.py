@@ -0,0 +1,95 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from copy import deepcopy
+from .abstract_graph import AbstractGraph
+from .base_graph import BaseGraph
+from .search_graph import SearchGraph
+from ..nodes import QueryDecompositionNode
+from ..utils.copy import safe_deepcopy
+from ..utils.schema_coverage import fill_missing, subset_model
+from ..utils.url_canonicalization import dedupe_urls
+class DecomposedSearchGraph(AbstractGraph):
+    """
+    Plans a compound prompt into independent sub-queries, each tied to a subset of the
+    schema fields, runs a SearchGraph per sub-query concurrently and assembles their
+    partial answers into one answer conforming to the full schema.
+    """
+    def __init__(
+        self,
+        prompt: str,
+        config: dict,
+        schema: Optional[Type[BaseModel]] = None,
+    ):
+        self.max_results = config.get("max_results", 3)
+        self.copy_config = safe_deepcopy(config)
+        try:
+            self.copy_schema = deepcopy(schema)
+        except TypeError:
+            self.copy_schema = schema
+        self.considered_urls = []
+        self.sub_queries = []
+        super().__init__(prompt, config, schema=schema)
+    def _create_graph(self) -> BaseGraph:
+        query_decomposition_node = QueryDecompositionNode(
+            input="user_prompt",
+            output=["sub_queries"],
+            node_config={
+                "llm_model": self.llm_model,
+                "schema": self.copy_schema,
+                "max_sub_queries": self.copy_config.get("max_sub_queries", 4),
+            },
+            node_name="QueryDecomposition"
+        )
+        return BaseGraph(
+            nodes=[query_decomposition_node],
+            edges=[(query_decomposition_node, None)],
+            entry_point=query_decomposition_node,
+            graph_name=self.__class__.__name__,
+        )
+    def _run_sub_query(self, sub_query: dict) -> Tuple[SearchGraph, Any]:
+        sub_config = safe_deepcopy(self.copy_config)
+        sub_config["merge_results"] = True
+        sub_graph = SearchGraph(
+            prompt=sub_query["query"],
+            config=sub_config,
+            schema=subset_model(self.copy_schema, sub_query["fields"]),
+        )
+        try:
+            return sub_graph, sub_graph.run()
+        except Exception as e:
+            self.logger.error(f"Sub-query '{sub_query['query']}' failed: {e}")
+            return sub_graph, {"error": str(e)}
+    def run(self) -> str:
+        inputs = {"user_prompt": self.prompt}
+        self.final_state, self.execution_info = self.graph.execute(inputs)
+        self.sub_queries = self.final_state.get("sub_queries") or []
+        if self.copy_schema is None or len(self.sub_queries) <= 1:
+            self.logger.info("Query was not decomposed, running a single SearchGraph.")
+            sub_graph = SearchGraph(prompt=self.prompt, config=self.copy_config, schema=self.copy_schema)
+            answer = sub_graph.run()
+            self.considered_urls = sub_graph.get_considered_urls()
+            self._absorb_execution_info(sub_graph.get_execution_info())
+            self.final_state["answer"] = answer
+            return answer
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=len(self.sub_queries)) as executor:
+            # Each sub-query runs in a copy of this context so its LLM calls stay attributed to the request.
+            futures = [executor.submit(contextvars.copy_context().run, self._run_sub_query, sub_query) for sub_query in self.sub_queries]
+            sub_results = [future.result() for future in futures]
+        answer = {}
+        for sub_query, (sub_graph, sub_answer) in zip(self.sub_queries, sub_results):
+            answer = fill_missing(answer, sub_answer, sub_query["fields"])
+            self.considered_urls.extend(sub_graph.get_considered_urls())
+            self._absorb_execution_info(sub_graph.get_execution_info(), add_exec_time=False)
+        # Sub-queries run concurrently, so the wall time is that of the slowest one.
+        self.execution_info[-1]["exec_time"] = self.execution_info[-1].get("exec_time", 0) + time.time() - start_time
+        self.considered_urls = dedupe_urls(self.considered_urls)
+        answer = {name: answer.get(name) for name in self.copy_schema.model_fields}
+        answer["sources"] = self.considered_urls
+        self.final_state["answer"] = answer
+        return answer
+    def get_considered_urls(self) -> List[str]:
+        return self.considered_urls
@@ -0,0 +1,94 @@
+from typing import List, Optional, Type
+from pydantic import BaseModel
+from copy import deepcopy
+from .abstract_graph import AbstractGraph
+from .base_graph import BaseGraph
+from .search_graph import SearchGraph
+from ..nodes import SearchInternetNode, GenerateAnswerNode
+from ..utils.copy import safe_deepcopy
+from ..utils.schema_coverage import fill_missing, missing_fields, subset_model
+class FastSearchGraph(AbstractGraph):
+    """
+    Answers from the search result titles and snippets alone, and only fetches and
+    extracts full pages for the schema fields the snippets could not fill.
+    """
+    def __init__(
+        self,
+        prompt: str,
+        config: dict,
+        schema: Optional[Type[BaseModel]] = None,
+    ):
+        self.max_results = config.get("max_results", 3)
+        self.copy_config = safe_deepcopy(config)
+        try:
+            self.copy_schema = deepcopy(schema)
+        except TypeError:
+            self.copy_schema = schema
+        self.considered_urls = []
+        self.filled_from_pages: List[str] = []
+        super().__init__(prompt, config, schema=schema)
+    def _create_graph(self) -> BaseGraph:
+        search_internet_node = SearchInternetNode(
+            input="user_prompt",
+            output=["urls", "user_prompt", "snippets"],
+            node_config={
+                "llm_model": self.llm_model,
+                "max_results": self.max_results,
+                "search_engine": self.copy_config.get("search_engine", "duckduckgo"),
+                "search_backends": self.copy_config.get("search_backends", {}),
+                "search_timeout": self.copy_config.get("search_timeout", 10.0),
+                "search_cache": self.copy_config.get("search_cache"),
+            },
+            node_name="SearchInternet"
+        )
+        snippet_answer_node = GenerateAnswerNode(
+            input="user_prompt & snippets",
+            output=["answer"],
+            node_config={
+                "llm_model": self.llm_model,
+                "schema": self.copy_schema,
+                "timeout": self.copy_config.get("timeout", 480),
+            },
+            node_name="SnippetAnswer"
+        )
+        return BaseGraph(
+            nodes=[search_internet_node, snippet_answer_node],
+            edges=[(search_internet_node, snippet_answer_node), (snippet_answer_node, None)],
+            entry_point=search_internet_node,
+            graph_name=self.__class__.__name__,
+        )
+    def run(self) -> str:
+        inputs = {"user_prompt": self.prompt}
+        self.final_state, self.execution_info = self.graph.execute(inputs)
+        self.considered_urls = self.final_state.get("urls", [])
+        answer = self.final_state.get("answer") or {}
+        if not isinstance(answer, dict) or "error" in answer:
+            answer = {}
+        missing = missing_fields(answer, self.copy_schema)
+        self.execution_info.insert(-1, {
+            "node_name": "SnippetCoverage",
+            "exec_time": 0.0,
+            "missing_fields": len(missing),
+        })
+        if missing and self.considered_urls:
+            self.logger.info(f"Snippets left {len(missing)} field(s) empty, fetching full pages for: {missing}")
+            page_config = safe_deepcopy(self.copy_config)
+            page_config["merge_results"] = True
+            page_graph = SearchGraph(
+                prompt=self.prompt,
+                config=page_config,
+                schema=subset_model(self.copy_schema, missing),
+            )
+            partial = page_graph.run(resume_state={"urls": self.considered_urls}, resume_from="GraphIterator")
+            answer = fill_missing(answer, partial, missing)
+            self.filled_from_pages = [name for name in missing if name in answer]
+            self._absorb_execution_info(page_graph.get_execution_info())
+        else:
+            self.logger.info("Snippets covered every schema field, no page was fetched.")
+        if self.copy_schema is not None:
+            answer = {name: answer.get(name) for name in self.copy_schema.model_fields}
+        answer["sources"] = self.considered_urls
+        self.final_state["answer"] = answer
+        return answer
+    def get_considered_urls(self) -> List[str]:
+        return self.considered_urls
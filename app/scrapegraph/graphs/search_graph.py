@@ -1,4 +1,4 @@
-from typing import List, Optional, Type
+from typing import Callable, List, Optional, Type
 from pydantic import BaseModel
 from copy import deepcopy
 from .abstract_graph import AbstractGraph
@@ -30,6 +30,9 @@ class SearchGraph(AbstractGraph):
                 "llm_model": self.llm_model,
                 "max_results": self.max_results,
                 "search_engine": self.copy_config.get("search_engine", "duckduckgo"),
+                "search_backends": self.copy_config.get("search_backends", {}),
+                "search_timeout": self.copy_config.get("search_timeout", 10.0),
+                "search_cache": self.copy_config.get("search_cache"),
             },
             node_name="SearchInternet"
         )
@@ -39,7 +42,12 @@ class SearchGraph(AbstractGraph):
             node_config={
                 "graph_instance": SmartScraperGraph,
                 "scraper_config": self.copy_config,
-                 "batchsize": self.copy_config.get("batchsize", 16)
+                 "batchsize": self.copy_config.get("batchsize", 16),
+                "adaptive": self.copy_config.get("adaptive_fanout", False),
+                "initial_wave": self.copy_config.get("initial_wave", 2),
+                "coverage_threshold": self.copy_config.get("coverage_threshold", 1.0),
+                "pack_documents": self.copy_config.get("pack_documents", False),
+                "pack_max_tokens": self.copy_config.get("pack_max_tokens", 12000),
             },
             schema=self.copy_schema,
             node_name="GraphIterator"
@@ -68,14 +76,28 @@ class SearchGraph(AbstractGraph):
             entry_point=search_internet_node,
             graph_name=self.__class__.__name__,
         )
-    def run(self) -> str:
+    def run(
+        self,
+        resume_state: Optional[dict] = None,
+        resume_from: Optional[str] = None,
+        on_node_complete: Optional[Callable] = None,
+    ) -> str:
         inputs = {"user_prompt": self.prompt}
-        self.final_state, self.execution_info = self.graph.execute(inputs)
+        if resume_state:
+            inputs.update(resume_state)
+        self.final_state, self.execution_info = self.graph.execute(
+            inputs, start_node=resume_from, on_node_complete=on_node_complete
+        )
         if "urls" in self.final_state:
             self.considered_urls = self.final_state["urls"]
         if self.merge_results:
             return self.final_state.get("answer", "No answer found.")
         else:
             return self.final_state.get("results", [])
+    def search_urls(self) -> List[str]:
+        """Runs only the SearchInternet node and returns the URLs found for the prompt."""
+        state = self.graph._get_node_by_name("SearchInternet").execute({"user_prompt": self.prompt})
+        self.considered_urls = state.get("urls", [])
+        return self.considered_urls
     def get_considered_urls(self) -> List[str]:
         return self.considered_urls
@@ -1,9 +1,9 @@
-from typing import Optional, Type
+from typing import Callable, List, Optional, Type
 from pydantic import BaseModel
 from .abstract_graph import AbstractGraph
-from .base_graph import BaseGraph
-from ..nodes import FetchNode, ParseNode, GenerateAnswerNode, ConditionalNode
-from ..prompts import REGEN_ADDITIONAL_INFO
+from .base_graph import BaseGraph, GraphInterruptedError
+from ..nodes import FetchNode, ParseNode, GenerateAnswerNode, PackedAnswerNode, RepairAnswerNode
+from ..utils.chunk_planner import chunk_planner
 class SmartScraperGraph(AbstractGraph):
     def __init__(
         self,
@@ -18,6 +18,7 @@ class SmartScraperGraph(AbstractGraph):
              self.input_key = "url"
         super().__init__(prompt, config, source, schema)
         self.verbose = config.get("verbose", False)
+        self.graph._get_node_by_name("Parse").node_config["answer_cascade"] = self.graph._get_node_by_name("GenerateAnswer").node_config.get("llm_cascade")
     def _create_graph(self) -> BaseGraph:
         fetch_node = FetchNode(
             input="url | local_dir",
@@ -35,7 +36,8 @@ class SmartScraperGraph(AbstractGraph):
             node_config={
                 "llm_model": self.llm_model,
                 "chunk_size": self.model_token,
-                "parse_html": True
+                "parse_html": True,
+                "adaptive_chunking": self.config.get("adaptive_chunking"),
             },
              node_name="Parse"
         )
@@ -50,37 +52,23 @@ class SmartScraperGraph(AbstractGraph):
             },
             node_name="GenerateAnswer"
         )
-        cond_node = None
-        regen_node = None
         if self.config.get("reattempt", False):
-            cond_node = ConditionalNode(
-                input="answer",
-                output=["next_action"],
-                node_config={
-                    "key_name": "answer",
-                    "condition": 'not answer or (isinstance(answer, str) and answer == "NA") or (isinstance(answer, dict) and not answer)',
-                },
-                 node_name="ConditionalNode"
-            )
-            regen_node = GenerateAnswerNode(
-                input="user_prompt & answer",
+            repair_answer_node = RepairAnswerNode(
+                input="user_prompt & answer & (parsed_doc | doc)",
                 output=["answer"],
                 node_config={
                     "llm_model": self.llm_model,
                     "schema": self.schema,
-                    "additional_info": REGEN_ADDITIONAL_INFO,
-                    "timeout": self.config.get("timeout", 480)
+                    "repair_max_tokens": self.config.get("repair_max_tokens", 2000),
                 },
-                 node_name="RegenerateAnswer"
+                node_name="RepairAnswer"
             )
-            nodes = [fetch_node, parse_node, generate_answer_node, cond_node, regen_node]
+            nodes = [fetch_node, parse_node, generate_answer_node, repair_answer_node]
             edges = [
                 (fetch_node, parse_node),
                 (parse_node, generate_answer_node),
-                (generate_answer_node, cond_node),
-                (cond_node, regen_node),
-                (cond_node, None),
-                (regen_node, None)
+                (generate_answer_node, repair_answer_node),
+                (repair_answer_node, None)
             ]
         else:
             nodes = [fetch_node, parse_node, generate_answer_node]
@@ -95,15 +83,64 @@ class SmartScraperGraph(AbstractGraph):
             entry_point=fetch_node,
             graph_name=self.__class__.__name__,
         )
-    def run(self) -> str:
+    def load_document(self) -> list:
+        """Runs only the Fetch and Parse nodes and returns the parsed document chunks."""
+        state = {self.input_key: self.source}
+        for node_name in ("Fetch", "Parse"):
+            state = self.graph._get_node_by_name(node_name).execute(state)
+        return state.get("parsed_doc", [])
+    def extract_packed(self, documents: List[dict]) -> List[Optional[dict]]:
+        """
+        Extracts the answers of several small documents (dicts with `source` and `content`)
+        in one LLM call. The PackedAnswer node runs as a graph with the settings of this
+        graph's GenerateAnswer node, so it uses the same model cascade and timeout.
+        """
+        generate_answer_node = self.graph._get_node_by_name("GenerateAnswer")
+        packed_answer_node = PackedAnswerNode(
+            input="user_prompt & documents",
+            output=["answers"],
+            node_config=dict(generate_answer_node.node_config),
+            node_name="PackedAnswer"
+        )
+        graph = BaseGraph(
+            nodes=[packed_answer_node],
+            edges=[(packed_answer_node, None)],
+            entry_point=packed_answer_node,
+            graph_name="PackedAnswerGraph",
+        )
+        state, _ = graph.execute({"user_prompt": self.prompt, "documents": documents})
+        return state.get("answers") or [None] * len(documents)
+    def run(self, on_node_complete: Optional[Callable] = None, parsed_doc: Optional[list] = None, answer: Optional[dict] = None) -> str:
+        """
+        Scrapes the source; with `parsed_doc` (already loaded chunks) fetching and parsing are
+        skipped. With an `answer` already extracted from them (e.g. by a packed extraction)
+        only the field repair runs, when enabled.
+        """
         self.input_key = "url" if self.source and self.source.startswith("http") else "local_dir"
         if not self.source:
              self.logger.error("SmartScraperGraph run called without a valid source.")
              return {"error": "Missing source URL/path"}
         inputs = {"user_prompt": self.prompt, self.input_key: self.source}
+        start_node = None
+        document_store = self.config.get("document_store")
         try:
-            self.final_state, self.execution_info = self.graph.execute(inputs)
+            if answer is not None:
+                if not self.config.get("reattempt", False):
+                    return answer
+                inputs.update({"parsed_doc": parsed_doc or [], "answer": answer})
+                start_node = "RepairAnswer"
+            elif parsed_doc is not None:
+                inputs["parsed_doc"] = parsed_doc
+                start_node = "GenerateAnswer"
+            elif document_store is not None:
+                inputs["parsed_doc"] = document_store.get_or_load(self.source, self.load_document)
+                start_node = "GenerateAnswer"
+            self.final_state, self.execution_info = self.graph.execute(inputs, start_node=start_node, on_node_complete=on_node_complete)
+            if self.config.get("adaptive_chunking"):
+                chunk_planner.observe(self.execution_info, self.graph._get_node_by_name("GenerateAnswer").get_model_tiers()[0].name)
             return self.final_state.get("answer", {"error": "No answer generated"})
+        except GraphInterruptedError:
+            raise
         except Exception as e:
              self.logger.exception(f"Error running SmartScraperGraph for source {self.source}: {e}")
              return {"error": f"Graph execution failed: {str(e)}"}
@@ -5,6 +5,8 @@ models_tokens = {
         "gemini-1.5-flash-latest": 1048576,
         "gemini-1.5-pro-latest": 1048576,
         "gemini-2.0-flash": 1048576,
+        "gemini-2.0-flash-lite": 1048576,
+        "gemini-2.5-flash-lite": 1048576,
         "gemini-2.5-flash": 1048576,
         "gemini-2.5-pro": 1048576,
         "models/embedding-001": 2048,
@@ -0,0 +1,7 @@
+from .cassette_chat_model import CassetteChatModel, with_cassette
+from .fake_chat_model import FakeChatModel
+__all__ = [
+    "CassetteChatModel",
+    "with_cassette",
+    "FakeChatModel",
+]
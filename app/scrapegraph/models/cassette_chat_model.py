@@ -0,0 +1,97 @@
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import BaseModel
+from ..utils.cassette import Cassette, active_cassette
+def _messages_key(messages: List[BaseMessage]) -> List[Any]:
+    return [[message.type, message.content] for message in messages]
+def _load_message(data: Optional[Dict[str, Any]]) -> Optional[BaseMessage]:
+    return messages_from_dict([data])[0] if data else None
+class CassetteChatModel(BaseChatModel):
+    """
+    Chat model recording the answers of `inner` into `cassette`, or replaying them from
+    it without calling any provider. Responses keep their token usage, so usage and cost
+    accounting work the same on replay.
+    """
+    model: str
+    temperature: Optional[float] = None
+    inner: Any = None
+    cassette: Any = None
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+    @property
+    def _model_key(self) -> str:
+        # Without the "models/" prefix Gemini adds, so cassettes match across providers.
+        return self.model.split("/")[-1]
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = Cassette.key("llm", self._model_key, self.temperature, stop, _messages_key(messages))
+        if self.cassette.replaying:
+            message = _load_message(self.cassette.replay(key)["message"])
+        else:
+            start_time = time.time()
+            try:
+                message = self.inner.invoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self.cassette.record_error(key, e, time.time() - start_time)
+                raise
+            self.cassette.record(key, {"message": message_to_dict(message)}, time.time() - start_time)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False, **kwargs: Any) -> Runnable:
+        is_model = isinstance(schema, type) and issubclass(schema, BaseModel)
+        schema_key = schema.model_json_schema() if is_model else schema
+        name = schema.__name__ if is_model else schema.get("title", "")
+        inner_structured = None if self.cassette.replaying else self.inner.with_structured_output(schema, include_raw=True, **kwargs)
+        def _structured(input: Any, config: Optional[RunnableConfig] = None) -> Any:
+            messages = self._convert_input(input).to_messages()
+            key = Cassette.key("llm_structured", self._model_key, self.temperature, schema_key, kwargs, _messages_key(messages))
+            if self.cassette.replaying:
+                recorded = self.cassette.replay(key)
+                parsed = recorded["parsed"]
+                response = {
+                    "raw": _load_message(recorded["raw"]),
+                    "parsed": schema.model_validate(parsed) if is_model and parsed is not None else parsed,
+                    "parsing_error": OutputParserException(recorded["parsing_error"]) if recorded["parsing_error"] else None,
+                }
+            else:
+                start_time = time.time()
+                try:
+                    response = inner_structured.invoke(messages, config)
+                except Exception as e:
+                    self.cassette.record_error(key, e, time.time() - start_time)
+                    raise
+                parsed = response.get("parsed")
+                self.cassette.record(key, {
+                    "raw": message_to_dict(response["raw"]) if response.get("raw") is not None else None,
+                    "parsed": parsed.model_dump(mode="json") if isinstance(parsed, BaseModel) else parsed,
+                    "parsing_error": str(response["parsing_error"]) if response.get("parsing_error") is not None else None,
+                }, time.time() - start_time)
+            if include_raw:
+                return response
+            if response["parsing_error"] is not None:
+                raise response["parsing_error"]
+            return response["parsed"]
+        return RunnableLambda(_structured, name=f"CassetteStructured[{name}]")
+def with_cassette(llm: Any) -> Any:
+    """Routes `llm` through the active cassette, if any; returns it unchanged otherwise."""
+    cassette = active_cassette()
+    if cassette is None:
+        return llm
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    return CassetteChatModel(
+        model=model,
+        temperature=getattr(llm, "temperature", None),
+        inner=None if cassette.replaying else llm,
+        cassette=cassette,
+    )
@@ -0,0 +1,81 @@
+import json
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import BaseModel, Field
+from ..utils.tokenizer import num_tokens_calculus
+FILLER_WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore".split()
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for the Gemini chat model, selected with the "fake" LLM provider for
+    benchmarks. Every call sleeps like a provider would: `latency_s` plus the prompt and
+    the answer at the configured token throughputs, and reports its token usage.
+    Structured output returns schema-valid synthetic values, or the canned value given
+    in `structured_responses` for the schema's name. Text calls answer with a JSON object
+    of filler text of about `completion_tokens` tokens.
+    """
+    model: str = "fake"
+    temperature: float = 0.0
+    latency_s: float = 0.5
+    input_tokens_per_s: float = 20000.0
+    output_tokens_per_s: float = 200.0
+    completion_tokens: int = 200
+    structured_responses: Dict[str, Any] = Field(default_factory=dict)
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+    def _filler(self, tokens: int) -> str:
+        return " ".join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(max(1, int(tokens * 0.75))))
+    def _reply(self, messages: List[BaseMessage], content: str) -> AIMessage:
+        prompt_tokens = num_tokens_calculus("\n".join(str(message.content) for message in messages))
+        completion_tokens = num_tokens_calculus(content)
+        time.sleep(self.latency_s + prompt_tokens / self.input_tokens_per_s + completion_tokens / self.output_tokens_per_s)
+        return AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        )
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        content = json.dumps({"answer": self._filler(self.completion_tokens)})
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, content))])
+    def _synthesize(self, node: Dict[str, Any], root: Dict[str, Any]) -> Any:
+        if "$ref" in node:
+            target = root
+            for part in node["$ref"].lstrip("#/").split("/"):
+                target = target[part]
+            return self._synthesize(target, root)
+        if "anyOf" in node:
+            variants = [variant for variant in node["anyOf"] if variant.get("type") != "null"]
+            return self._synthesize(variants[0], root) if variants else None
+        if "enum" in node:
+            return node["enum"][0]
+        node_type = node.get("type", "string")
+        if isinstance(node_type, list):
+            node_type = next((item for item in node_type if item != "null"), "null")
+        if node_type == "object":
+            return {name: self._synthesize(child, root) for name, child in node.get("properties", {}).items()}
+        if node_type == "array":
+            return [self._synthesize(node.get("items", {}), root) for _ in range(2)]
+        return {"integer": 1, "number": 1.0, "boolean": True, "null": None}.get(node_type, self._filler(16))
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False, **kwargs: Any) -> Runnable:
+        is_model = isinstance(schema, type) and issubclass(schema, BaseModel)
+        json_schema = schema.model_json_schema() if is_model else schema
+        name = schema.__name__ if is_model else json_schema.get("title", "")
+        def _structured(input: Any, config: Optional[RunnableConfig] = None) -> Any:
+            messages = self._convert_input(input).to_messages()
+            value = self.structured_responses.get(name)
+            if value is None:
+                value = self._synthesize(json_schema, json_schema)
+            raw = self._reply(messages, json.dumps(value))
+            parsed = schema.model_validate(value) if is_model else value
+            return {"raw": raw, "parsed": parsed, "parsing_error": None} if include_raw else parsed
+        return RunnableLambda(_structured, name=f"FakeStructured[{name}]")
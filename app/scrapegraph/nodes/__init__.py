@@ -6,6 +6,9 @@ from .generate_answer_node import GenerateAnswerNode
 from .merge_answers_node import MergeAnswersNode
 from .graph_iterator_node import GraphIteratorNode
 from .conditional_node import ConditionalNode
+from .query_decomposition_node import QueryDecompositionNode
+from .repair_answer_node import RepairAnswerNode
+from .packed_answer_node import PackedAnswerNode
 __all__ = [
     "BaseNode",
     "FetchNode",
@@ -15,4 +18,7 @@ __all__ = [
     "MergeAnswersNode",
     "GraphIteratorNode",
     "ConditionalNode",
+    "QueryDecompositionNode",
+    "RepairAnswerNode",
+    "PackedAnswerNode",
 ]
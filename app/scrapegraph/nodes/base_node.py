@@ -1,9 +1,15 @@
 import re
+import time
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from ..utils.logging import get_logger
+from ..utils.domain_quality import DomainQualityStore, get_domain_quality_store
+from ..utils.model_routing import ModelTier, routing_stats, select_tiers
+from ..utils.usage_ledger import llm_retry
 from langchain_core.callbacks import BaseCallbackHandler
 
+class GraphInterruptedError(Exception):
+    """Raised by an `on_node_complete` callback to stop a graph run between nodes; it is not a node failure."""
 class BaseNode(ABC):
     def __init__(
         self,
@@ -20,6 +26,7 @@ class BaseNode(ABC):
         self.min_input_len = min_input_len
         self.node_config = node_config if node_config is not None else {}
         self.logger = get_logger(__name__)
+        self.exec_metrics: Dict[str, Any] = {}
         if node_type not in ["node", "conditional_node"]:
             raise ValueError(
                 f"node_type must be 'node' or 'conditional_node', got '{node_type}'"
@@ -28,6 +35,47 @@ class BaseNode(ABC):
         for key, value in self.node_config.items():
              if hasattr(self, key):
                  setattr(self, key, value)
+    def record_metric(self, key: str, value: Any) -> None:
+        """Records a node-specific metric that is added to this node's execution info."""
+        self.exec_metrics[key] = value
+    def increment_metric(self, key: str, amount: float = 1) -> None:
+        self.exec_metrics[key] = self.exec_metrics.get(key, 0) + amount
+    def get_model_tiers(self, input_tokens: int = 0) -> List[ModelTier]:
+        """Returns the routed model cascade able to take `input_tokens`, or just the node's model when it has no route."""
+        tiers = select_tiers(self.node_config.get("llm_cascade") or [], input_tokens)
+        if tiers:
+            return tiers
+        llm_model = getattr(self, "llm_model", None)
+        name = getattr(llm_model, "model", None) or getattr(llm_model, "model_name", None) or type(llm_model).__name__
+        return [ModelTier(name=name, llm=llm_model)]
+    def invoke_cascade(self, attempt: Callable[[Any], Tuple[Any, bool]], input_tokens: int = 0) -> Any:
+        """
+        Calls `attempt(llm_model)` with the cheapest suitable model first. `attempt` returns
+        `(result, output_failed)`; when the output failed JSON parsing or schema
+        validation the next, stronger tier is tried. Returns the last result.
+        """
+        tiers = self.get_model_tiers(input_tokens)
+        for index, tier in enumerate(tiers):
+            start_time = time.time()
+            with llm_retry(index > 0):
+                result, output_failed = attempt(tier.llm)
+            escalate = output_failed and index < len(tiers) - 1
+            routing_stats.record(self.node_name, tier.name, time.time() - start_time, escalate)
+            if not escalate:
+                break
+            self.logger.warning(f"Output of model '{tier.name}' was invalid, escalating to '{tiers[index + 1].name}'.")
+        if self.node_config.get("llm_cascade"):
+            self.record_metric("model", tier.name)
+            self.record_metric("escalations", index)
+        return result
+    def get_domain_quality_store(self) -> Optional[DomainQualityStore]:
+        """Returns the domain quality store configured through the `domain_quality` common param, if any."""
+        domain_quality = self.node_config.get("domain_quality") or {}
+        try:
+            return get_domain_quality_store(domain_quality.get("path"), domain_quality.get("half_life"))
+        except Exception as e:
+            self.logger.warning(f"Domain quality store unavailable: {e}")
+            return None
     @abstractmethod
     def execute(self, state: dict, callback_manager: Optional[BaseCallbackHandler] = None) -> dict:
         pass
@@ -1,8 +1,13 @@
+import time
 from typing import List, Optional
 from langchain_core.documents import Document
 from langchain_core.callbacks import BaseCallbackHandler
 from .base_node import BaseNode
 from ..docloaders import ChromiumLoader
+from ..utils.metrics import fetch_seconds, record_cache_lookup, stage_errors_total
+from ..utils.singleflight import fetch_flight
+from ..utils.tracing import start_span
+from ..utils.url_canonicalization import canonicalize_url
 class FetchNode(BaseNode):
     def __init__(
         self,
@@ -24,13 +29,24 @@ class FetchNode(BaseNode):
         if not source.startswith("http"):
             raise ValueError("FetchNode currently only supports HTTP/HTTPS URLs.")
         self.logger.info(f"--- (Fetching HTML from: {source}) ---")
+        start_time = time.time()
         try:
             loader = ChromiumLoader(
                 [source],
                 headless=self.headless,
                 **self.loader_kwargs,
             )
-            document = loader.load()
+            with start_span("browser fetch", {"source.url": source}) as span:
+                document, shared = fetch_flight.do(canonicalize_url(source), loader.load)
+                span.set_attributes({"fetch.shared": shared, "fetch.chars": len(document[0].page_content) if document else 0})
+            record_cache_lookup("fetch_inflight", shared)
+            if shared:
+                self.logger.info(f"Reused in-flight fetch of {source} started by another request.")
+            else:
+                fetch_seconds.labels("success" if document and document[0].page_content.strip() else "empty").observe(time.time() - start_time)
+            quality_store = self.get_domain_quality_store()
+            if quality_store and not shared:
+                quality_store.record_fetch(source, success=bool(document and document[0].page_content.strip()))
             if not document or not document[0].page_content.strip():
                  self.logger.warning(f"No content fetched from {source}.")
                  fetched_content = ""
@@ -46,6 +62,11 @@ class FetchNode(BaseNode):
                  state.update({self.output[1]: fetched_content})
         except Exception as e:
             self.logger.error(f"Failed to fetch content from {source}: {e}")
+            fetch_seconds.labels("failure").observe(time.time() - start_time)
+            stage_errors_total.labels("fetch").inc()
+            quality_store = self.get_domain_quality_store()
+            if quality_store:
+                quality_store.record_fetch(source, success=False)
             state.update({
                  self.output[0]: [Document(page_content="", metadata={"source": source, "error": str(e)})],
             })
@@ -1,20 +1,29 @@
 import json
 import re
 import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain.prompts import PromptTemplate
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
-from langchain_core.runnables import RunnableParallel
+from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableParallel, RunnablePassthrough
 from tqdm import tqdm
 from pydantic import ValidationError
 from ..prompts import (
     TEMPLATE_CHUNKS,
     TEMPLATE_MERGE,
     TEMPLATE_NO_CHUNKS,
+    FORMAT_INSTRUCTIONS_STRUCTURED,
 )
 from .base_node import BaseNode
+from ..utils.llm_scheduler import CRITICAL
 from ..utils.logging import get_logger
+from ..utils.output_parser import STRUCTURED_OUTPUT_ERRORS, output_mode_stats
+from ..utils.prompt_compaction import compact_results, compact_schema, compaction_stats
+from ..utils.schema_coverage import subset_model
+from ..utils.singleflight import coalesce_llm
+from ..utils.usage_ledger import llm_retry
+from ..utils.tokenizer import num_tokens_calculus
 class GenerateAnswerNode(BaseNode):
     def __init__(
         self,
@@ -64,9 +73,13 @@ class GenerateAnswerNode(BaseNode):
             return state
         output_parser = None
         format_instructions = ""
+        schema_compaction = None
         if self.schema:
             try:
                 schema_description = json.dumps(self.schema.model_json_schema(), indent=2)
+                if self.node_config.get("prompt_compaction"):
+                    schema_compaction = (schema_description, compact_schema(self.schema))
+                    schema_description = schema_compaction[1]
                 format_instructions = f"Format your response as a JSON object adhering to the following schema:\\n```json\\n{schema_description}\\n```"
                 output_parser = StrOutputParser()
             except Exception as e:
@@ -92,68 +105,181 @@ class GenerateAnswerNode(BaseNode):
         else:
              self.logger.warning(f"Unexpected document format: {type(doc)}. Attempting to process.")
              doc_content = str(doc)
-        final_answer = None
+        chunks = doc_content if isinstance(doc_content, list) else [doc_content]
+        chunk_tokens = [num_tokens_calculus(str(chunk)) for chunk in chunks]
+        self.record_metric("chunks", len(chunks))
+        self.record_metric("content_tokens", sum(chunk_tokens))
         try:
-            if isinstance(doc_content, str) or (isinstance(doc_content, list) and len(doc_content) == 1):
-                single_content = doc_content[0] if isinstance(doc_content, list) else doc_content
-                prompt = PromptTemplate(
-                    template=template_no_chunks_prompt,
-                    input_variables=["question", "context"],
-                    partial_variables={"format_instructions": format_instructions},
-                )
-                chain = prompt | self.llm_model | output_parser
-                response_content = self._invoke_with_timeout(
-                    chain, {"question": user_prompt, "context": single_content}, self.timeout
-                )
-                final_answer = response_content
-            elif isinstance(doc_content, list) and len(doc_content) > 1:
-                chains_dict = {}
-                for i, chunk in enumerate(tqdm(doc_content, desc="Processing chunks", disable=not self.verbose)):
-                    prompt = PromptTemplate(
-                        template=template_chunks_prompt,
-                        input_variables=["question", "context"],
-                        partial_variables={
-                            "chunk_id": i + 1,
-                            "format_instructions": format_instructions,
-                        },
-                    )
-                    chain_name = f"chunk_{i+1}"
-                    chains_dict[chain_name] = prompt | self.llm_model | output_parser
-                map_chain = RunnableParallel(**chains_dict)
-                batch_results = self._invoke_with_timeout(
-                    map_chain, {"question": user_prompt, "context": ""}, self.timeout
-                )
-                merge_prompt = PromptTemplate(
-                    template=template_merge_prompt,
-                    input_variables=["question", "context"],
-                    partial_variables={"format_instructions": format_instructions},
-                )
-                merge_chain = merge_prompt | self.llm_model | output_parser
-                merge_context = "\\n---\\n".join([str(res) for res in batch_results.values()])
-                final_answer = self._invoke_with_timeout(
-                    merge_chain, {"question": user_prompt, "context": merge_context}, self.timeout
-                )
+            answer = self.invoke_cascade(
+                lambda llm_model: self._generate_answer(
+                    llm_model, user_prompt, doc_content, output_parser, format_instructions,
+                    template_no_chunks_prompt, template_chunks_prompt, template_merge_prompt, sum(chunk_tokens),
+                ),
+                max(chunk_tokens),
+            )
         except Exception as e:
             self.logger.error(f"Failed to generate answer: {e}")
             state.update({self.output[0]: {"error": f"Answer generation failed: {str(e)}", "raw_response": None}})
             return state
+        if schema_compaction and self.exec_metrics.get("output_mode") == "text":
+            # Counted once for the prompts of the answer returned, however many tiers were tried.
+            calls = len(chunks) + 1 if len(chunks) > 1 else 1
+            self.increment_metric("compaction_tokens_saved", compaction_stats.record("schema", *schema_compaction, prompts=calls))
+        state.update({self.output[0]: answer})
+        quality_store = self.get_domain_quality_store()
+        if quality_store and state.get("url"):
+            answer = state.get(self.output[0])
+            quality_store.record_extraction(state["url"], valid=isinstance(answer, dict) and "error" not in answer)
+        return state
+    def _generate_answer(
+        self,
+        llm_model,
+        user_prompt: str,
+        doc_content,
+        output_parser,
+        format_instructions: str,
+        template_no_chunks_prompt: str,
+        template_chunks_prompt: str,
+        template_merge_prompt: str,
+        content_tokens: int = 0,
+    ) -> Tuple[dict, bool]:
+        """
+        Generates and validates the answer with `llm_model`; the flag is True when the
+        output failed parsing or validation. With `structured_output` every LLM step uses
+        the model's native schema-constrained output, and a step whose response does not
+        parse is redone alone in text mode; the other chunk answers are kept.
+        """
+        calls = len(doc_content) + 1 if isinstance(doc_content, list) and len(doc_content) > 1 else 1
+        structured = bool(self.node_config.get("structured_output")) and self.schema is not None
+        if structured:
+            prompt_tokens = content_tokens + calls * num_tokens_calculus(FORMAT_INSTRUCTIONS_STRUCTURED)
+        else:
+            prompt_tokens = content_tokens + calls * num_tokens_calculus(format_instructions)
+        fallbacks = self.exec_metrics.get("structured_output_fallbacks", 0)
+        answer, output_failed = self._generate_validated_answer(
+            llm_model, user_prompt, doc_content, output_parser, format_instructions,
+            template_no_chunks_prompt, template_chunks_prompt, template_merge_prompt,
+            schema=self.schema if structured else None,
+        )
+        mode = "structured" if structured else "text"
+        fallbacks = self.exec_metrics.get("structured_output_fallbacks", 0) - fallbacks
+        output_mode_stats.record(mode, prompt_tokens, failed=output_failed or fallbacks > 0, retried=fallbacks > 0)
+        self.record_metric("output_mode", mode)
+        self.record_metric("prompt_tokens_estimate", prompt_tokens)
+        return answer, output_failed
+    def _generate_validated_answer(
+        self,
+        llm_model,
+        user_prompt: str,
+        doc_content,
+        output_parser,
+        format_instructions: str,
+        template_no_chunks_prompt: str,
+        template_chunks_prompt: str,
+        template_merge_prompt: str,
+        schema=None,
+    ) -> Tuple[dict, bool]:
+        try:
+            final_answer = self._invoke_chains(
+                llm_model, user_prompt, doc_content, output_parser, format_instructions,
+                template_no_chunks_prompt, template_chunks_prompt, template_merge_prompt, schema=schema,
+            )
+        except OutputParserException as e:
+            self.logger.error(f"Failed to parse LLM JSON response: {e}")
+            return {"error": "Failed to parse LLM JSON response", "raw_response": getattr(e, "llm_output", None)}, True
         if self.schema and isinstance(final_answer, str):
             try:
                 cleaned_json_str = re.sub(r"^```json\n|```$", "", final_answer, flags=re.DOTALL).strip()
                 parsed_answer = json.loads(cleaned_json_str)
                 validated_answer = self.schema(**parsed_answer).model_dump()
-                state.update({self.output[0]: validated_answer})
+                return validated_answer, False
             except json.JSONDecodeError as e:
-                self.logger.error(f"Failed to parse LLM JSON response: {e}\\nRaw response: {final_answer}")
-                state.update({self.output[0]: {"error": "Failed to parse LLM JSON response", "raw_response": final_answer}})
+                self.logger.error(f"Failed to parse LLM JSON response: {e}\nRaw response: {final_answer}")
+                return {"error": "Failed to parse LLM JSON response", "raw_response": final_answer}, True
             except ValidationError as e:
-                 self.logger.error(f"LLM response failed Pydantic validation: {e}\\nParsed JSON: {parsed_answer}")
-                 state.update({self.output[0]: {"error": "LLM response failed schema validation", "parsed_json": parsed_answer}})
+                 self.logger.error(f"LLM response failed Pydantic validation: {e}\nParsed JSON: {parsed_answer}")
+                 return {"error": "LLM response failed schema validation", "parsed_json": parsed_answer}, True
             except Exception as e:
                  self.logger.error(f"Unexpected error during answer post-processing: {e}")
-                 state.update({self.output[0]: {"error": "Answer post-processing failed", "raw_response": final_answer}})
+                 return {"error": "Answer post-processing failed", "raw_response": final_answer}, False
         elif isinstance(final_answer, dict):
-             state.update({self.output[0]: final_answer})
+             return final_answer, False
         else:
-             state.update({self.output[0]: {"answer": str(final_answer)} if final_answer is not None else {"error": "No answer generated"}})
-        return state
+             return ({"answer": str(final_answer)} if final_answer is not None else {"error": "No answer generated"}), False
+    def _llm_step(self, llm_model, template: str, partial_variables: dict, output_parser, format_instructions: str, schema=None, priority=None):
+        """
+        Builds one LLM step of the extraction. With a `schema` the step answers through the
+        model's structured output and, when that response does not parse, redoes only this
+        step in text mode; other errors propagate.
+        """
+        def chain(instructions: str, llm, parser):
+            prompt = PromptTemplate(
+                template=template,
+                input_variables=["question", "context"],
+                partial_variables={**partial_variables, "format_instructions": instructions},
+            )
+            return prompt | llm | parser
+        text_chain = chain(format_instructions, coalesce_llm(llm_model, priority=priority), output_parser)
+        if schema is None:
+            return text_chain
+        structured_chain = chain(FORMAT_INSTRUCTIONS_STRUCTURED, coalesce_llm(llm_model, schema=schema, priority=priority), RunnablePassthrough())
+        def invoke(inputs: dict, config: RunnableConfig):
+            try:
+                return structured_chain.invoke(inputs, config)
+            except STRUCTURED_OUTPUT_ERRORS as e:
+                self.increment_metric("structured_output_fallbacks")
+                self.logger.warning(f"Structured output failed, redoing this step in text mode: {e}")
+                with llm_retry():
+                    return text_chain.invoke(inputs, config)
+        return RunnableLambda(invoke)
+    def _invoke_chains(
+        self,
+        llm_model,
+        user_prompt: str,
+        doc_content,
+        output_parser,
+        format_instructions: str,
+        template_no_chunks_prompt: str,
+        template_chunks_prompt: str,
+        template_merge_prompt: str,
+        schema=None,
+    ):
+        final_answer = None
+        if isinstance(doc_content, str) or (isinstance(doc_content, list) and len(doc_content) == 1):
+            single_content = doc_content[0] if isinstance(doc_content, list) else doc_content
+            chain = self._llm_step(llm_model, template_no_chunks_prompt, {}, output_parser, format_instructions, schema=schema)
+            response_content = self._invoke_with_timeout(
+                chain, {"question": user_prompt, "context": single_content}, self.timeout
+            )
+            final_answer = response_content
+        elif isinstance(doc_content, list) and len(doc_content) > 1:
+            chains_dict = {}
+            # Chunks hold only part of the page, so their structured answers may leave fields empty.
+            chunk_schema = subset_model(schema, schema.model_fields) if schema is not None else None
+            for i, chunk in enumerate(tqdm(doc_content, desc="Processing chunks", disable=not self.verbose)):
+                chain_name = f"chunk_{i+1}"
+                step = self._llm_step(llm_model, template_chunks_prompt, {"chunk_id": i + 1}, output_parser, format_instructions, schema=chunk_schema)
+                # Each chunk step gets its own chunk as context.
+                chains_dict[chain_name] = RunnableLambda(lambda inputs, chunk=chunk: {**inputs, "context": chunk}) | step
+            map_chain = RunnableParallel(**chains_dict)
+            batch_results = self._invoke_with_timeout(
+                map_chain, {"question": user_prompt, "context": ""}, self.timeout
+            )
+            merge_chain = self._llm_step(llm_model, template_merge_prompt, {}, output_parser, format_instructions, schema=schema, priority=CRITICAL)
+            merge_context = "\n---\n".join([str(res) for res in batch_results.values()])
+            if self.node_config.get("prompt_compaction"):
+                compacted = compact_results([self._parse_chunk_result(res) for res in batch_results.values()], label="Chunk")
+                self.increment_metric("compaction_tokens_saved", compaction_stats.record("chunk_results", merge_context, compacted))
+                merge_context = compacted
+            final_answer = self._invoke_with_timeout(
+                merge_chain, {"question": user_prompt, "context": merge_context}, self.timeout
+            )
+        return final_answer
+    def _parse_chunk_result(self, result):
+        """Chunk answers of the text mode are JSON strings; parses them so they can be compacted."""
+        if not isinstance(result, str):
+            return result
+        try:
+            return json.loads(re.sub(r"^```(json)?\s*|\s*```$", "", result.strip()))
+        except json.JSONDecodeError:
+            return result
@@ -1,12 +1,25 @@
 import asyncio
-from typing import List, Optional, Type
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Type
 from pydantic import BaseModel
 from tqdm.asyncio import tqdm
 import traceback
 from langchain_core.callbacks import BaseCallbackHandler
-from .base_node import BaseNode
+from .base_node import BaseNode, GraphInterruptedError
+from ..utils.llm_scheduler import CRITICAL, PriorityHint, llm_priority
 from ..utils.logging import get_logger
+from ..utils.packing import DocumentPacker
+from ..utils.schema_coverage import combined_coverage, conflicting_fields
+from ..utils.tokenizer import num_tokens_calculus
 DEFAULT_BATCHSIZE = 16
+DEFAULT_INITIAL_WAVE = 2
+DEFAULT_PACK_MAX_TOKENS = 12000
+DEFAULT_CANCEL_GRACE = 1.0
+class SubgraphCancelledError(GraphInterruptedError):
+    pass
 class GraphIteratorNode(BaseNode):
     def __init__(
         self,
@@ -54,34 +67,239 @@ class GraphIteratorNode(BaseNode):
             raise ValueError("graph_instance class is required in node_config.")
         if not scraper_config:
             raise ValueError("scraper_config is required in node_config.")
-        semaphore = asyncio.Semaphore(batchsize)
-        tasks = []
-        for i, item in enumerate(input_list):
-            instance_config = scraper_config.copy()
-            instance_config["instance_id"] = i
-            instance_config["graph_depth"] = instance_config.get("graph_depth", 0) + 1
-            graph = graph_instance_class(
-                prompt=user_prompt,
-                source=item,
-                config=instance_config,
-                schema=self.schema
+        if self.node_config.get("adaptive", False) and self.schema is not None:
+            results = await self._adaptive_execute(user_prompt, input_list, graph_instance_class, scraper_config, batchsize)
+        elif self.node_config.get("pack_documents", False):
+            results = await self._packed_execute(user_prompt, input_list, graph_instance_class, scraper_config, batchsize)
+        else:
+            semaphore = asyncio.Semaphore(batchsize)
+            outstanding = {i: PriorityHint() for i in range(len(input_list))}
+            tasks = []
+            for i, item in enumerate(input_list):
+                graph = self._create_graph_instance(graph_instance_class, scraper_config, user_prompt, item, i)
+                tasks.append(self._run_graph_instance(graph, item, semaphore, outstanding=outstanding, index=i))
+            results = await tqdm.gather(
+                *tasks, desc="Processing graph instances", disable=not self.verbose
             )
-            tasks.append(self._run_graph_instance(graph, item, semaphore))
-        results = await tqdm.gather(
-            *tasks, desc="Processing graph instances", disable=not self.verbose
-        )
+            self.record_metric("pages_processed", len(input_list))
         valid_results = [res for res in results if res is not None]
         state.update({self.output[0]: valid_results})
         self.logger.info(f"--- Finished parallel graph execution. Got {len(valid_results)} results. ---")
         return state
-    async def _run_graph_instance(self, graph_instance, item_source, semaphore):
+    def _finish_source(self, outstanding: dict, index: Optional[int] = None, all_dispatched: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Marks a source as done; the LLM calls of the last outstanding one become critical-path
+        calls. With `all_dispatched`, only once it reports that no other source can still start.
+        """
+        outstanding.pop(index, None)
+        if len(outstanding) == 1 and (all_dispatched is None or all_dispatched()):
+            last_index, hint = next(iter(outstanding.items()))
+            hint.priority = CRITICAL
+            self.logger.debug(f"Source {last_index} is the last outstanding one, raising its LLM priority.")
+    def _create_graph_instance(self, graph_instance_class, scraper_config: dict, user_prompt: str, item: Any, index: int):
+        instance_config = scraper_config.copy()
+        instance_config["instance_id"] = index
+        instance_config["graph_depth"] = instance_config.get("graph_depth", 0) + 1
+        return graph_instance_class(
+            prompt=user_prompt,
+            source=item,
+            config=instance_config,
+            schema=self.schema
+        )
+    async def _adaptive_execute(self, user_prompt: str, input_list: list, graph_instance_class, scraper_config: dict, batchsize: int) -> list:
+        """
+        Processes the sources in waves: starts with `initial_wave` sources and launches the
+        next one only while schema fields are missing or the sources disagree on them.
+        Once the combined answers reach `coverage_threshold` the remaining sources are
+        skipped and the sub-graphs still running are cancelled before their extraction step.
+        Sub-graphs still running after `cancel_grace` seconds are abandoned: they stop at
+        their next node boundary in the background and their results are dropped.
+        """
+        initial_wave = max(1, min(self.node_config.get("initial_wave", DEFAULT_INITIAL_WAVE), batchsize))
+        coverage_threshold = self.node_config.get("coverage_threshold", 1.0)
+        cancel_grace = self.node_config.get("cancel_grace", DEFAULT_CANCEL_GRACE)
+        cancel_event = threading.Event()
+        # Priority hints of the launched sources that are still running.
+        hints = {}
+        answered = set()
+        results = {}
+        running = {}
+        next_index = 0
+        # Sub-graphs run on their own pool so abandoned ones do not hold up the event loop's shutdown.
+        executor = ThreadPoolExecutor(max_workers=batchsize, thread_name_prefix="adaptive-subgraph")
+        loop = asyncio.get_running_loop()
+        def on_node_complete(index: int):
+            def callback(node_name: str, node_info: dict, state: dict, next_node: Optional[str]) -> None:
+                if node_name == "GenerateAnswer":
+                    answered.add(index)
+                if cancel_event.is_set() and next_node and index not in answered:
+                    raise SubgraphCancelledError(f"Sub-graph {index} cancelled, the schema is already covered.")
+            return callback
+        def launch() -> None:
+            nonlocal next_index
+            index = next_index
+            graph = self._create_graph_instance(graph_instance_class, scraper_config, user_prompt, input_list[index], index)
+            hints[index] = PriorityHint()
+            with llm_priority(hints[index]):
+                context = contextvars.copy_context()
+            run = functools.partial(context.run, graph.run, on_node_complete=on_node_complete(index))
+            running[loop.run_in_executor(executor, run)] = index
+            next_index += 1
+        try:
+            while next_index < len(input_list) and len(running) < initial_wave:
+                launch()
+            coverage = 0.0
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = running.pop(task)
+                    hints.pop(index, None)
+                    try:
+                        results[index] = task.result()
+                    except Exception as e:
+                        self.logger.error(f"Error running graph instance for {input_list[index]}: {e}")
+                        results[index] = {"error": f"Failed to process source {input_list[index]}: {str(e)}"}
+                answers = [results[index] for index in sorted(results)]
+                coverage = combined_coverage(answers, self.schema)
+                conflicts = conflicting_fields(answers, self.schema)
+                if coverage >= coverage_threshold and not conflicts:
+                    if running or next_index < len(input_list):
+                        self.logger.info(f"Schema coverage {coverage:.0%} reached after {len(results)} source(s), skipping the remaining {len(input_list) - len(results)}.")
+                    break
+                while next_index < len(input_list) and len(running) < batchsize and len(running) < initial_wave:
+                    launch()
+                if next_index == len(input_list):
+                    self._finish_source(hints)
+            cancelled = 0
+            if running:
+                cancel_event.set()
+                done, pending = await asyncio.wait(running, timeout=cancel_grace) if cancel_grace > 0 else (set(), set(running))
+                for task in done:
+                    index = running[task]
+                    result = None if task.exception() else task.result()
+                    if index in answered and isinstance(result, dict) and "error" not in result:
+                        results[index] = result
+                    else:
+                        cancelled += 1
+                for task in pending:
+                    # The thread keeps running until its next node boundary; its result is discarded.
+                    task.cancel()
+                cancelled += len(pending)
+                if pending:
+                    self.logger.info(f"Abandoned {len(pending)} sub-graph(s) still running after the {cancel_grace}s cancellation grace period.")
+        finally:
+            executor.shutdown(wait=False)
+        processed = sorted(results)
+        self.record_metric("pages_processed", len(processed))
+        self.record_metric("pages_skipped", len(input_list) - len(processed))
+        self.record_metric("llm_calls_saved", len(input_list) - next_index + cancelled)
+        self.record_metric("field_coverage", round(coverage, 3))
+        return [results[index] for index in processed]
+    async def _packed_execute(self, user_prompt: str, input_list: list, graph_instance_class, scraper_config: dict, batchsize: int) -> list:
+        """
+        Packs the documents that fit in `pack_max_tokens` into batches as they are loaded;
+        each full batch is extracted with one LLM call while the other sources still load.
+        Packed extraction runs as a graph node with the model cascade and timeout of the
+        sources' GenerateAnswer node, and field repair then runs per source. Larger documents,
+        and the sources a packed response left unanswered, go through their own sub-graph.
+        """
+        max_tokens = self.node_config.get("pack_max_tokens", DEFAULT_PACK_MAX_TOKENS)
+        semaphore = asyncio.Semaphore(batchsize)
+        graphs = [self._create_graph_instance(graph_instance_class, scraper_config, user_prompt, item, i) for i, item in enumerate(input_list)]
+        packer = DocumentPacker(max_tokens)
+        documents = [None] * len(input_list)
+        results = [None] * len(input_list)
+        outstanding = {}
+        tasks = []
+        batches = []
+        packed = []
+        # Sources still loading, in the packer or in a packed extraction are not outstanding yet,
+        # so the last outstanding source is only on the critical path once none of them is left.
+        dispatching = {"flushed": False, "packs": 0}
+        def all_dispatched() -> bool:
+            return dispatching["flushed"] and not dispatching["packs"]
+        def run_source(i: int, answer: Optional[dict] = None) -> None:
+            outstanding[i] = PriorityHint()
+            async def run() -> None:
+                results[i] = await self._run_graph_instance(graphs[i], input_list[i], semaphore, parsed_doc=documents[i], outstanding=outstanding, index=i, answer=answer, all_dispatched=all_dispatched)
+            tasks.append(asyncio.ensure_future(run()))
+        async def extract_batch(batch: List[int]) -> None:
+            try:
+                async with semaphore:
+                    answers = await asyncio.to_thread(self._extract_pack, graphs[batch[0]], [{"source": input_list[i], "content": documents[i]} for i in batch])
+                for i, answer in zip(batch, answers):
+                    if answer is not None:
+                        packed.append(i)
+                    run_source(i, answer)
+            finally:
+                dispatching["packs"] -= 1
+                self._finish_source(outstanding, all_dispatched=all_dispatched)
+        def dispatch(batch: List[int]) -> None:
+            if len(batch) == 1:
+                run_source(batch[0])
+                return
+            batches.append(batch)
+            dispatching["packs"] += 1
+            tasks.append(asyncio.ensure_future(extract_batch(batch)))
+        loading = {asyncio.ensure_future(self._load_document(graph, scraper_config, semaphore)): i for i, graph in enumerate(graphs)}
+        while loading:
+            done, _ = await asyncio.wait(loading, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = loading.pop(task)
+                documents[i] = task.result()
+                size = sum(num_tokens_calculus(str(chunk)) for chunk in documents[i]) if documents[i] else 0
+                if not packer.fits(size):
+                    run_source(i)
+                    continue
+                for batch in packer.add(i, size):
+                    dispatch(batch)
+        for batch in packer.flush():
+            dispatch(batch)
+        dispatching["flushed"] = True
+        self._finish_source(outstanding, all_dispatched=all_dispatched)
+        # Packed extractions add the per-source runs that follow them, so wait until none are left.
+        while not all(task.done() for task in tasks):
+            await asyncio.wait([task for task in tasks if not task.done()])
+        if batches:
+            self.logger.info(f"Extracted {len(packed)} source(s) in {len(batches)} packed call(s), {len(input_list) - len(packed)} extracted individually.")
+        self.record_metric("pages_processed", len(input_list))
+        self.record_metric("pages_packed", len(packed))
+        self.record_metric("packed_batches", len(batches))
+        self.record_metric("llm_calls_saved", max(len(packed) - len(batches), 0))
+        return results
+    def _extract_pack(self, graph_instance, documents: List[dict]) -> List[Optional[dict]]:
+        try:
+            return graph_instance.extract_packed(documents)
+        except Exception as e:
+            self.logger.error(f"Packed extraction of {len(documents)} sources failed: {e}")
+            return [None] * len(documents)
+    async def _load_document(self, graph_instance, scraper_config: dict, semaphore) -> list:
+        async with semaphore:
+            try:
+                document_store = scraper_config.get("document_store")
+                if document_store is not None:
+                    return await asyncio.to_thread(document_store.get_or_load, graph_instance.source, graph_instance.load_document)
+                return await asyncio.to_thread(graph_instance.load_document)
+            except Exception as e:
+                self.logger.error(f"Error loading document for {graph_instance.source}: {e}")
+                return []
+    async def _run_graph_instance(self, graph_instance, item_source, semaphore, parsed_doc: Optional[list] = None, outstanding: Optional[dict] = None, index: Optional[int] = None, answer: Optional[dict] = None, all_dispatched: Optional[Callable[[], bool]] = None):
         async with semaphore:
             self.logger.debug(f"Running graph instance for: {item_source}")
             try:
-                result = await asyncio.to_thread(graph_instance.run)
+                with llm_priority(outstanding[index] if outstanding is not None else None):
+                    if answer is not None:
+                        result = await asyncio.to_thread(graph_instance.run, parsed_doc=parsed_doc, answer=answer)
+                    elif parsed_doc is not None:
+                        result = await asyncio.to_thread(graph_instance.run, parsed_doc=parsed_doc)
+                    else:
+                        result = await asyncio.to_thread(graph_instance.run)
                 self.logger.debug(f"Graph instance for {item_source} completed.")
                 return result
             except Exception as e:
                 self.logger.error(f"Error running graph instance for {item_source}: {e}")
                 self.logger.debug(traceback.format_exc())
                 return {"error": f"Failed to process source {item_source}: {str(e)}"}
+            finally:
+                if outstanding is not None:
+                    self._finish_source(outstanding, index, all_dispatched)
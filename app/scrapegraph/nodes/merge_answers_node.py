@@ -1,13 +1,20 @@
 import json
 import re
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from langchain.prompts import PromptTemplate
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain_core.callbacks import BaseCallbackHandler
 from pydantic import ValidationError
-from ..prompts import TEMPLATE_COMBINED
+from ..prompts import TEMPLATE_COMBINED, MERGE_FORMAT_INSTRUCTIONS_STRUCTURED
 from .base_node import BaseNode
+from ..utils.llm_scheduler import CRITICAL
 from ..utils.logging import get_logger
+from ..utils.output_parser import STRUCTURED_OUTPUT_ERRORS, output_mode_stats
+from ..utils.prompt_compaction import compact_results, compact_schema, compaction_stats
+from ..utils.singleflight import coalesce_llm
+from ..utils.usage_ledger import llm_retry
+from ..utils.tokenizer import num_tokens_calculus
 class MergeAnswersNode(BaseNode):
     def __init__(
         self,
@@ -51,11 +58,19 @@ class MergeAnswersNode(BaseNode):
              results_str += f"--- Source {i+1} Result ---\\n"
              results_str += json.dumps(res, indent=2)
              results_str += "\\n\\n"
+        if self.node_config.get("prompt_compaction"):
+            compacted = compact_results(valid_results)
+            self.increment_metric("compaction_tokens_saved", compaction_stats.record("merge_results", results_str, compacted))
+            results_str = compacted
         output_parser = None
         format_instructions = ""
+        schema_compaction = None
         if self.schema:
             try:
                 schema_description = json.dumps(self.schema.model_json_schema(), indent=2)
+                if self.node_config.get("prompt_compaction"):
+                    schema_compaction = (schema_description, compact_schema(self.schema))
+                    schema_description = schema_compaction[1]
                 format_instructions = f"Merge the provided results into a single JSON object adhering to the following schema. Ensure comprehensive coverage and eliminate redundancy:\\n```json\\n{schema_description}\\n```"
                 output_parser = StrOutputParser()
             except Exception as e:
@@ -70,37 +85,81 @@ class MergeAnswersNode(BaseNode):
             input_variables=["user_prompt", "website_content"],
             partial_variables={"format_instructions": format_instructions},
         )
-        merge_chain = prompt_template | self.llm_model | output_parser
-        final_answer = None
         try:
-            final_answer = merge_chain.invoke(
-                {"user_prompt": user_prompt, "website_content": results_str},
-                config={"callbacks": [callback_manager]} if callback_manager else {}
+            answer = self.invoke_cascade(
+                lambda llm_model: self._merge(llm_model, prompt_template, output_parser, user_prompt, results_str, callback_manager),
+                num_tokens_calculus(results_str),
             )
         except Exception as e:
             self.logger.error(f"Failed to merge answers: {e}")
             state.update({self.output[0]: {"error": f"Answer merging failed: {str(e)}", "raw_response": None}})
             return state
+        if schema_compaction and self.exec_metrics.get("output_mode") == "text":
+            # Counted once for the merge prompt of the answer returned, however many tiers were tried.
+            self.increment_metric("compaction_tokens_saved", compaction_stats.record("schema", *schema_compaction))
+        state.update({self.output[0]: answer})
+        source_urls = state.get("urls", [])
+        if source_urls and isinstance(state.get(self.output[0]), dict):
+            state[self.output[0]]["sources"] = source_urls
+        return state
+    def _merge(self, llm_model, prompt_template, output_parser, user_prompt: str, results_str: str, callback_manager: Optional[BaseCallbackHandler] = None) -> Tuple[dict, bool]:
+        """
+        Merges the results with `llm_model`; the flag is True when the output failed parsing
+        or validation. With `structured_output` the model's native schema-constrained output
+        is tried first, falling back to the text mode when the response does not parse.
+        """
+        content_tokens = num_tokens_calculus(results_str)
+        retried = False
+        if self.node_config.get("structured_output") and self.schema is not None:
+            prompt_tokens = content_tokens + num_tokens_calculus(MERGE_FORMAT_INSTRUCTIONS_STRUCTURED)
+            structured_chain = prompt_template.partial(format_instructions=MERGE_FORMAT_INSTRUCTIONS_STRUCTURED) | coalesce_llm(llm_model, schema=self.schema, priority=CRITICAL)
+            try:
+                answer = structured_chain.invoke(
+                    {"user_prompt": user_prompt, "website_content": results_str},
+                    config={"callbacks": [callback_manager]} if callback_manager else {}
+                )
+                output_mode_stats.record("structured", prompt_tokens, failed=False)
+                self.record_metric("output_mode", "structured")
+                self.record_metric("prompt_tokens_estimate", prompt_tokens)
+                return answer, False
+            except STRUCTURED_OUTPUT_ERRORS as e:
+                output_mode_stats.record("structured", prompt_tokens, failed=True, retried=True)
+                self.increment_metric("structured_output_fallbacks")
+                self.logger.warning(f"Structured merge output failed, falling back to text output: {e}")
+                retried = True
+        prompt_tokens = content_tokens + num_tokens_calculus(prompt_template.partial_variables.get("format_instructions", ""))
+        with llm_retry(retried):
+            answer, output_failed = self._merge_text(llm_model, prompt_template, output_parser, user_prompt, results_str, callback_manager)
+        output_mode_stats.record("text", prompt_tokens, failed=output_failed)
+        self.record_metric("output_mode", "text")
+        self.record_metric("prompt_tokens_estimate", prompt_tokens)
+        return answer, output_failed
+    def _merge_text(self, llm_model, prompt_template, output_parser, user_prompt: str, results_str: str, callback_manager: Optional[BaseCallbackHandler] = None) -> Tuple[dict, bool]:
+        merge_chain = prompt_template | coalesce_llm(llm_model, priority=CRITICAL) | output_parser
+        try:
+            final_answer = merge_chain.invoke(
+                {"user_prompt": user_prompt, "website_content": results_str},
+                config={"callbacks": [callback_manager]} if callback_manager else {}
+            )
+        except OutputParserException as e:
+            self.logger.error(f"Failed to parse merged LLM JSON response: {e}")
+            return {"error": "Failed to parse merged LLM JSON response", "raw_response": getattr(e, "llm_output", None)}, True
         if self.schema and isinstance(final_answer, str):
             try:
                 cleaned_json_str = re.sub(r"^```json\n|```$", "", final_answer, flags=re.DOTALL).strip()
                 parsed_answer = json.loads(cleaned_json_str)
                 validated_answer = self.schema(**parsed_answer).model_dump()
-                state.update({self.output[0]: validated_answer})
+                return validated_answer, False
             except json.JSONDecodeError as e:
                 self.logger.error(f"Failed to parse merged LLM JSON response: {e}\\nRaw response: {final_answer}")
-                state.update({self.output[0]: {"error": "Failed to parse merged LLM JSON response", "raw_response": final_answer}})
+                return {"error": "Failed to parse merged LLM JSON response", "raw_response": final_answer}, True
             except ValidationError as e:
                  self.logger.error(f"Merged LLM response failed Pydantic validation: {e}\\nParsed JSON: {parsed_answer}")
-                 state.update({self.output[0]: {"error": "Merged response failed schema validation", "parsed_json": parsed_answer}})
+                 return {"error": "Merged response failed schema validation", "parsed_json": parsed_answer}, True
             except Exception as e:
                  self.logger.error(f"Unexpected error during merged answer post-processing: {e}")
-                 state.update({self.output[0]: {"error": "Merged answer post-processing failed", "raw_response": final_answer}})
+                 return {"error": "Merged answer post-processing failed", "raw_response": final_answer}, False
         elif isinstance(final_answer, dict):
-             state.update({self.output[0]: final_answer})
+             return final_answer, False
         else:
-             state.update({self.output[0]: {"answer": str(final_answer)} if final_answer is not None else {"error": "No merged answer generated"}})
-        source_urls = state.get("urls", [])
-        if source_urls and isinstance(state.get(self.output[0]), dict):
-            state[self.output[0]]["sources"] = source_urls
-        return state
+             return ({"answer": str(final_answer)} if final_answer is not None else {"error": "No merged answer generated"}), False
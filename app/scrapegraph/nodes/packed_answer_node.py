@@ -0,0 +1,162 @@
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+from langchain.prompts import PromptTemplate
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.output_parsers import StrOutputParser
+from pydantic import BaseModel, Field, ValidationError, create_model
+from ..prompts import TEMPLATE_PACKED, PACKED_FORMAT_INSTRUCTIONS_STRUCTURED
+from .base_node import BaseNode
+from ..utils.logging import get_logger
+from ..utils.output_parser import STRUCTURED_OUTPUT_ERRORS, output_mode_stats
+from ..utils.prompt_compaction import compact_schema
+from ..utils.schema_coverage import subset_model
+from ..utils.singleflight import coalesce_llm
+from ..utils.usage_ledger import llm_retry
+from ..utils.tokenizer import num_tokens_calculus
+from ..utils.url_canonicalization import canonicalize_url
+class PackedAnswerNode(BaseNode):
+    """
+    Extracts the answers of several small documents in one LLM call. Each document is
+    a dict with its `source` URL and `content` (text or chunks); the output is the list
+    of per-source answers in document order, with None for a source the response missed.
+    The call goes through the node's model cascade: a response answering none of the
+    sources is retried with the next tier.
+    """
+    def __init__(
+        self,
+        input: str,
+        output: List[str],
+        node_config: Optional[dict] = None,
+        node_name: str = "PackedAnswer",
+    ):
+        super().__init__(node_name, "node", input, output, 2, node_config)
+        self.llm_model = self.node_config.get("llm_model")
+        self.schema = self.node_config.get("schema")
+        self.timeout = self.node_config.get("timeout", 480)
+        self.logger = get_logger(__name__)
+    def execute(self, state: dict, callback_manager: Optional[BaseCallbackHandler] = None) -> dict:
+        self.logger.info(f"--- Executing {self.node_name} Node ---")
+        input_keys = self.get_input_keys(state)
+        user_prompt = state.get(input_keys[0])
+        documents = state.get(input_keys[1]) or []
+        if not documents:
+            state.update({self.output[0]: []})
+            return state
+        documents_str = self._format_documents(documents)
+        config = {"callbacks": [callback_manager]} if callback_manager else {}
+        inputs = {"question": user_prompt, "documents": documents_str}
+        content_tokens = num_tokens_calculus(documents_str)
+        try:
+            answers = self.invoke_cascade(lambda llm_model: self._extract(llm_model, documents, inputs, config, content_tokens), content_tokens)
+        except Exception as e:
+            self.logger.error(f"Packed extraction of {len(documents)} sources failed: {e}")
+            answers = [None] * len(documents)
+        self.record_metric("documents", len(documents))
+        self.record_metric("answered", sum(answer is not None for answer in answers))
+        state.update({self.output[0]: answers})
+        return state
+    def _extract(self, llm_model, documents: List[Dict[str, Any]], inputs: dict, config: dict, content_tokens: int) -> Tuple[List[Optional[dict]], bool]:
+        """
+        Extracts the per-source answers with `llm_model`; the flag is True when the response
+        answered none of the sources. With `structured_output` the model's native
+        schema-constrained output is tried first, falling back to the text mode when the
+        response does not parse.
+        """
+        entries = None
+        retried = False
+        if self.node_config.get("structured_output") and self.schema is not None:
+            prompt_tokens = content_tokens + num_tokens_calculus(PACKED_FORMAT_INSTRUCTIONS_STRUCTURED)
+            prompt = PromptTemplate(
+                template=TEMPLATE_PACKED,
+                input_variables=["question", "documents"],
+                partial_variables={"format_instructions": PACKED_FORMAT_INSTRUCTIONS_STRUCTURED},
+            )
+            try:
+                entries = self._invoke_with_timeout(prompt | coalesce_llm(llm_model, schema=self._packed_model()), inputs, config)["results"]
+                output_mode_stats.record("structured", prompt_tokens, failed=False)
+            except STRUCTURED_OUTPUT_ERRORS as e:
+                output_mode_stats.record("structured", prompt_tokens, failed=True, retried=True)
+                self.logger.warning(f"Structured packed extraction failed, falling back to text output: {e}")
+                retried = True
+        if entries is None:
+            format_instructions = self._text_format_instructions()
+            prompt_tokens = content_tokens + num_tokens_calculus(format_instructions)
+            prompt = PromptTemplate(
+                template=TEMPLATE_PACKED,
+                input_variables=["question", "documents"],
+                partial_variables={"format_instructions": format_instructions},
+            )
+            with llm_retry(retried):
+                response = self._invoke_with_timeout(prompt | coalesce_llm(llm_model) | StrOutputParser(), inputs, config)
+            try:
+                cleaned_json_str = re.sub(r"^```(json)?\s*|\s*```$", "", response.strip())
+                parsed = json.loads(cleaned_json_str)
+                entries = parsed.get("results", []) if isinstance(parsed, dict) else parsed
+                output_mode_stats.record("text", prompt_tokens, failed=False)
+            except (json.JSONDecodeError, AttributeError) as e:
+                output_mode_stats.record("text", prompt_tokens, failed=True)
+                self.logger.error(f"Failed to parse packed LLM JSON response: {e}")
+                entries = []
+        self.record_metric("prompt_tokens_estimate", prompt_tokens)
+        answers = self._match_answers(documents, entries)
+        return answers, not any(answer is not None for answer in answers)
+    def _invoke_with_timeout(self, chain, inputs: dict, config: dict):
+        start_time = time.time()
+        response = chain.invoke(inputs, config=config)
+        duration = time.time() - start_time
+        if duration > self.timeout:
+            self.logger.warning(f"LLM call exceeded timeout ({duration:.2f}s > {self.timeout}s)")
+        return response
+    def _format_documents(self, documents: List[Dict[str, Any]]) -> str:
+        blocks = []
+        for i, document in enumerate(documents):
+            content = document.get("content")
+            content = "\n".join(str(chunk) for chunk in content) if isinstance(content, list) else str(content)
+            blocks.append(f"=== SOURCE {i + 1}: {document['source']} ===\n{content}")
+        return "\n\n".join(blocks)
+    def _answer_model(self) -> Type[BaseModel]:
+        # A page may not cover every field, so the per-source answers leave all of them optional.
+        return subset_model(self.schema, self.schema.model_fields, model_name=f"{self.schema.__name__}PageAnswer")
+    def _packed_model(self) -> Type[BaseModel]:
+        source_answer = create_model(
+            f"{self.schema.__name__}SourceAnswer",
+            source=(str, Field(description="URL of the source the answer was extracted from")),
+            answer=(self._answer_model(), Field(description="Answer extracted from this source alone")),
+        )
+        return create_model(
+            f"{self.schema.__name__}PackedAnswers",
+            results=(List[source_answer], Field(description="One entry per source, in the order the sources were given")),
+        )
+    def _text_format_instructions(self) -> str:
+        if self.schema is None:
+            answer_format = "a JSON object with the information extracted from that source"
+        else:
+            answer_model = self._answer_model()
+            schema_description = compact_schema(answer_model) if self.node_config.get("prompt_compaction") else json.dumps(answer_model.model_json_schema())
+            answer_format = f"a JSON object adhering to this schema:\n{schema_description}\n"
+        return (
+            'Respond ONLY with a JSON object of the form {"results": [{"source": "<source URL>", "answer": <answer>}]} '
+            f"holding one entry per source, where each answer is {answer_format}"
+        )
+    def _match_answers(self, documents: List[Dict[str, Any]], entries: Any) -> List[Optional[dict]]:
+        """Maps the response entries back to the documents by source URL, validating each answer."""
+        positions = {canonicalize_url(document["source"]): i for i, document in enumerate(documents)}
+        answers: List[Optional[dict]] = [None] * len(documents)
+        answer_model = self._answer_model() if self.schema is not None else None
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict) or not isinstance(entry.get("answer"), dict):
+                continue
+            position = positions.get(canonicalize_url(str(entry.get("source", ""))))
+            if position is None or answers[position] is not None:
+                continue
+            answer = entry["answer"]
+            if answer_model is not None:
+                try:
+                    answer = answer_model(**answer).model_dump()
+                except ValidationError as e:
+                    self.logger.warning(f"Packed answer for {documents[position]['source']} failed validation: {e}")
+                    continue
+            answers[position] = answer
+        return answers
@@ -4,7 +4,11 @@ from urllib.parse import urljoin
 from langchain_community.document_transformers import Html2TextTransformer
 from langchain_core.callbacks import BaseCallbackHandler
 from ..helpers import default_filters
+from ..utils.chunk_planner import chunk_planner
+from ..utils.model_routing import select_tiers
 from ..utils.split_text_into_chunks import split_text_into_chunks
+from ..utils.tokenizer import num_tokens_calculus
+from ..utils.url_canonicalization import dedupe_urls
 from .base_node import BaseNode
 class ParseNode(BaseNode):
     url_pattern = re.compile(
@@ -46,12 +50,23 @@ class ParseNode(BaseNode):
                 parsed_text = ""
             else:
                 parsed_text = transformed_docs[0].page_content
+            parsed_tokens = num_tokens_calculus(parsed_text)
+            chunk_size = self.chunk_size
+            adaptive_chunking = self.node_config.get("adaptive_chunking")
+            if adaptive_chunking:
+                # Chunking is planned for the model the answer is extracted with.
+                answer_tiers = select_tiers(self.node_config.get("answer_cascade") or [], parsed_tokens) or self.get_model_tiers(parsed_tokens)
+                chunk_size = chunk_planner.plan(answer_tiers[0].name, parsed_tokens, self.chunk_size, **adaptive_chunking)
             chunks = split_text_into_chunks(
                 text=parsed_text,
-                chunk_size=self.chunk_size,
+                chunk_size=chunk_size,
                 use_semchunk=False
             )
+            self.record_metric("chunks", len(chunks))
             state.update({self.output[0]: chunks})
+            quality_store = self.get_domain_quality_store()
+            if quality_store and source_url:
+                quality_store.record_parse(source_url, parsed_tokens)
             if len(self.output) > 1:
                 link_urls, img_urls = self._extract_urls(parsed_text, source_url)
                 if self.output[1] == "link_urls":
@@ -96,12 +111,13 @@ class ParseNode(BaseNode):
             all_urls.add(urljoin(source, url))
             url = ""
 
-        all_urls = list(all_urls)
+        all_urls = sorted(all_urls)
         all_urls = self._clean_urls(all_urls)
         if not source.startswith("http"):
             all_urls = [url for url in all_urls if url.startswith("http")]
         else:
             all_urls = [urljoin(source, url) for url in all_urls]
+        all_urls = dedupe_urls(all_urls)
 
         images = [
             url
@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
+from ..prompts import TEMPLATE_QUERY_DECOMPOSITION
+from ..utils.logging import get_logger
+from ..utils.schema_coverage import schema_fields
+from ..utils.singleflight import coalesce_llm
+from .base_node import BaseNode
+DEFAULT_MAX_SUB_QUERIES = 4
+class QueryDecompositionNode(BaseNode):
+    """
+    Splits a compound research prompt into independent sub-queries, each answering a
+    subset of the schema fields. Produces a single sub-query with every field when the
+    prompt should not be split.
+    """
+    def __init__(
+        self,
+        input: str,
+        output: List[str],
+        node_config: Optional[dict] = None,
+        node_name: str = "QueryDecomposition",
+    ):
+        super().__init__(node_name, "node", input, output, 1, node_config)
+        self.llm_model = self.node_config.get("llm_model")
+        self.schema = self.node_config.get("schema")
+        self.max_sub_queries = self.node_config.get("max_sub_queries", DEFAULT_MAX_SUB_QUERIES)
+        self.logger = get_logger(__name__)
+    def execute(self, state: dict, callback_manager: Optional[BaseCallbackHandler] = None) -> dict:
+        self.logger.info(f"--- Executing {self.node_name} Node ---")
+        input_keys = self.get_input_keys(state)
+        user_prompt = state[input_keys[0]]
+        fields = schema_fields(self.schema)
+        plan = None
+        if len(fields) > 1 and self.max_sub_queries > 1:
+            try:
+                plan = self._plan(user_prompt, fields)
+            except Exception as e:
+                self.logger.error(f"Error decomposing the query with LLM, using it as a whole: {e}")
+        sub_queries = self._validate_plan(plan, user_prompt, fields)
+        self.logger.info(f"Planned {len(sub_queries)} sub-queries: {[sub_query['query'] for sub_query in sub_queries]}")
+        self.record_metric("sub_queries", len(sub_queries))
+        state.update({self.output[0]: sub_queries})
+        return state
+    def _plan(self, user_prompt: str, fields: List[str]) -> dict:
+        prompt = PromptTemplate(
+            template=TEMPLATE_QUERY_DECOMPOSITION,
+            input_variables=["user_prompt"],
+            partial_variables={
+                "fields": "\n".join(self._describe_field(name) for name in fields),
+                "max_sub_queries": self.max_sub_queries,
+            },
+        )
+        chain = prompt | coalesce_llm(self.llm_model) | JsonOutputParser()
+        return chain.invoke({"user_prompt": user_prompt})
+    def _describe_field(self, name: str) -> str:
+        description = self.schema.model_fields[name].description
+        return f"- {name}: {description}" if description else f"- {name}"
+    def _validate_plan(self, plan, user_prompt: str, fields: List[str]) -> List[Dict[str, object]]:
+        """
+        Keeps the planned sub-queries that answer known, not yet assigned fields and puts
+        fields the plan left out into a sub-query for the original prompt.
+        """
+        sub_queries = []
+        assigned = set()
+        planned = plan.get("sub_queries", []) if isinstance(plan, dict) else []
+        for item in planned[:self.max_sub_queries]:
+            if not isinstance(item, dict) or not str(item.get("query", "")).strip():
+                continue
+            item_fields = [name for name in item.get("fields") or [] if name in fields and name not in assigned]
+            if item_fields:
+                assigned.update(item_fields)
+                sub_queries.append({"query": item["query"].strip(), "fields": item_fields})
+        unassigned = [name for name in fields if name not in assigned]
+        if unassigned:
+            original = next((sub_query for sub_query in sub_queries if sub_query["query"] == user_prompt), None)
+            if original:
+                original["fields"].extend(unassigned)
+            else:
+                sub_queries.append({"query": user_prompt, "fields": unassigned})
+        if len(sub_queries) <= 1:
+            return [{"query": user_prompt, "fields": fields}]
+        return sub_queries
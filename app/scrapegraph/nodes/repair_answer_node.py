@@ -0,0 +1,121 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+from langchain.prompts import PromptTemplate
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.output_parsers import StrOutputParser
+from pydantic import ValidationError
+from ..prompts import TEMPLATE_REPAIR
+from ..utils.logging import get_logger
+from ..utils.output_parser import STRUCTURED_OUTPUT_ERRORS
+from ..utils.passages import select_passages
+from ..utils.prompt_compaction import compact_schema
+from ..utils.schema_coverage import fill_missing, invalid_fields, missing_fields, subset_model
+from ..utils.singleflight import coalesce_llm
+from ..utils.usage_ledger import llm_retry
+from ..utils.tokenizer import num_tokens_calculus
+from .base_node import BaseNode
+DEFAULT_REPAIR_MAX_TOKENS = 2000
+class RepairAnswerNode(BaseNode):
+    """
+    Re-extracts only the schema fields that came back null, empty or invalid, asking
+    for just those fields against the passages of the document most relevant to
+    them, and merges the result into the answer. Does nothing when the answer is complete.
+    """
+    def __init__(
+        self,
+        input: str,
+        output: List[str],
+        node_config: Optional[dict] = None,
+        node_name: str = "RepairAnswer",
+    ):
+        super().__init__(node_name, "node", input, output, 3, node_config)
+        self.llm_model = self.node_config.get("llm_model")
+        self.schema = self.node_config.get("schema")
+        self.max_tokens = self.node_config.get("repair_max_tokens", DEFAULT_REPAIR_MAX_TOKENS)
+        self.logger = get_logger(__name__)
+    def execute(self, state: dict, callback_manager: Optional[BaseCallbackHandler] = None) -> dict:
+        self.logger.info(f"--- Executing {self.node_name} Node ---")
+        input_keys = self.get_input_keys(state)
+        user_prompt = state.get(input_keys[0])
+        answer = state.get(input_keys[1])
+        doc = state.get(input_keys[2])
+        if self.schema is None or not doc:
+            return state
+        partial = self._partial_answer(answer)
+        if partial is None:
+            return state
+        invalid = invalid_fields(partial, self.schema)
+        for name in invalid:
+            partial.pop(name, None)
+        fields = missing_fields(partial, self.schema)
+        self.record_metric("fields_to_repair", len(fields))
+        if not fields:
+            return state
+        chunks = doc if isinstance(doc, list) else [doc]
+        field_descriptions = "\n".join(self._describe_field(name) for name in fields)
+        passages = select_passages(chunks, f"{user_prompt}\n{field_descriptions}", self.max_tokens)
+        if not passages:
+            self.logger.info(f"No passage relevant to the fields {fields}, keeping the answer as is.")
+            return state
+        self.logger.info(f"Re-extracting {len(fields)} field(s) from {len(passages)} passage(s): {fields}")
+        context = "\n---\n".join(passages)
+        try:
+            repaired = self._extract_fields(user_prompt, fields, field_descriptions, context, callback_manager)
+        except Exception as e:
+            self.logger.error(f"Field repair failed: {e}")
+            repaired = None
+        merged = fill_missing(partial, repaired, fields)
+        try:
+            merged = self.schema(**merged).model_dump()
+        except ValidationError:
+            self.logger.debug(f"Repaired answer still misses fields: {missing_fields(merged, self.schema)}")
+        full_tokens = sum(num_tokens_calculus(str(chunk)) for chunk in chunks)
+        repair_tokens = num_tokens_calculus(context) + num_tokens_calculus(field_descriptions)
+        self.record_metric("repair_prompt_tokens", repair_tokens)
+        self.record_metric("repair_tokens_saved", max(full_tokens - repair_tokens, 0))
+        self.record_metric("fields_filled", len(fields) - len(missing_fields(merged, self.schema)))
+        state.update({self.output[0]: merged})
+        return state
+    def _partial_answer(self, answer: Any) -> Optional[Dict[str, Any]]:
+        """
+        Returns the usable part of the answer: the answer itself, or the JSON that failed
+        validation. None when there is nothing to build on, since repairing every field is
+        a full re-extraction.
+        """
+        if isinstance(answer, dict) and "error" not in answer:
+            return dict(answer)
+        if isinstance(answer, dict) and isinstance(answer.get("parsed_json"), dict):
+            return dict(answer["parsed_json"])
+        return None
+    def _describe_field(self, name: str) -> str:
+        description = self.schema.model_fields[name].description
+        return f"- {name}: {description}" if description else f"- {name}"
+    def _extract_fields(self, user_prompt: str, fields: List[str], field_descriptions: str, context: str, callback_manager: Optional[BaseCallbackHandler]) -> Any:
+        field_schema = subset_model(self.schema, fields)
+        config = {"callbacks": [callback_manager]} if callback_manager else {}
+        inputs = {"question": user_prompt, "fields": field_descriptions, "context": context}
+        retried = False
+        if self.node_config.get("structured_output"):
+            prompt = PromptTemplate(
+                template=TEMPLATE_REPAIR,
+                input_variables=["question", "fields", "context"],
+                partial_variables={"format_instructions": "Respond with a JSON object containing only these fields."},
+            )
+            try:
+                return (prompt | coalesce_llm(self.llm_model, schema=field_schema)).invoke(inputs, config=config)
+            except STRUCTURED_OUTPUT_ERRORS as e:
+                self.logger.warning(f"Structured field repair failed, falling back to text output: {e}")
+                retried = True
+        schema_description = compact_schema(field_schema) if self.node_config.get("prompt_compaction") else json.dumps(field_schema.model_json_schema())
+        prompt = PromptTemplate(
+            template=TEMPLATE_REPAIR,
+            input_variables=["question", "fields", "context"],
+            partial_variables={
+                "format_instructions": f"Respond ONLY with a JSON object adhering to this schema:\n{schema_description}",
+            },
+        )
+        with llm_retry(retried):
+            response = (prompt | coalesce_llm(self.llm_model) | StrOutputParser()).invoke(inputs, config=config)
+        cleaned_json_str = re.sub(r"^```(json)?\s*|\s*```$", "", response.strip())
+        return field_schema(**json.loads(cleaned_json_str)).model_dump()
@@ -3,7 +3,11 @@ from langchain.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage
 from langchain_core.callbacks import BaseCallbackHandler
 from ..prompts import TEMPLATE_SEARCH_INTERNET
-from ..utils.research_web import search_on_web
+from ..utils.research_web import search_on_web_structured
+from ..utils.singleflight import coalesce_llm
+from ..utils.normalize_query import normalize_query
+from ..utils.persistent_cache import get_persistent_cache
+from ..utils.url_ranking import rank_urls
 from .base_node import BaseNode
 class SearchInternetNode(BaseNode):
     def __init__(
@@ -18,17 +22,103 @@ class SearchInternetNode(BaseNode):
         self.verbose = self.node_config.get("verbose", False)
         self.search_engine = self.node_config.get("search_engine", "duckduckgo")
         self.max_results = self.node_config.get("max_results", 3)
+        self.search_backends = self.node_config.get("search_backends", {})
+        self.search_timeout = self.node_config.get("search_timeout", 10.0)
+        self.search_cache = self.node_config.get("search_cache")
+    def _get_caches(self):
+        """
+        Returns the (prompt -> search query, search query -> URLs) caches, or
+        (None, None) when search caching is not configured.
+        """
+        if not self.search_cache:
+            return None, None
+        try:
+            path = self.search_cache["path"]
+            max_entries = self.search_cache.get("max_entries", 10000)
+            query_cache = get_persistent_cache(path, "search_query", self.search_cache.get("query_ttl", 86400), max_entries)
+            results_cache = get_persistent_cache(path, "search_results", self.search_cache.get("results_ttl", 3600), max_entries)
+            return query_cache, results_cache
+        except Exception as e:
+            self.logger.warning(f"Search cache unavailable, continuing without it: {e}")
+            return None, None
     def execute(self, state: dict, callback_manager: Optional[BaseCallbackHandler] = None) -> dict:
         self.logger.info(f"--- Executing {self.node_name} Node ---")
         input_keys = self.get_input_keys(state)
         user_prompt = state[input_keys[0]]
+        query_cache, results_cache = self._get_caches()
+        prompt_key = normalize_query(user_prompt)
+        search_query = query_cache.get(prompt_key) if query_cache else None
+        if query_cache:
+            self.record_metric("query_cache_hit", search_query is not None)
+            self.record_metric("query_cache_hit_rate", query_cache.hit_rate())
+        if search_query is None:
+            search_query = self._generate_search_query(user_prompt)
+            if query_cache and search_query != user_prompt:
+                query_cache.set(prompt_key, search_query)
+        self.logger.info(f"Search Query: {search_query}")
+        engines = self.search_engine if isinstance(self.search_engine, str) else ",".join(self.search_engine)
+        results_key = f"{engines}:{self.max_results}:{normalize_query(search_query)}"
+        quality_store = self.get_domain_quality_store()
+        # Over-fetch when ranking by domain quality, so skipped domains can be backfilled.
+        search_limit = self.max_results * 2 if quality_store else self.max_results
+        try:
+            search_results = results_cache.get(results_key) if results_cache else None
+            if results_cache:
+                self.record_metric("results_cache_hit", search_results is not None)
+                self.record_metric("results_cache_hit_rate", results_cache.hit_rate())
+            if search_results is None:
+                search_results = [
+                    result.to_dict()
+                    for result in search_on_web_structured(
+                        query=search_query,
+                        max_results=search_limit,
+                        search_engine=self.search_engine,
+                        backend_options=self.search_backends,
+                        timeout=self.search_timeout,
+                    )
+                ]
+                if results_cache and search_results:
+                    results_cache.set(results_key, search_results)
+            results_by_url = {}
+            for result in search_results or []:
+                result = result if isinstance(result, dict) else {"url": result}
+                results_by_url.setdefault(result["url"], result)
+            domain_quality = self.node_config.get("domain_quality") or {}
+            urls = rank_urls(
+                list(results_by_url),
+                quality_store=quality_store,
+                min_samples=domain_quality.get("min_samples", 5),
+                max_failure_rate=domain_quality.get("max_failure_rate", 0.8),
+            )[:self.max_results]
+            if not urls:
+                self.logger.warning(f"No results found for query: {search_query}")
+            state.update({self.output[0]: urls})
+            ranked_results = [results_by_url[url] for url in urls]
+        except Exception as e:
+            self.logger.error(f"Error during web search for query '{search_query}': {e}")
+            state.update({self.output[0]: []})
+            ranked_results = []
+        state.update({self.output[1]: user_prompt})
+        if "search_results" in self.output:
+            state.update({"search_results": ranked_results})
+        if "snippets" in self.output:
+            state.update({"snippets": [self._format_snippets(ranked_results)] if ranked_results else []})
+        return state
+    def _format_snippets(self, results: List[dict]) -> str:
+        entries = []
+        for i, result in enumerate(results, start=1):
+            entries.append(
+                f"[{i}] {result.get('title', '')}\nURL: {result['url']}\n{result.get('snippet', '')}".strip()
+            )
+        return "\n\n".join(entries)
+    def _generate_search_query(self, user_prompt: str) -> str:
         search_prompt = PromptTemplate(
             template=TEMPLATE_SEARCH_INTERNET,
             input_variables=["user_prompt"],
         )
         messages = [HumanMessage(content=search_prompt.format(user_prompt=user_prompt))]
         try:
-            llm_response = self.llm_model.invoke(messages)
+            llm_response = coalesce_llm(self.llm_model).invoke(messages)
             search_query = llm_response.content.strip().strip('"').strip("'")
             if not search_query:
                  self.logger.warning("LLM generated an empty search query. Using the original prompt.")
@@ -37,20 +127,4 @@ class SearchInternetNode(BaseNode):
             self.logger.error(f"Error generating search query with LLM: {e}")
             self.logger.warning("Using the original prompt as search query due to error.")
             search_query = user_prompt
-        self.logger.info(f"Search Query: {search_query}")
-        try:
-            search_results = search_on_web(
-                query=search_query,
-                max_results=self.max_results,
-                search_engine=self.search_engine,
-            )
-            if not search_results:
-                self.logger.warning(f"No results found for query: {search_query}")
-                state.update({self.output[0]: []})
-            else:
-                state.update({self.output[0]: search_results})
-        except Exception as e:
-            self.logger.error(f"Error during web search for query '{search_query}': {e}")
-            state.update({self.output[0]: []})
-        state.update({self.output[1]: user_prompt})
-        return state
+        return search_query
@@ -2,15 +2,23 @@ from .generate_answer_node_prompts import (
     TEMPLATE_CHUNKS,
     TEMPLATE_MERGE,
     TEMPLATE_NO_CHUNKS,
-    REGEN_ADDITIONAL_INFO,
+    FORMAT_INSTRUCTIONS_STRUCTURED,
 )
-from .merge_answer_node_prompts import TEMPLATE_COMBINED
+from .merge_answer_node_prompts import TEMPLATE_COMBINED, MERGE_FORMAT_INSTRUCTIONS_STRUCTURED
 from .search_internet_node_prompts import TEMPLATE_SEARCH_INTERNET
+from .query_decomposition_node_prompts import TEMPLATE_QUERY_DECOMPOSITION
+from .repair_answer_node_prompts import TEMPLATE_REPAIR
+from .packed_answer_node_prompts import TEMPLATE_PACKED, PACKED_FORMAT_INSTRUCTIONS_STRUCTURED
 __all__ = [
     "TEMPLATE_CHUNKS",
     "TEMPLATE_MERGE",
     "TEMPLATE_NO_CHUNKS",
     "TEMPLATE_COMBINED",
     "TEMPLATE_SEARCH_INTERNET",
-    "REGEN_ADDITIONAL_INFO",
+    "TEMPLATE_QUERY_DECOMPOSITION",
+    "TEMPLATE_REPAIR",
+    "TEMPLATE_PACKED",
+    "FORMAT_INSTRUCTIONS_STRUCTURED",
+    "MERGE_FORMAT_INSTRUCTIONS_STRUCTURED",
+    "PACKED_FORMAT_INSTRUCTIONS_STRUCTURED",
 ]
@@ -25,14 +25,4 @@ You have analyzed multiple chunks and produced the following partial results:
 Merge these partial results into a single, final, comprehensive answer. Ensure the final output is well-structured, accurate according to the provided results, avoids repetition, and fully addresses my original request.
 {format_instructions}
 """
-REGEN_ADDITIONAL_INFO = """
-SYSTEM: You previously attempted to answer the user's request but may have missed some information or encountered an issue. Please re-analyze the provided context based on the original request and provide a corrected or more complete answer. Pay close attention to the required format.
-USER:
-My original request was: "{question}"
-The previous attempt resulted in:
-{answer}
-Please try again, using the original content, to provide a complete and accurate answer adhering to the format instructions.
-{format_instructions}
-ORIGINAL CONTEXT (if available, otherwise rely on previous attempt's context):
-{context}
-"""
+FORMAT_INSTRUCTIONS_STRUCTURED = "Respond with a JSON object containing the requested fields. Use null for information the content does not provide."
@@ -1,3 +1,4 @@
+MERGE_FORMAT_INSTRUCTIONS_STRUCTURED = "Merge the provided results into a single JSON object containing the requested fields. Eliminate redundancy."
 TEMPLATE_COMBINED = """
 SYSTEM: You are an AI assistant specialized in synthesizing information from multiple web sources. You have received structured data extracted from several different websites related to a user's request. Your task is to merge these individual results into a single, comprehensive, and coherent final answer. Eliminate redundancy, resolve potential conflicts (if possible, or note them), and ensure all unique relevant details from all sources are included. Adhere strictly to the user's original request and the specified output format.
 USER:
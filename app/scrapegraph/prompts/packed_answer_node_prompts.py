@@ -0,0 +1,9 @@
+PACKED_FORMAT_INSTRUCTIONS_STRUCTURED = "Respond with a JSON object whose \"results\" list holds one entry per source, with the source URL and the answer extracted from that source alone. Use null for information a source does not provide."
+TEMPLATE_PACKED = """
+SYSTEM: You are an AI assistant specialized in analyzing and extracting detailed information from web content. You will receive several independent web pages at once. Extract the answer from each page separately, based *only* on that page's content; never mix information between pages. Adhere strictly to the user's request and the specified output format.
+USER:
+Analyze each of the following web pages and extract information relevant to my request: "{question}"
+{documents}
+For every source above, extract the relevant information from that source only and tag the answer with its source URL.
+{format_instructions}
+"""
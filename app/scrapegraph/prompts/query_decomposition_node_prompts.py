@@ -0,0 +1,8 @@
+TEMPLATE_QUERY_DECOMPOSITION = """
+SYSTEM: You are an AI assistant that plans web research. Complex research requests often combine several independent questions (for example different attributes of several entities) that are best answered by separate, focused web searches. Split the user's request into at most {max_sub_queries} independent, self-contained research questions and assign to each one the output fields it answers. Every field must be assigned to exactly one question. If the request is simple or its fields are best found together, return a single question containing the original request and all fields.
+USER:
+My research request is: "{user_prompt}"
+The output fields to fill are:
+{fields}
+Return ONLY a JSON object of the form {{"sub_queries": [{{"query": "<research question>", "fields": ["<field name>", ...]}}]}}, without any explanation or surrounding text.
+"""
@@ -0,0 +1,10 @@
+TEMPLATE_REPAIR = """
+SYSTEM: You are an AI assistant completing a partially extracted answer. Some fields could not be extracted or had invalid values. Fill in ONLY the requested fields, based *only* on the provided passages. Use null for a field the passages do not answer.
+USER:
+My request is: "{question}"
+Fields to fill:
+{fields}
+RELEVANT PASSAGES:
+{context}
+{format_instructions}
+"""
@@ -1,24 +1,125 @@
+from .cassette import Cassette, CassetteMissError, RecordedCallError, active_cassette, open_cassette, use_cassette
 from .cleanup_html import cleanup_html, reduce_html
 from .convert_to_md import convert_to_md
+from .chunk_planner import ChunkPlanner, LatencyModel, chunk_planner
 from .copy import safe_deepcopy
-from .llm_callback_manager import CustomLLMCallbackManager
-from .output_parser import get_pydantic_output_parser, get_structured_output_parser
+from .document_store import DocumentStore
+from .persistent_cache import PersistentCache, get_persistent_cache
+from .output_parser import STRUCTURED_OUTPUT_ERRORS, StructuredOutputError, get_pydantic_output_parser, get_structured_output_parser, output_mode_stats
 from .prettify_exec_info import prettify_exec_info
-from .research_web import search_on_web
+from .profiling import SamplingProfiler, node_timing, profile_execution, profile_node
+from .prompt_compaction import compact_json, compact_results, compact_schema, compaction_stats, strip_empty
+from .research_web import search_on_web, search_on_web_structured, reciprocal_rank_fusion
+from .search_backends import (
+    SearchBackend,
+    SearchResult,
+    DuckDuckGoSearchBackend,
+    SearxNGSearchBackend,
+    LocalSearchBackend,
+    register_search_backend,
+    get_search_backend,
+)
 from .split_text_into_chunks import split_text_into_chunks
 from .tokenizer import num_tokens_calculus
+from .tracing import set_span_attributes, start_span
+from .usage_ledger import UsageLedger, configure_pricing, cost_usd, llm_retry, usage_scope
+from .url_canonicalization import canonicalize_url, clean_url, dedupe_urls
+from .domain_quality import DomainQualityStore, DomainStats, get_domain_quality_store
+from .url_ranking import rank_urls
+from .model_routing import ModelRouter, ModelTier, routing_stats, select_tiers
+from .packing import DocumentPacker
+from .passages import select_passages, split_passages
+from .schema_coverage import combined_coverage, conflicting_fields, field_coverage, fill_missing, invalid_fields, is_empty_value, missing_fields, subset_model
+from .llm_scheduler import CRITICAL, NORMAL, LLMScheduler, PriorityHint, llm_priority, llm_request, llm_scheduler
 from .logging import get_logger
+from .metrics import METRICS_CONTENT_TYPE, metrics_available, render_metrics
+from .normalize_query import normalize_query
+from .singleflight import SingleFlight, coalesce_llm
 __all__ = [
     "cleanup_html",
     "reduce_html",
     "convert_to_md",
     "safe_deepcopy",
-    "CustomLLMCallbackManager",
+    "ChunkPlanner",
+    "LatencyModel",
+    "chunk_planner",
+    "DocumentStore",
+    "PersistentCache",
+    "get_persistent_cache",
+    "STRUCTURED_OUTPUT_ERRORS",
+    "StructuredOutputError",
+    "output_mode_stats",
     "get_pydantic_output_parser",
     "get_structured_output_parser",
     "prettify_exec_info",
+    "SamplingProfiler",
+    "node_timing",
+    "profile_execution",
+    "profile_node",
+    "compact_json",
+    "compact_results",
+    "compact_schema",
+    "compaction_stats",
+    "strip_empty",
     "search_on_web",
+    "search_on_web_structured",
+    "reciprocal_rank_fusion",
+    "SearchBackend",
+    "SearchResult",
+    "DuckDuckGoSearchBackend",
+    "SearxNGSearchBackend",
+    "LocalSearchBackend",
+    "register_search_backend",
+    "get_search_backend",
     "split_text_into_chunks",
     "num_tokens_calculus",
+    "set_span_attributes",
+    "start_span",
+    "UsageLedger",
+    "configure_pricing",
+    "cost_usd",
+    "llm_retry",
+    "usage_scope",
+    "canonicalize_url",
+    "clean_url",
+    "dedupe_urls",
+    "DomainQualityStore",
+    "DomainStats",
+    "get_domain_quality_store",
+    "rank_urls",
+    "ModelRouter",
+    "ModelTier",
+    "routing_stats",
+    "select_tiers",
+    "combined_coverage",
+    "conflicting_fields",
+    "field_coverage",
+    "fill_missing",
+    "invalid_fields",
+    "DocumentPacker",
+    "select_passages",
+    "split_passages",
+    "is_empty_value",
+    "missing_fields",
+    "subset_model",
+    "CRITICAL",
+    "NORMAL",
+    "LLMScheduler",
+    "PriorityHint",
+    "llm_priority",
+    "llm_request",
+    "llm_scheduler",
     "get_logger",
+    "METRICS_CONTENT_TYPE",
+    "metrics_available",
+    "render_metrics",
+    "normalize_query",
+    "SingleFlight",
+    "coalesce_llm",
+    "Cassette",
+    "CassetteMissError",
+    "RecordedCallError",
+    "active_cassette",
+    "open_cassette",
+    "use_cassette",
 ]
@@ -0,0 +1,172 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from .logging import get_logger
+logger = get_logger(__name__)
+CASSETTE_VERSION = 2
+MODES = ("record", "replay")
+# Recorded responses are appended to the file at least this often (seconds) or every this many calls.
+FLUSH_INTERVAL = 5.0
+FLUSH_RECORDS = 100
+_active: Optional["Cassette"] = None
+class CassetteMissError(LookupError):
+    """Raised in replay mode for a call the cassette holds no response for."""
+class RecordedCallError(RuntimeError):
+    """Replays a recorded upstream failure whose exception type cannot be rebuilt."""
+    def __init__(self, error_type: str, message: str):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+class Cassette:
+    """
+    Upstream responses of a pipeline run: LLM answers (with token usage), search results
+    and fetched pages, each with its measured latency, and the errors of failed calls.
+    Stored as gzipped JSON lines and keyed by a hash of the request, so the prompts
+    themselves are not kept. In record mode, responses are appended to the file as they
+    come, at least every `FLUSH_INTERVAL` seconds, until it reaches `max_bytes`; identical
+    requests keep their responses in call order. In replay mode they are served back in
+    that order, and the last one repeats once they run out; a recorded error is raised
+    again. With `replay_latency`, replay waits as long as the original call took.
+    LLM keys hash the whole prompt, so a prompt embedding anything that changes between
+    runs (the current date, an unrecorded page) misses on replay.
+    """
+    def __init__(self, path: str, mode: str = "replay", replay_latency: bool = False, max_bytes: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Available: {list(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._counts: Dict[str, int] = {}
+        self._pending: List[str] = []
+        self._last_flush = time.time()
+        self._started = False
+        self._full = False
+        if mode == "replay":
+            self._load()
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+    @staticmethod
+    def key(kind: str, *parts: Any) -> str:
+        digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{kind}:{digest[:32]}"
+    def record(self, key: str, response: Dict[str, Any], latency: float) -> None:
+        self._append(key, {**response, "latency_s": round(latency, 4)})
+    def record_error(self, key: str, error: BaseException, latency: float) -> None:
+        """Records a failed call; replaying it raises the error again."""
+        error_type = f"{type(error).__module__}.{type(error).__qualname__}"
+        # The constructor argument where there is one; str() of some errors (e.g. KeyError) adds quotes.
+        message = error.args[0] if error.args and isinstance(error.args[0], str) else str(error)
+        self._append(key, {"error": {"type": error_type, "message": message}, "latency_s": round(latency, 4)})
+    def _append(self, key: str, response: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._full:
+                return
+            self._pending.append(json.dumps({"key": key, "response": response}, separators=(",", ":"), default=str) + "\n")
+            kind = key.split(":", 1)[0]
+            self._counts[kind] = self._counts.get(kind, 0) + 1
+            if len(self._pending) >= FLUSH_RECORDS or time.time() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush()
+    def _flush(self) -> None:
+        # Each flush appends one gzip member, so the file stays readable up to the last flush.
+        if self._started and not self._pending:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with gzip.open(self.path, "at" if self._started else "wt", encoding="utf-8") as f:
+            if not self._started:
+                f.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+            f.writelines(self._pending)
+        self._started = True
+        self._pending = []
+        self._last_flush = time.time()
+        if self.max_bytes and os.path.getsize(self.path) >= self.max_bytes:
+            self._full = True
+            logger.warning(f"Cassette {self.path} reached {self.max_bytes} bytes; further calls are not recorded.")
+    def lookup(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            responses = self._interactions.get(key)
+            if not responses:
+                raise CassetteMissError(f"Cassette '{self.path}' has no recorded response for {key}.")
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = position + 1
+            return responses[min(position, len(responses) - 1)]
+    def replay(self, key: str) -> Dict[str, Any]:
+        response = self.lookup(key)
+        if self.replay_latency:
+            time.sleep(response["latency_s"])
+        return self._raise_recorded_error(response)
+    async def areplay(self, key: str) -> Dict[str, Any]:
+        response = self.lookup(key)
+        if self.replay_latency:
+            await asyncio.sleep(response["latency_s"])
+        return self._raise_recorded_error(response)
+    @staticmethod
+    def _raise_recorded_error(response: Dict[str, Any]) -> Dict[str, Any]:
+        error = response.get("error")
+        if error is None:
+            return response
+        # The original exception type is rebuilt only from modules already loaded.
+        module, _, name = error["type"].rpartition(".")
+        error_class = sys.modules.get(module)
+        for part in name.split("."):
+            error_class = getattr(error_class, part, None)
+        exception = None
+        if isinstance(error_class, type) and issubclass(error_class, Exception):
+            try:
+                exception = error_class(error["message"])
+            except Exception:
+                pass
+        raise exception or RecordedCallError(error["type"], error["message"])
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+    def save(self) -> None:
+        """Appends the recorded responses not written yet."""
+        with self._lock:
+            self._flush()
+        logger.info(f"Saved cassette {self.path}: {self.stats()}")
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline() or "{}")
+            except json.JSONDecodeError:
+                header = {}
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Cassette '{self.path}' has unsupported version {header.get('version')}.")
+            try:
+                for line in f:
+                    entry = json.loads(line)
+                    self._interactions.setdefault(entry["key"], []).append(entry["response"])
+                    kind = entry["key"].split(":", 1)[0]
+                    self._counts[kind] = self._counts.get(kind, 0) + 1
+            except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+                # A recording cut short (e.g. the process was killed mid-write) keeps what was complete.
+                logger.warning(f"Cassette {self.path} ends with an incomplete record; replaying the {sum(self._counts.values())} complete ones.")
+def use_cassette(cassette: Optional[Cassette]) -> None:
+    """Installs the process-wide cassette recording or replaying upstream calls; None removes it."""
+    global _active
+    _active = cassette
+def active_cassette() -> Optional[Cassette]:
+    return _active
+@contextmanager
+def open_cassette(path: str, mode: str = "replay", replay_latency: bool = False, max_bytes: Optional[int] = None) -> Iterator[Cassette]:
+    """Records or replays the upstream calls made in this block; a recording is saved on exit."""
+    cassette = Cassette(path, mode, replay_latency, max_bytes)
+    previous = _active
+    use_cassette(cassette)
+    try:
+        yield cassette
+    finally:
+        use_cassette(previous)
+        if cassette.mode == "record":
+            cassette.save()
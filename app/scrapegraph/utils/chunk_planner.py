@@ -0,0 +1,115 @@
+import math
+import threading
+from typing import Any, Dict, List, Optional
+from .logging import get_logger
+logger = get_logger(__name__)
+DEFAULT_COEFFICIENTS = (1.0, 0.0001, 0.01)
+DEFAULT_ANSWER_TOKENS = 300.0
+class LatencyModel:
+    """
+    Linear model of the latency of a chain of LLM calls:
+    seconds = overhead * calls + per_input_token * input_tokens + per_output_token * output_tokens,
+    fitted online with recursive least squares. `forgetting` < 1 discounts old observations
+    so the model follows changes in provider throughput.
+    """
+    def __init__(self, coefficients=DEFAULT_COEFFICIENTS, forgetting: float = 0.98):
+        self.weights = list(coefficients)
+        self.forgetting = forgetting
+        # Prior variances sized to each coefficient's scale, so early observations move all of them.
+        self._p = [[(2 * weight) ** 2 if i == j else 0.0 for j in range(3)] for i, weight in enumerate(coefficients)]
+        self.observations = 0
+    def predict(self, calls: float, input_tokens: float, output_tokens: float) -> float:
+        features = (calls, input_tokens, output_tokens)
+        return sum(max(weight, 0.0) * value for weight, value in zip(self.weights, features))
+    def update(self, calls: float, input_tokens: float, output_tokens: float, seconds: float) -> None:
+        x = (calls, input_tokens, output_tokens)
+        px = [sum(self._p[i][j] * x[j] for j in range(3)) for i in range(3)]
+        denominator = self.forgetting + sum(x[i] * px[i] for i in range(3))
+        gain = [value / denominator for value in px]
+        error = seconds - sum(self.weights[i] * x[i] for i in range(3))
+        self.weights = [self.weights[i] + gain[i] * error for i in range(3)]
+        self._p = [[(self._p[i][j] - gain[i] * px[j]) / self.forgetting for j in range(3)] for i in range(3)]
+        self.observations += 1
+class _ModelLatency:
+    def __init__(self, forgetting: float):
+        self.latency_model = LatencyModel(forgetting=forgetting)
+        self.answer_tokens = DEFAULT_ANSWER_TOKENS
+class ChunkPlanner:
+    """
+    Chooses how many chunks a document is split into. One call over the whole document
+    is compared with parallel chunk calls plus a merge call, whose critical path is one
+    chunk call followed by the merge of all chunk answers. Each model gets its own latency
+    model, learned from the GenerateAnswer entries of graph execution info.
+    """
+    def __init__(self, min_gain: float = 0.5, forgetting: float = 0.98):
+        self.min_gain = min_gain
+        self.forgetting = forgetting
+        self._models: Dict[str, _ModelLatency] = {}
+        self._lock = threading.Lock()
+    def _model(self, model: str) -> _ModelLatency:
+        if model not in self._models:
+            self._models[model] = _ModelLatency(self.forgetting)
+        return self._models[model]
+    def _features(self, doc_tokens: int, chunks: int, answer_tokens: float):
+        if chunks <= 1:
+            return 1, doc_tokens, answer_tokens
+        return 2, doc_tokens / chunks + chunks * answer_tokens, 2 * answer_tokens
+    def estimate(self, model: str, doc_tokens: int, chunks: int) -> float:
+        with self._lock:
+            state = self._model(model)
+            return state.latency_model.predict(*self._features(doc_tokens, chunks, state.answer_tokens))
+    def plan(self, model: str, doc_tokens: int, max_chunk_tokens: int, max_chunks: int = 8, min_chunk_tokens: int = 4000) -> int:
+        """
+        Returns the chunk size for a document of `doc_tokens` tokens answered by `model`:
+        the chunk count with the lowest estimated latency among the counts keeping chunks
+        between `min_chunk_tokens` and `max_chunk_tokens`. Splitting must beat a single
+        call by `min_gain` seconds.
+        """
+        if doc_tokens <= 0:
+            return max_chunk_tokens
+        fewest = max(1, math.ceil(doc_tokens / max_chunk_tokens))
+        most = max(fewest, min(max_chunks, doc_tokens // max(min_chunk_tokens, 1)))
+        best_chunks, best_latency = fewest, self.estimate(model, doc_tokens, fewest)
+        for chunks in range(fewest + 1, most + 1):
+            latency = self.estimate(model, doc_tokens, chunks)
+            if latency < best_latency - self.min_gain:
+                best_chunks, best_latency = chunks, latency
+        if best_chunks == 1:
+            return max_chunk_tokens
+        # Chunks are cut at word boundaries, so leave some slack to not spill into one more chunk.
+        return min(max_chunk_tokens, math.ceil(doc_tokens / best_chunks * 1.05))
+    def observe(self, execution_info: Optional[List[Dict[str, Any]]], model: str) -> None:
+        """
+        Learns from the GenerateAnswer entries of `execution_info` that ran on the first attempt,
+        for the model they record or else `model`. Their `llm_time` is used, which starts when
+        the calls are dispatched, so time queued behind other requests is not learned as latency.
+        """
+        for info in execution_info or []:
+            if info.get("node_name") != "GenerateAnswer" or "error" in info:
+                continue
+            chunks, doc_tokens = info.get("chunks"), info.get("content_tokens")
+            if not chunks or not doc_tokens or info.get("escalations") or info.get("structured_output_fallbacks"):
+                continue
+            calls = chunks + 1 if chunks > 1 else 1
+            answered_by = info.get("model") or model
+            with self._lock:
+                state = self._model(answered_by)
+                if info.get("completion_tokens"):
+                    state.answer_tokens = 0.8 * state.answer_tokens + 0.2 * info["completion_tokens"] / calls
+                state.latency_model.update(*self._features(doc_tokens, chunks, state.answer_tokens), info.get("llm_time", info["exec_time"]))
+            logger.debug(f"Latency model of {answered_by} updated from a {chunks}-chunk extraction of {doc_tokens} tokens: {self.snapshot()[answered_by]}")
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """The learned coefficients, per model."""
+        with self._lock:
+            snapshot = {}
+            for model, state in self._models.items():
+                overhead, per_input_token, per_output_token = state.latency_model.weights
+                snapshot[model] = {
+                    "call_overhead_s": overhead,
+                    "input_tokens_per_s": 1 / per_input_token if per_input_token > 0 else float("inf"),
+                    "output_tokens_per_s": 1 / per_output_token if per_output_token > 0 else float("inf"),
+                    "answer_tokens": state.answer_tokens,
+                    "observations": state.latency_model.observations,
+                }
+            return snapshot
+chunk_planner = ChunkPlanner()
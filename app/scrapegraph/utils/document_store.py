@@ -0,0 +1,54 @@
+import threading
+from typing import Callable, Dict, List, Optional
+from .singleflight import SingleFlight
+from .url_canonicalization import canonicalize_url
+from .logging import get_logger
+from .metrics import record_cache_lookup
+logger = get_logger(__name__)
+class DocumentStore:
+    """
+    Thread-safe store of parsed documents keyed by canonical source URL. Graphs sharing a store
+    fetch and parse every page at most once; concurrent loads of the same URL are
+    coalesced. The store is shared by reference when graph configs are copied.
+    """
+    def __init__(self):
+        self._docs: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("document_store")
+        self.hits = 0
+        self.loads = 0
+    def __copy__(self):
+        return self
+    def __deepcopy__(self, memo):
+        return self
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return canonicalize_url(url) in self._docs
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._docs)
+    def get(self, url: str) -> Optional[List[str]]:
+        with self._lock:
+            return self._docs.get(canonicalize_url(url))
+    def put(self, url: str, parsed_doc: List[str]) -> None:
+        with self._lock:
+            self._docs[canonicalize_url(url)] = parsed_doc
+    def get_or_load(self, url: str, loader: Callable[[], List[str]]) -> List[str]:
+        key = canonicalize_url(url)
+        with self._lock:
+            if key in self._docs:
+                self.hits += 1
+                record_cache_lookup("document_store", True)
+                return self._docs[key]
+        def _load() -> List[str]:
+            parsed_doc = loader()
+            self.put(url, parsed_doc)
+            with self._lock:
+                self.loads += 1
+            return parsed_doc
+        parsed_doc, shared = self._flight.do(key, _load)
+        record_cache_lookup("document_store", shared)
+        if shared:
+            with self._lock:
+                self.hits += 1
+        return parsed_doc
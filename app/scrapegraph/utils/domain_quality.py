@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from .logging import get_logger
+from .url_canonicalization import canonicalize_url
+logger = get_logger(__name__)
+def get_domain(url: str) -> str:
+    return urlsplit(canonicalize_url(url)).hostname or ""
+@dataclass
+class DomainStats:
+    domain: str
+    fetches: float = 0
+    fetch_failures: float = 0
+    parsed_pages: float = 0
+    useful_tokens: float = 0
+    extractions: float = 0
+    valid_extractions: float = 0
+    @property
+    def failure_rate(self) -> float:
+        return self.fetch_failures / self.fetches if self.fetches else 0.0
+    @property
+    def avg_useful_tokens(self) -> float:
+        return self.useful_tokens / self.parsed_pages if self.parsed_pages else 0.0
+    @property
+    def survival_rate(self) -> float:
+        return self.valid_extractions / self.extractions if self.extractions else 1.0
+class DomainQualityStore:
+    """
+    Persistent per-domain record of how well pages pay off: fetch failure rate,
+    average useful tokens after parsing, and how often extracted answers survive
+    validation. Shared by all workers through a SQLite file. Counts decay with a
+    `half_life` (in seconds), so old observations fade: a domain banned for failing
+    drops below the minimum sample count after a while and gets tried again, and
+    fresh results outweigh stale ones.
+    """
+    _columns = ("fetches", "fetch_failures", "parsed_pages", "useful_tokens", "extractions", "valid_extractions")
+    def __init__(self, path: str, half_life: Optional[float] = None):
+        self.path = path
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS domain_quality ("
+                "domain TEXT PRIMARY KEY, fetches REAL NOT NULL DEFAULT 0, "
+                "fetch_failures REAL NOT NULL DEFAULT 0, parsed_pages REAL NOT NULL DEFAULT 0, "
+                "useful_tokens REAL NOT NULL DEFAULT 0, extractions REAL NOT NULL DEFAULT 0, "
+                "valid_extractions REAL NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+            )
+    def _decay(self, age: float) -> float:
+        if not self.half_life or self.half_life <= 0:
+            return 1.0
+        return 0.5 ** (max(age, 0.0) / self.half_life)
+    def _increment(self, url: str, **increments: int) -> None:
+        domain = get_domain(url)
+        if not domain:
+            return
+        # Every count decays to now before the new observation is added.
+        assignments = ", ".join(f"{column} = {column} * ? + ?" for column in self._columns)
+        try:
+            with self._lock, self._conn:
+                now = time.time()
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO domain_quality (domain, updated_at) VALUES (?, ?)",
+                    (domain, now),
+                )
+                updated_at, = self._conn.execute("SELECT updated_at FROM domain_quality WHERE domain = ?", (domain,)).fetchone()
+                decay = self._decay(now - updated_at)
+                values = [value for column in self._columns for value in (decay, increments.get(column, 0))]
+                self._conn.execute(
+                    f"UPDATE domain_quality SET {assignments}, updated_at = ? WHERE domain = ?",
+                    (*values, now, domain),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not update domain quality for {domain}: {e}")
+    def record_fetch(self, url: str, success: bool) -> None:
+        self._increment(url, fetches=1, fetch_failures=0 if success else 1)
+    def record_parse(self, url: str, useful_tokens: int) -> None:
+        self._increment(url, parsed_pages=1, useful_tokens=useful_tokens)
+    def record_extraction(self, url: str, valid: bool) -> None:
+        self._increment(url, extractions=1, valid_extractions=1 if valid else 0)
+    def get_stats(self, url_or_domain: str) -> DomainStats:
+        domain = get_domain(url_or_domain) if "/" in url_or_domain else url_or_domain
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(self._columns)}, updated_at FROM domain_quality WHERE domain = ?",
+                    (domain,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read domain quality for {domain}: {e}")
+            row = None
+        if row is None:
+            return DomainStats(domain=domain)
+        *counts, updated_at = row
+        decay = self._decay(time.time() - updated_at)
+        return DomainStats(domain, *(count * decay for count in counts))
+_stores: Dict[str, DomainQualityStore] = {}
+_stores_lock = threading.Lock()
+def get_domain_quality_store(path: Optional[str], half_life: Optional[float] = None) -> Optional[DomainQualityStore]:
+    """Returns the process-wide store for `path`, or None when no path is configured."""
+    if not path:
+        return None
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = DomainQualityStore(path, half_life)
+            _stores[path] = store
+        return store
@@ -0,0 +1,138 @@
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Union
+from .logging import get_logger
+from .metrics import llm_call_seconds, llm_queue_wait_seconds, stage_errors_total
+from .tracing import set_span_attributes
+logger = get_logger(__name__)
+CRITICAL = 0
+NORMAL = 1
+PRIORITY_NAMES = {CRITICAL: "critical", NORMAL: "normal"}
+# A queued call re-checks the queue this often, so a missed wake-up only delays it.
+REDISPATCH_INTERVAL = 1.0
+class PriorityHint:
+    """Mutable priority shared with the calls of a running sub-graph; raising it also applies to its calls already queued."""
+    def __init__(self, priority: int = NORMAL):
+        self.priority = priority
+_request_var: contextvars.ContextVar = contextvars.ContextVar("llm_request", default=None)
+_priority_var: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=None)
+@contextmanager
+def llm_request(request_id: Hashable) -> Iterator[None]:
+    """Attributes the LLM calls made in this context (and in threads copying it) to `request_id`."""
+    token = _request_var.set(request_id)
+    try:
+        yield
+    finally:
+        _request_var.reset(token)
+@contextmanager
+def llm_priority(priority: Union[int, PriorityHint]) -> Iterator[None]:
+    """Default priority of the LLM calls made in this context; a `PriorityHint` can be raised later."""
+    token = _priority_var.set(priority)
+    try:
+        yield
+    finally:
+        _priority_var.reset(token)
+class _Waiter:
+    def __init__(self, seq: int, request: Hashable, priority: Optional[int], hint: Any):
+        self.seq = seq
+        self.request = request
+        self.priority = priority
+        self.hint = hint
+        self.ready = threading.Event()
+    def effective_priority(self) -> int:
+        priorities = [NORMAL if self.priority is None else self.priority]
+        if isinstance(self.hint, PriorityHint):
+            priorities.append(self.hint.priority)
+        elif isinstance(self.hint, int):
+            priorities.append(self.hint)
+        return min(priorities)
+class LLMScheduler:
+    """
+    Process-wide admission of LLM calls: at most `max_in_flight` calls per model run at
+    once and the others queue. A free slot goes to the waiting call with the highest
+    priority (critical-path calls first); among equal priorities to the request that was
+    served the fewest calls on that model since it became active, so one large request
+    cannot starve the others, then to the oldest. `max_in_flight` <= 0 disables queueing.
+    """
+    def __init__(self, max_in_flight: int = 0):
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting: Dict[str, List[_Waiter]] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._request_in_flight: Dict[tuple, int] = {}
+        self._served: Dict[tuple, int] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+    def configure(self, max_in_flight: int) -> None:
+        with self._lock:
+            self.max_in_flight = max_in_flight
+            for model in list(self._waiting):
+                self._dispatch(model)
+    def _dispatch(self, model: str) -> None:
+        waiting = self._waiting.get(model)
+        while waiting and (self.max_in_flight <= 0 or self._in_flight.get(model, 0) < self.max_in_flight):
+            waiter = min(waiting, key=lambda w: (w.effective_priority(), self._served.get((model, w.request), 0), w.seq))
+            waiting.remove(waiter)
+            key = (model, waiter.request)
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+            self._request_in_flight[key] = self._request_in_flight.get(key, 0) + 1
+            self._served[key] = self._served.get(key, 0) + 1
+            waiter.ready.set()
+    def _release(self, model: str, request: Hashable) -> None:
+        with self._lock:
+            self._in_flight[model] -= 1
+            key = (model, request)
+            self._request_in_flight[key] -= 1
+            if not self._request_in_flight[key]:
+                del self._request_in_flight[key]
+                if not any(waiter.request == request for waiter in self._waiting.get(model, [])):
+                    self._served.pop(key, None)
+            self._dispatch(model)
+    def _record(self, priority: int, wait: float) -> None:
+        stats = self._stats.setdefault(PRIORITY_NAMES.get(priority, str(priority)), {"calls": 0, "total_wait": 0.0, "max_wait": 0.0})
+        stats["calls"] += 1
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+    def run(self, model: str, fn: Callable[..., Any], *args: Any, priority: Optional[int] = None, **kwargs: Any) -> Any:
+        """Runs `fn` once a slot of `model` is free; `priority` overrides the context's default."""
+        waiter = _Waiter(next(self._seq), _request_var.get(), priority, _priority_var.get())
+        start = time.time()
+        with self._lock:
+            self._waiting.setdefault(model, []).append(waiter)
+            self._dispatch(model)
+        while not waiter.ready.wait(REDISPATCH_INTERVAL):
+            with self._lock:
+                self._dispatch(model)
+        wait = time.time() - start
+        priority_name = PRIORITY_NAMES.get(waiter.effective_priority(), str(waiter.effective_priority()))
+        with self._lock:
+            self._record(waiter.effective_priority(), wait)
+        llm_queue_wait_seconds.labels(model, priority_name).observe(wait)
+        set_span_attributes(**{"llm.priority": priority_name, "llm.queue_wait_s": round(wait, 4)})
+        if wait > 1.0:
+            logger.debug(f"LLM call to {model} waited {wait:.2f}s for a slot ({priority_name}).")
+        call_start = time.time()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            stage_errors_total.labels("llm").inc()
+            raise
+        finally:
+            llm_call_seconds.labels(model).observe(time.time() - call_start)
+            self._release(model, waiter.request)
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            priorities = {}
+            for name, stats in self._stats.items():
+                priorities[name] = dict(stats)
+                priorities[name]["avg_wait"] = stats["total_wait"] / stats["calls"]
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": dict(self._in_flight),
+                "queued": {model: len(waiting) for model, waiting in self._waiting.items()},
+                "queue_wait": priorities,
+            }
+llm_scheduler = LLMScheduler()
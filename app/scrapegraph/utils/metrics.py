@@ -0,0 +1,58 @@
+from typing import Any, Optional, Tuple
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+except ImportError:
+    CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest = "text/plain; charset=utf-8", None, None, None
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (100, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 250000, 1000000)
+class _NoopMetric:
+    """Stands in for the Prometheus metrics when prometheus_client is not installed."""
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+    def observe(self, value: float) -> None:
+        pass
+    def inc(self, amount: float = 1) -> None:
+        pass
+def _histogram(name: str, documentation: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+    return Histogram(name, documentation, labels, buckets=buckets) if Histogram else _NoopMetric()
+def _counter(name: str, documentation: str, labels: Tuple[str, ...]):
+    return Counter(name, documentation, labels) if Counter else _NoopMetric()
+node_exec_seconds = _histogram("scrapegraph_node_exec_seconds", "Graph node execution time", ("graph", "node"), LATENCY_BUCKETS)
+fetch_seconds = _histogram("scrapegraph_fetch_seconds", "Browser fetch time per page", ("outcome",), LATENCY_BUCKETS)
+llm_queue_wait_seconds = _histogram("scrapegraph_llm_queue_wait_seconds", "Time LLM calls waited for a model slot", ("model", "priority"), LATENCY_BUCKETS)
+llm_call_seconds = _histogram("scrapegraph_llm_call_seconds", "LLM call latency", ("model",), LATENCY_BUCKETS)
+llm_prompt_tokens = _histogram("scrapegraph_llm_prompt_tokens", "Prompt tokens per LLM call, from the provider's usage metadata", ("model",), TOKEN_BUCKETS)
+llm_completion_tokens = _histogram("scrapegraph_llm_completion_tokens", "Completion tokens per LLM call, from the provider's usage metadata", ("model",), TOKEN_BUCKETS)
+cache_lookups_total = _counter("scrapegraph_cache_lookups_total", "Cache and in-flight deduplication lookups", ("cache", "result"))
+stage_errors_total = _counter("scrapegraph_stage_errors_total", "Errors per pipeline stage", ("stage",))
+# Schema cache hits are counted by cache_lookups_total{cache="schema"}.
+schema_classifier_decisions_total = _counter("scrapegraph_schema_classifier_decisions_total", "Schema need decisions of the local classifier", ("decision",))
+schema_generation_total = _counter("scrapegraph_schema_generation_total", "Schema definitions by where they came from: the schema cache, the classifier or the LLM", ("source",))
+schema_latency_saved_seconds_total = _counter("scrapegraph_schema_latency_saved_seconds_total", "Estimated schema generation LLM time avoided, at the average LLM latency", ("source",))
+def usage_tokens(message: Any) -> Optional[Tuple[int, int]]:
+    """
+    Returns `(prompt_tokens, completion_tokens)` of an LLM response: Gemini reports them in
+    the message's `usage_metadata`, other providers in `response_metadata["token_usage"]`.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage")
+    if token_usage:
+        return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+    return None
+def record_llm_usage(model: str, message: Any) -> None:
+    tokens = usage_tokens(message)
+    if tokens is not None:
+        llm_prompt_tokens.labels(model).observe(tokens[0])
+        llm_completion_tokens.labels(model).observe(tokens[1])
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_lookups_total.labels(cache, "hit" if hit else "miss").inc()
+def metrics_available() -> bool:
+    return generate_latest is not None
+def render_metrics() -> bytes:
+    """Prometheus text exposition of the default registry."""
+    if generate_latest is None:
+        raise RuntimeError("prometheus_client is not installed. Install it with 'pip install prometheus-client'.")
+    return generate_latest()
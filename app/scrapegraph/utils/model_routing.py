@@ -0,0 +1,73 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
+from .logging import get_logger
+logger = get_logger(__name__)
+@dataclass
+class ModelTier:
+    name: str
+    llm: Any
+    max_input_tokens: Optional[int] = None
+    def accepts(self, input_tokens: int) -> bool:
+        return self.max_input_tokens is None or input_tokens <= self.max_input_tokens
+class ModelRouter:
+    """
+    Picks the chat models of each pipeline stage. `routes` maps a node class name
+    (e.g. "GenerateAnswerNode") or node name to a cascade of tiers, cheapest first:
+    {"GenerateAnswerNode": [{"model": "gemini-2.5-flash-lite", "max_input_tokens": 32000}, "gemini-2.5-flash"]}.
+    A tier without `max_input_tokens` takes what fits in its model's context window,
+    as given by `token_limit`. Models are created once per name.
+    """
+    def __init__(
+        self,
+        routes: Optional[Dict[str, List[Union[str, dict]]]],
+        llm_factory: Callable[[str], Any],
+        token_limit: Optional[Callable[[str], Optional[int]]] = None,
+    ):
+        self.routes = routes or {}
+        self.llm_factory = llm_factory
+        self.token_limit = token_limit or (lambda name: None)
+        self._models: Dict[str, Any] = {}
+    def _model(self, name: str) -> Any:
+        if name not in self._models:
+            self._models[name] = self.llm_factory(name)
+        return self._models[name]
+    def tiers_for(self, node: Any) -> List[ModelTier]:
+        route = self.routes.get(node.node_name) or self.routes.get(type(node).__name__)
+        if not route:
+            return []
+        if isinstance(route, (str, dict)):
+            route = [route]
+        tiers = []
+        for spec in route:
+            spec = {"model": spec} if isinstance(spec, str) else spec
+            max_input_tokens = spec.get("max_input_tokens") or self.token_limit(spec["model"])
+            tiers.append(ModelTier(name=spec["model"], llm=self._model(spec["model"]), max_input_tokens=max_input_tokens))
+        return tiers
+def select_tiers(tiers: List[ModelTier], input_tokens: int) -> List[ModelTier]:
+    """Drops the tiers that cannot take `input_tokens`; keeps the last (strongest) tier in any case."""
+    if not tiers:
+        return []
+    selected = [tier for tier in tiers if tier.accepts(input_tokens)]
+    return selected or tiers[-1:]
+class RoutingStats:
+    """Process-wide per-stage latency and escalation counters of routed LLM calls."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+    def record(self, stage: str, model: str, latency: float, escalated: bool) -> None:
+        with self._lock:
+            stats = self._stages.setdefault(stage, {"calls": 0, "escalations": 0, "total_latency": 0.0})
+            stats["calls"] += 1
+            stats["escalations"] += int(escalated)
+            stats["total_latency"] += latency
+            stats[f"calls[{model}]"] = stats.get(f"calls[{model}]", 0) + 1
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {}
+            for stage, stats in self._stages.items():
+                snapshot[stage] = dict(stats)
+                snapshot[stage]["avg_latency"] = stats["total_latency"] / stats["calls"]
+                snapshot[stage]["escalation_rate"] = stats["escalations"] / stats["calls"]
+            return snapshot
+routing_stats = RoutingStats()
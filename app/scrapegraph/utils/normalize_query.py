@@ -0,0 +1,14 @@
+import re
+import unicodedata
+_whitespace_pattern = re.compile(r"\s+")
+_edge_punctuation = " \t\n\"'`.,;:!?"
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a natural language query so that near-identical queries
+    (case, unicode form, whitespace, surrounding quotes and punctuation) share one key.
+    """
+    if not isinstance(query, str):
+        return ""
+    normalized = unicodedata.normalize("NFKC", query).casefold()
+    normalized = _whitespace_pattern.sub(" ", normalized)
+    return normalized.strip(_edge_punctuation)
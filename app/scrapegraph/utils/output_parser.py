@@ -1,6 +1,8 @@
 from typing import Any, Callable, Dict, Type, Union
 import json
 import re
+import threading
+from langchain_core.exceptions import OutputParserException
 from pydantic import BaseModel, ValidationError
 try:
     from pydantic.v1 import BaseModel as BaseModelV1
@@ -45,3 +47,31 @@ def _base_model_v2_output_parser(x: Any) -> dict:
     return x
 def _dict_output_parser(x: dict) -> dict:
     return x
+class StructuredOutputError(ValueError):
+    """Raised when a schema-constrained LLM response cannot be parsed into the schema."""
+    pass
+# Failures of a schema-constrained response that the text output mode can recover from;
+# any other error (quota, network, timeout) is not a reason to retry in text mode.
+STRUCTURED_OUTPUT_ERRORS = (StructuredOutputError, OutputParserException, ValidationError)
+class OutputModeStats:
+    """Process-wide comparison of the structured and text output modes: calls, failures, retries and prompt size."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modes: Dict[str, Dict[str, float]] = {}
+    def record(self, mode: str, prompt_tokens: int, failed: bool, retried: bool = False) -> None:
+        with self._lock:
+            stats = self._modes.setdefault(mode, {"calls": 0, "failures": 0, "retries": 0, "prompt_tokens": 0})
+            stats["calls"] += 1
+            stats["failures"] += int(failed)
+            stats["retries"] += int(retried)
+            stats["prompt_tokens"] += prompt_tokens
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {}
+            for mode, stats in self._modes.items():
+                snapshot[mode] = dict(stats)
+                snapshot[mode]["failure_rate"] = stats["failures"] / stats["calls"]
+                snapshot[mode]["retry_rate"] = stats["retries"] / stats["calls"]
+                snapshot[mode]["avg_prompt_tokens"] = stats["prompt_tokens"] / stats["calls"]
+            return snapshot
+output_mode_stats = OutputModeStats()
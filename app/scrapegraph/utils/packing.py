@@ -0,0 +1,32 @@
+from typing import Hashable, List
+class DocumentPacker:
+    """
+    Packs documents into batches of at most `max_tokens` tokens as they arrive (next-fit),
+    so a batch can be extracted as soon as it is full instead of after every document
+    is loaded. Documents larger than `max_tokens` are never packed.
+    """
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self._batch: List[Hashable] = []
+        self._load = 0
+    def fits(self, size: int) -> bool:
+        return 0 < size <= self.max_tokens
+    def add(self, key: Hashable, size: int) -> List[List[Hashable]]:
+        """Adds a document; returns the batches it closed, ready for extraction."""
+        if not self.fits(size):
+            raise ValueError(f"Document of {size} tokens cannot be packed within {self.max_tokens} tokens.")
+        closed = []
+        if self._load + size > self.max_tokens:
+            closed.append(self._batch)
+            self._batch, self._load = [], 0
+        self._batch.append(key)
+        self._load += size
+        if self._load == self.max_tokens:
+            closed.append(self._batch)
+            self._batch, self._load = [], 0
+        return closed
+    def flush(self) -> List[List[Hashable]]:
+        """Closes the open batch, if any."""
+        closed = [self._batch] if self._batch else []
+        self._batch, self._load = [], 0
+        return closed
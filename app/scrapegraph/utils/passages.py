@@ -0,0 +1,38 @@
+import re
+from typing import Iterable, List
+from .tokenizer import num_tokens_calculus
+_token_pattern = re.compile(r"\w+")
+_paragraph_pattern = re.compile(r"\n\s*\n")
+STOPWORDS = {"the", "a", "an", "of", "and", "or", "to", "in", "on", "for", "is", "are", "what", "which", "with", "by", "from", "list", "name", "names"}
+def _terms(text: str) -> set:
+    return {term for term in _token_pattern.findall(text.lower()) if term not in STOPWORDS and len(term) > 1}
+def split_passages(chunks: Iterable[str], max_chars: int = 1200) -> List[str]:
+    """Splits document chunks into paragraph passages of at most about `max_chars` characters."""
+    passages = []
+    for chunk in chunks:
+        for paragraph in _paragraph_pattern.split(str(chunk)):
+            paragraph = paragraph.strip()
+            while paragraph:
+                passages.append(paragraph[:max_chars])
+                paragraph = paragraph[max_chars:].strip()
+    return passages
+def select_passages(chunks: Iterable[str], query: str, max_tokens: int = 2000) -> List[str]:
+    """
+    Returns the passages sharing the most terms with `query`, best first, within a
+    budget of `max_tokens`. Passages without any shared term are never selected.
+    """
+    query_terms = _terms(query)
+    scored = []
+    for position, passage in enumerate(split_passages(chunks)):
+        overlap = len(query_terms & _terms(passage))
+        if overlap:
+            scored.append((-overlap, position, passage))
+    scored.sort()
+    selected, used = [], 0
+    for _, _, passage in scored:
+        tokens = num_tokens_calculus(passage)
+        if used + tokens > max_tokens:
+            continue
+        selected.append(passage)
+        used += tokens
+    return selected
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from .logging import get_logger
+from .metrics import record_cache_lookup
+logger = get_logger(__name__)
+class PersistentCache:
+    """
+    Small key/value cache persisted in SQLite with a TTL and a bounded number of
+    entries (least recently used entries are evicted first). Several worker
+    processes pointing at the same file share the cache.
+    """
+    def __init__(self, path: str, namespace: str, ttl: float, max_entries: int = 10000):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is None or row[1] < now:
+                    self.misses += 1
+                    record_cache_lookup(self.namespace, False)
+                    return None
+                self._conn.execute(
+                    "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key),
+                )
+                self.hits += 1
+            record_cache_lookup(self.namespace, True)
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.namespace}' lookup failed: {e}")
+            self.misses += 1
+            return None
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), expires_at, now),
+                )
+                self._evict(now)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.namespace}' write failed: {e}")
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?", (self.namespace, now))
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        )
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+_caches: Dict[Tuple[str, str], PersistentCache] = {}
+_caches_lock = threading.Lock()
+def get_persistent_cache(path: str, namespace: str, ttl: float, max_entries: int = 10000) -> PersistentCache:
+    """Returns the process-wide cache instance for `path` and `namespace`, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get((path, namespace))
+        if cache is None:
+            cache = PersistentCache(path, namespace, ttl, max_entries)
+            _caches[(path, namespace)] = cache
+        return cache
@@ -1,4 +1,8 @@
 from typing import Union, List, Dict
+_STANDARD_KEYS = {
+    "node_name", "total_tokens", "prompt_tokens", "completion_tokens",
+    "successful_requests", "total_cost_USD", "exec_time", "error",
+}
 def prettify_exec_info(
     complete_result: List[Dict], as_string: bool = True
 ) -> Union[str, List[Dict]]:
@@ -52,4 +56,16 @@ def prettify_exec_info(
     lines.append("-" * len(header))
     lines.append(f"Total Nodes Executed: {len(complete_result) - (1 if summary_item else 0)}")
     lines.append(f"Failed Nodes: {failed_nodes}")
+    metric_lines = []
+    for item in complete_result:
+        extra = {key: value for key, value in item.items() if key not in _STANDARD_KEYS}
+        if extra:
+            formatted = ", ".join(
+                f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in extra.items()
+            )
+            metric_lines.append(f"  {item.get('node_name', 'Unknown')}: {formatted}")
+    if metric_lines:
+        lines.append("Node Metrics:")
+        lines.extend(metric_lines)
     return "\n".join(lines)
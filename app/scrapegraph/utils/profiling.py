@@ -0,0 +1,196 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+# Leaf frames in these modules are threads blocked on locks, queues, selectors or sockets.
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", "socket.py", "ssl.py")
+_profile_var: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+def _short_path(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+def _function(frame: Any) -> str:
+    code = frame.f_code
+    return f"{_short_path(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+class SamplingProfiler:
+    """
+    Samples the Python stack of every other thread each `interval` seconds. Counts the
+    leaf function (self samples) and every function on the stack (cumulative samples).
+    Samples of threads blocked in `IDLE_MODULES` are skipped, so the counts approximate
+    where CPU time goes. All threads of the process are sampled, including those of
+    other requests running at the same time. `on_tick` is called after every sample.
+    """
+    def __init__(self, interval: float = 0.005, on_tick: Optional[Callable[[], None]] = None):
+        self.interval = interval
+        self.on_tick = on_tick
+        self.samples = 0
+        self.idle_samples = 0
+        self.self_counts: Counter = Counter()
+        self.cumulative_counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if self.on_tick is not None:
+                self.on_tick()
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            if os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                self.idle_samples += 1
+                continue
+            self.samples += 1
+            self.self_counts[_function(frame)] += 1
+            seen = set()
+            while frame is not None:
+                function = _function(frame)
+                if function not in seen:
+                    seen.add(function)
+                    self.cumulative_counts[function] += 1
+                frame = frame.f_back
+    def report(self, top_n: int) -> Dict[str, Any]:
+        def top(counts: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"function": function, "samples": count, "share": round(count / self.samples, 4)}
+                for function, count in counts.most_common(top_n)
+            ]
+        return {
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "self": top(self.self_counts),
+            "cumulative": top(self.cumulative_counts),
+        }
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+def _stop_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+class PeakAllocationTracker:
+    """
+    Keeps a tracemalloc snapshot of the traced memory near its peak: polled regularly, it
+    takes a new snapshot whenever traced memory grew by `growth` since the last one.
+    """
+    def __init__(self, growth: float = 1.2):
+        self.growth = growth
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_size = 0
+    def poll(self) -> None:
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.snapshot_size * self.growth:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+def _allocation_sites(snapshot: tracemalloc.Snapshot, top_n: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    return [
+        {"location": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}", "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:top_n]
+    ]
+class ProfileSession:
+    """Wall and CPU time per graph node of one profiled execution."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.nodes: Dict[str, Dict[str, float]] = {}
+    @contextmanager
+    def node(self, graph_name: str, node_name: str) -> Iterator[None]:
+        # CPU time is that of the thread running the node; work a node hands to other
+        # threads (sub-graphs, parallel chains) is counted by the nodes running there.
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            with self._lock:
+                stats = self.nodes.setdefault(f"{graph_name}.{node_name}", {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                stats["calls"] += 1
+                stats["wall_s"] += wall
+                stats["cpu_s"] += cpu
+    def node_report(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            ordered = sorted(self.nodes.items(), key=lambda item: item[1]["wall_s"], reverse=True)
+            return {name: {key: round(value, 4) for key, value in stats.items()} for name, stats in ordered}
+@contextmanager
+def profile_execution(interval: float = 0.005, top_n: int = 25, trace_allocations: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Profiles the code run in this context: per-node wall and CPU time (through
+    `profile_node`) and a sampling profile of hot functions. With `trace_allocations`,
+    also the top allocation sites near peak traced memory; tracemalloc slows down
+    allocation-heavy code severalfold, which inflates the timings. Yields a dict
+    filled with the report on exit.
+    """
+    report: Dict[str, Any] = {}
+    session = ProfileSession()
+    tracker = PeakAllocationTracker() if trace_allocations else None
+    profiler = SamplingProfiler(interval, on_tick=tracker.poll if tracker else None)
+    if tracker:
+        _start_tracemalloc()
+    token = _profile_var.set(session)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    profiler.start()
+    try:
+        yield report
+    finally:
+        profiler.stop()
+        _profile_var.reset(token)
+        report.update({
+            "wall_s": round(time.perf_counter() - wall_start, 4),
+            "process_cpu_s": round(time.process_time() - cpu_start, 4),
+            "nodes": session.node_report(),
+            "hot_functions": profiler.report(top_n),
+        })
+        if tracker:
+            tracker.poll()
+            _, peak = tracemalloc.get_traced_memory()
+            _stop_tracemalloc()
+            report["allocations"] = _allocation_sites(tracker.snapshot, top_n) if tracker.snapshot else []
+            report["traced_peak_kb"] = round(peak / 1024, 1)
+@contextmanager
+def node_timing() -> Iterator[ProfileSession]:
+    """
+    Times the graph nodes run in this context (and in threads copying it), without the
+    sampler or tracemalloc, so it is cheap enough for load tests.
+    """
+    session = ProfileSession()
+    token = _profile_var.set(session)
+    try:
+        yield session
+    finally:
+        _profile_var.reset(token)
+def profile_node(graph_name: str, node_name: str) -> ContextManager[None]:
+    """Times a node when the current execution is profiled; a no-op otherwise."""
+    session = _profile_var.get()
+    if session is None:
+        return nullcontext()
+    return session.node(graph_name, node_name)
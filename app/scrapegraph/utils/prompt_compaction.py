@@ -0,0 +1,108 @@
+import json
+import threading
+from typing import Any, Dict, List, Type
+from pydantic import BaseModel
+from .tokenizer import num_tokens_calculus
+DEFAULT_MIN_REF_CHARS = 40
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+def _minimal_schema(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_minimal_schema(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    minimal = {}
+    for key, value in node.items():
+        if key == "title" or (key == "default" and value is None) or (key == "description" and not value):
+            continue
+        if key in ("properties", "$defs"):
+            minimal[key] = {name: _minimal_schema(child) for name, child in value.items()}
+        else:
+            minimal[key] = _minimal_schema(value)
+    # Optional[X] of a plain type becomes {"type": [X, "null"]} instead of an anyOf.
+    variants = minimal.get("anyOf")
+    if isinstance(variants, list) and len(variants) == 2 and {"type": "null"} in variants:
+        other = variants[0] if variants[1] == {"type": "null"} else variants[1]
+        if set(other) == {"type"} and isinstance(other["type"], str):
+            minimal.pop("anyOf")
+            minimal["type"] = [other["type"], "null"]
+    return minimal
+def compact_schema(schema: Type[BaseModel]) -> str:
+    """JSON schema of `schema` without titles, null defaults or whitespace."""
+    return compact_json(_minimal_schema(schema.model_json_schema()))
+def strip_empty(value: Any) -> Any:
+    """Recursively drops null values, empty strings and empty containers."""
+    if isinstance(value, dict):
+        stripped = {key: strip_empty(item) for key, item in value.items()}
+        return {key: item for key, item in stripped.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        stripped = [strip_empty(item) for item in value]
+        return [item for item in stripped if item not in (None, "", [], {})]
+    return value
+def _values(result: Any) -> List[Any]:
+    values = []
+    for value in result.values() if isinstance(result, dict) else []:
+        values.extend(value if isinstance(value, list) else [value])
+    return values
+def _escape_refs(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith("@"):
+        return "@" + value
+    if isinstance(value, list):
+        return [_escape_refs(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _escape_refs(item) for key, item in value.items()}
+    return value
+def compact_results(results: List[Any], label: str = "Source", min_ref_chars: int = DEFAULT_MIN_REF_CHARS) -> str:
+    """
+    Serializes per-source results as compact JSON lines without empty fields. Long values
+    (fields or list items) found in more than one result are written once in a REFS table
+    and referenced as "@N" in the results. Strings of the results starting with "@" are
+    then written with a doubled "@", so they cannot be mistaken for references.
+    """
+    stripped = [strip_empty(result) for result in results]
+    counts: Dict[str, int] = {}
+    for result in stripped:
+        for key in {compact_json(value) for value in _values(result)}:
+            if len(key) >= min_ref_chars:
+                counts[key] = counts.get(key, 0) + 1
+    refs = {key: f"@{i + 1}" for i, key in enumerate(key for key, count in counts.items() if count > 1)}
+    def substitute(value: Any) -> Any:
+        if isinstance(value, list):
+            return [substitute(item) for item in value]
+        ref = refs.get(compact_json(value))
+        return ref if ref is not None else _escape_refs(value)
+    lines = []
+    if refs:
+        table = {ref: _escape_refs(json.loads(key)) for key, ref in refs.items()}
+        lines.append(f"REFS (values written as @N in the results below; a string starting with @@ is a literal starting with @): {compact_json(table)}")
+    for i, result in enumerate(stripped):
+        if refs and isinstance(result, dict):
+            result = {key: substitute(value) for key, value in result.items()}
+        elif refs:
+            result = _escape_refs(result)
+        lines.append(f"{label} {i + 1}: {compact_json(result) if isinstance(result, (dict, list)) else result}")
+    return "\n".join(lines)
+class CompactionStats:
+    """Process-wide prompt tokens before and after compaction, per prompt part."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._parts: Dict[str, Dict[str, int]] = {}
+    def record(self, part: str, original: str, compacted: str, prompts: int = 1) -> int:
+        """Counts the tokens of both versions and returns the tokens saved over `prompts` prompts."""
+        original_tokens = num_tokens_calculus(original) * prompts
+        compacted_tokens = num_tokens_calculus(compacted) * prompts
+        with self._lock:
+            stats = self._parts.setdefault(part, {"prompts": 0, "original_tokens": 0, "compacted_tokens": 0})
+            stats["prompts"] += prompts
+            stats["original_tokens"] += original_tokens
+            stats["compacted_tokens"] += compacted_tokens
+        return original_tokens - compacted_tokens
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {}
+            for part, stats in self._parts.items():
+                snapshot[part] = dict(stats)
+                snapshot[part]["tokens_saved"] = stats["original_tokens"] - stats["compacted_tokens"]
+                snapshot[part]["saved_ratio"] = snapshot[part]["tokens_saved"] / stats["original_tokens"] if stats["original_tokens"] else 0.0
+            return snapshot
+compaction_stats = CompactionStats()
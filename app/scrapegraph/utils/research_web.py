@@ -1,32 +1,155 @@
-import re
-from typing import List
-from langchain_community.tools import DuckDuckGoSearchResults
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Union
+from .cassette import active_cassette
 from .logging import get_logger
+from .search_backends import SearchResult, get_search_backend
+from .url_canonicalization import canonicalize_url, clean_url
 logger = get_logger(__name__)
-def search_on_web(
+RRF_K = 60
+OVERFETCH_FACTOR = 2
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="web-search")
+def _engine_names(search_engine: Union[str, List[str]]) -> List[str]:
+    if isinstance(search_engine, str):
+        search_engine = search_engine.split(",")
+    names = []
+    for name in search_engine:
+        name = name.strip().lower()
+        if name and name not in names:
+            names.append(name)
+    return names or ["duckduckgo"]
+def reciprocal_rank_fusion(result_lists: List[List[SearchResult]], k: int = RRF_K) -> List[SearchResult]:
+    """
+    Combines ranked result lists from several engines: every canonical URL scores
+    sum(1 / (k + rank)) over the engines that returned it, counting only its best
+    rank per engine. The first occurrence provides URL, title and snippet; `rank` of
+    the fused results is the fused position.
+    """
+    fused: Dict[str, SearchResult] = {}
+    for results in result_lists:
+        counted = set()
+        for position, result in enumerate(results, start=1):
+            key = canonicalize_url(result.url)
+            if key in counted:
+                continue
+            counted.add(key)
+            score = 1.0 / (k + (result.rank or position))
+            if key not in fused:
+                fused[key] = SearchResult(url=clean_url(result.url), title=result.title, snippet=result.snippet, engine=result.engine)
+            fused[key].score += score
+            if result.engine and result.engine not in fused[key].engine.split(","):
+                fused[key].engine += f",{result.engine}"
+    ranked = sorted(fused.values(), key=lambda result: result.score, reverse=True)
+    for rank, result in enumerate(ranked, start=1):
+        result.rank = rank
+    return ranked
+def _agreeing(result_lists: List[List[SearchResult]], min_agreement: int) -> int:
+    counts: Dict[str, int] = {}
+    for results in result_lists:
+        for url in {canonicalize_url(result.url) for result in results}:
+            counts[url] = counts.get(url, 0) + 1
+    return sum(1 for count in counts.values() if count >= min_agreement)
+def search_on_web_structured(
     query: str,
-    search_engine: str = "duckduckgo",
+    search_engine: Union[str, List[str]] = "duckduckgo",
     max_results: int = 10,
-) -> List[str]:
+    backend_options: Optional[Dict[str, dict]] = None,
+    timeout: float = 10.0,
+    min_agreement: Optional[int] = None,
+) -> List[SearchResult]:
+    """
+    Queries every configured engine concurrently, each within `timeout` seconds, and
+    fuses their rankings with reciprocal rank fusion. Each engine is asked for
+    `OVERFETCH_FACTOR` times `max_results`, so that after equivalent URLs are
+    collapsed there are still `max_results` distinct pages. Returns early once
+    `max_results` URLs are backed by at least `min_agreement` engines (defaults to 2
+    when several engines are configured), so one slow engine does not stall the search.
+    With an active cassette, the fused results are recorded or replayed.
+    """
     if not query or not isinstance(query, str):
         logger.error("Search query must be a non-empty string.")
         return []
-    search_engine = search_engine.lower()
-    if search_engine != "duckduckgo":
-        logger.warning(f"Search engine '{search_engine}' is not supported. Using DuckDuckGo.")
+    names = _engine_names(search_engine)
+    cassette = active_cassette()
+    if cassette is None:
+        return _search_engines(query, names, max_results, backend_options or {}, timeout, min_agreement)
+    key = cassette.key("search", names, query, max_results)
+    if cassette.replaying:
+        return [SearchResult(**result) for result in cassette.replay(key)["results"]]
+    start_time = time.time()
     try:
-        logger.info(f"Performing DuckDuckGo search for: '{query}' (max_results={max_results})")
-        research = DuckDuckGoSearchResults(num_results=max_results)
-        res = research.run(query)
-        urls = re.findall(r"https?://[^\s,\]]+", res)
-        cleaned_urls = [url.strip('.,') for url in urls]
-        filtered_urls = filter_non_html_links(cleaned_urls)
-        if not filtered_urls:
-             logger.warning(f"No valid URLs extracted from DuckDuckGo results for query: '{query}'")
-        return filtered_urls[:max_results]
+        results = _search_engines(query, names, max_results, backend_options or {}, timeout, min_agreement)
     except Exception as e:
-        logger.error(f"DuckDuckGo search failed for query '{query}': {str(e)}")
+        cassette.record_error(key, e, time.time() - start_time)
+        raise
+    cassette.record(key, {"results": [result.to_dict() for result in results]}, time.time() - start_time)
+    return results
+def _search_engines(
+    query: str,
+    names: List[str],
+    max_results: int,
+    backend_options: Dict[str, dict],
+    timeout: float,
+    min_agreement: Optional[int],
+) -> List[SearchResult]:
+    if min_agreement is None:
+        min_agreement = min(2, len(names))
+    futures = {}
+    for name in names:
+        try:
+            backend = get_search_backend(name, **backend_options.get(name, {}))
+        except Exception as e:
+            logger.warning(f"Search engine '{name}' is not available: {e}")
+            continue
+        logger.info(f"Performing {name} search for: '{query}' (max_results={max_results})")
+        futures[_search_executor.submit(backend.search, query, max_results * OVERFETCH_FACTOR)] = name
+    if not futures:
+        logger.error(f"No usable search engine among {names}.")
         return []
+    deadline = time.monotonic() + timeout
+    pending = set(futures)
+    result_lists: List[List[SearchResult]] = []
+    returned_early = False
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            try:
+                results = future.result()
+                logger.debug(f"Search engine '{name}' returned {len(results)} results.")
+                result_lists.append(results)
+            except Exception as e:
+                logger.error(f"{name} search failed for query '{query}': {e}")
+        if pending and _agreeing(result_lists, min_agreement) >= max_results:
+            logger.info(f"Enough agreeing results after {len(result_lists)}/{len(futures)} engines, not waiting for the rest.")
+            returned_early = True
+            break
+    for future in pending:
+        if not returned_early:
+            logger.warning(f"Search engine '{futures[future]}' did not answer within {timeout}s.")
+        future.cancel()
+    fused = [result for result in reciprocal_rank_fusion(result_lists) if filter_non_html_links([result.url])]
+    if not fused:
+        logger.warning(f"No valid URLs extracted from search results for query: '{query}'")
+    return fused[:max_results]
+def search_on_web(
+    query: str,
+    search_engine: Union[str, List[str]] = "duckduckgo",
+    max_results: int = 10,
+    backend_options: Optional[Dict[str, dict]] = None,
+    timeout: float = 10.0,
+) -> List[str]:
+    results = search_on_web_structured(
+        query,
+        search_engine=search_engine,
+        max_results=max_results,
+        backend_options=backend_options,
+        timeout=timeout,
+    )
+    return [result.url for result in results]
 def filter_non_html_links(links: List[str]) -> List[str]:
     non_html_extensions = {'.pdf', '.xml', '.json', '.csv', '.zip', '.rar', '.exe', '.dmg', '.mp3', '.mp4', '.avi', '.mov', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp'}
     filtered = []
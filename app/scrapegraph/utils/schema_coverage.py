@@ -0,0 +1,89 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional, Type
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, create_model
+EMPTY_MARKERS = {"", "na", "n/a", "none", "null", "unknown", "not found", "not available"}
+DEFAULT_IGNORED_FIELDS = ("sources",)
+def is_empty_value(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in EMPTY_MARKERS
+    if isinstance(value, (list, dict, tuple, set)):
+        return len(value) == 0 or all(is_empty_value(item) for item in (value.values() if isinstance(value, dict) else value))
+    return False
+def schema_fields(schema: Optional[Type[BaseModel]], ignore: Iterable[str] = DEFAULT_IGNORED_FIELDS) -> List[str]:
+    if schema is None:
+        return []
+    return [name for name in schema.model_fields if name not in ignore]
+def missing_fields(answer: Any, schema: Optional[Type[BaseModel]], ignore: Iterable[str] = DEFAULT_IGNORED_FIELDS) -> List[str]:
+    """Returns the schema fields that are absent, null or empty in `answer`."""
+    fields = schema_fields(schema, ignore)
+    if not isinstance(answer, dict) or "error" in answer:
+        return fields
+    return [name for name in fields if is_empty_value(answer.get(name))]
+def field_coverage(answer: Any, schema: Optional[Type[BaseModel]], ignore: Iterable[str] = DEFAULT_IGNORED_FIELDS) -> float:
+    """Share of the schema fields (0.0 - 1.0) that `answer` fills."""
+    fields = schema_fields(schema, ignore)
+    if not fields:
+        return 1.0
+    return 1.0 - len(missing_fields(answer, schema, ignore)) / len(fields)
+def subset_model(schema: Type[BaseModel], fields: Iterable[str], model_name: Optional[str] = None) -> Type[BaseModel]:
+    """Creates a model with only `fields` of `schema`, all optional, keeping types and descriptions."""
+    fields_config: Dict[str, Any] = {}
+    for name in fields:
+        field_info = schema.model_fields.get(name)
+        if field_info is None:
+            continue
+        fields_config[name] = (Optional[field_info.annotation], Field(default=None, description=field_info.description))
+    return create_model(model_name or f"{schema.__name__}Subset", __doc__=schema.__doc__, **fields_config)
+def fill_missing(answer: Dict[str, Any], partial: Any, fields: Iterable[str]) -> Dict[str, Any]:
+    """Copies non-empty values of `fields` from `partial` into `answer` where `answer` lacks them."""
+    if not isinstance(partial, dict) or "error" in partial:
+        return answer
+    for name in fields:
+        if is_empty_value(answer.get(name)) and not is_empty_value(partial.get(name)):
+            answer[name] = partial[name]
+    return answer
+def _vote_key(value: Any) -> str:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return json.dumps(value, sort_keys=True, default=str).lower()
+def conflicting_fields(answers: List[Any], schema: Optional[Type[BaseModel]], ignore: Iterable[str] = DEFAULT_IGNORED_FIELDS) -> List[str]:
+    """
+    Returns the schema fields for which the per-source `answers` disagree: at least two
+    distinct values were extracted and no single value has more votes than the others.
+    """
+    conflicts = []
+    for name in schema_fields(schema, ignore):
+        votes: Dict[str, int] = {}
+        for answer in answers:
+            if isinstance(answer, dict) and "error" not in answer and not is_empty_value(answer.get(name)):
+                key = _vote_key(answer[name])
+                votes[key] = votes.get(key, 0) + 1
+        counts = sorted(votes.values(), reverse=True)
+        if len(counts) > 1 and counts[0] == counts[1]:
+            conflicts.append(name)
+    return conflicts
+def combined_coverage(answers: List[Any], schema: Optional[Type[BaseModel]], ignore: Iterable[str] = DEFAULT_IGNORED_FIELDS) -> float:
+    """Share of the schema fields filled by at least one of the per-source `answers`."""
+    fields = schema_fields(schema, ignore)
+    if not fields:
+        return 1.0
+    missing = set(fields)
+    for answer in answers:
+        missing.intersection_update(missing_fields(answer, schema, ignore))
+    return 1.0 - len(missing) / len(fields)
+def invalid_fields(answer: Any, schema: Optional[Type[BaseModel]], ignore: Iterable[str] = DEFAULT_IGNORED_FIELDS) -> List[str]:
+    """Returns the schema fields whose non-empty value in `answer` does not validate against the field's type."""
+    if schema is None or not isinstance(answer, dict):
+        return []
+    invalid = []
+    for name in schema_fields(schema, ignore):
+        value = answer.get(name)
+        if is_empty_value(value):
+            continue
+        try:
+            TypeAdapter(schema.model_fields[name].annotation).validate_python(value)
+        except ValidationError:
+            invalid.append(name)
+    return invalid
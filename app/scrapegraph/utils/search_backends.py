@@ -0,0 +1,97 @@
+import json
+import re
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+import requests
+from .logging import get_logger
+logger = get_logger(__name__)
+@dataclass
+class SearchResult:
+    url: str
+    title: str = ""
+    snippet: str = ""
+    engine: str = ""
+    rank: int = 0
+    score: float = 0.0
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+class SearchBackend(ABC):
+    """Interface of a web search engine used by `search_on_web`."""
+    name = "backend"
+    @abstractmethod
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        pass
+class DuckDuckGoSearchBackend(SearchBackend):
+    name = "duckduckgo"
+    def __init__(self, region: str = "wt-wt", safesearch: str = "moderate", **kwargs: Any):
+        self.region = region
+        self.safesearch = safesearch
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+        wrapper = DuckDuckGoSearchAPIWrapper(region=self.region, safesearch=self.safesearch, max_results=max_results)
+        return [
+            SearchResult(url=item["link"], title=item.get("title", ""), snippet=item.get("snippet", ""), engine=self.name, rank=rank)
+            for rank, item in enumerate(wrapper.results(query, max_results=max_results), start=1)
+            if item.get("link")
+        ]
+class SearxNGSearchBackend(SearchBackend):
+    """Queries a (self-hosted) SearxNG instance through its JSON API."""
+    name = "searxng"
+    def __init__(self, base_url: str, timeout: float = 10.0, **kwargs: Any):
+        if not base_url:
+            raise ValueError("SearxNG search backend requires a 'base_url'.")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        response = requests.get(
+            f"{self.base_url}/search",
+            params={"q": query, "format": "json"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        items = response.json().get("results", [])[:max_results]
+        return [
+            SearchResult(url=item["url"], title=item.get("title", ""), snippet=item.get("content", ""), engine=self.name, rank=rank)
+            for rank, item in enumerate(items, start=1)
+            if item.get("url")
+        ]
+class LocalSearchBackend(SearchBackend):
+    """
+    Offline stand-in search engine. Documents (`url`, `title`, `snippet`) are given
+    inline or loaded from a JSON file and ranked by term overlap with the query.
+    """
+    name = "local"
+    _token_pattern = re.compile(r"\w+")
+    def __init__(self, documents: Optional[List[Dict[str, str]]] = None, path: Optional[str] = None, **kwargs: Any):
+        if documents is None and path:
+            with open(path, "r", encoding="utf-8") as f:
+                documents = json.load(f)
+        self.documents = documents or []
+    def _tokens(self, text: str) -> set:
+        return set(self._token_pattern.findall(text.lower()))
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        query_tokens = self._tokens(query)
+        scored = []
+        for position, document in enumerate(self.documents):
+            overlap = len(query_tokens & self._tokens(f"{document.get('title', '')} {document.get('snippet', '')} {document.get('url', '')}"))
+            if overlap or not query_tokens:
+                scored.append((-overlap, position, document))
+        scored.sort(key=lambda item: (item[0], item[1]))
+        return [
+            SearchResult(url=document["url"], title=document.get("title", ""), snippet=document.get("snippet", ""), engine=self.name, rank=rank)
+            for rank, (_, _, document) in enumerate(scored[:max_results], start=1)
+        ]
+_backend_factories: Dict[str, Callable[..., SearchBackend]] = {
+    DuckDuckGoSearchBackend.name: DuckDuckGoSearchBackend,
+    SearxNGSearchBackend.name: SearxNGSearchBackend,
+    LocalSearchBackend.name: LocalSearchBackend,
+}
+def register_search_backend(name: str, factory: Callable[..., SearchBackend]) -> None:
+    """Registers a search backend factory under `name` so it can be selected in the graph config."""
+    _backend_factories[name.lower()] = factory
+def get_search_backend(name: str, **options: Any) -> SearchBackend:
+    factory = _backend_factories.get(name.lower())
+    if factory is None:
+        raise ValueError(f"Unknown search engine '{name}'. Available: {sorted(_backend_factories)}")
+    return factory(**options)
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import BaseModel
+from .copy import safe_deepcopy
+from .llm_scheduler import llm_scheduler
+from .metrics import record_cache_lookup, record_llm_usage, usage_tokens
+from .tracing import start_span
+from .usage_ledger import record_llm_call
+from .logging import get_logger
+from .output_parser import StructuredOutputError
+logger = get_logger(__name__)
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.duplicates = 0
+        # Futures of followers awaiting the call on an event loop, with their loop.
+        self.waiters = []
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+class SingleFlight:
+    """
+    Deduplicates concurrent calls sharing the same key: the first caller executes the
+    function, callers arriving while it is in flight wait for and share its result.
+    Nothing is cached once the call has finished.
+    """
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+    def join(self, key: Hashable) -> Tuple[_Call, bool]:
+        """
+        Attaches the caller to the call in flight for `key`, or starts one. Returns the call
+        and whether the caller leads it; the leader must `finish` it, followers `wait` for it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                return call, True
+            call.duplicates += 1
+            return call, False
+    def wait(self, key: Hashable, call: _Call) -> Any:
+        """Waits for the leader of `call` and returns a copy of its result, or raises its error."""
+        logger.debug(f"[{self.name}] Joining in-flight call for key: {str(key)[:120]}")
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return safe_deepcopy(call.result)
+    async def await_result(self, key: Hashable, call: _Call) -> Any:
+        """Like `wait`, but awaits the leader on the running event loop instead of blocking a thread."""
+        logger.debug(f"[{self.name}] Joining in-flight call for key: {str(key)[:120]}")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            pending = not call.done.is_set()
+            if pending:
+                call.waiters.append((loop, future))
+        if pending:
+            await future
+        if call.error is not None:
+            raise call.error
+        return safe_deepcopy(call.result)
+    def finish(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publishes the leader's result (or error) to the followers and ends the flight."""
+        call.result = result
+        call.error = error
+        with self._lock:
+            self._calls.pop(key, None)
+            call.done.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # The follower's event loop has been closed; nobody is waiting any more.
+                pass
+        if call.duplicates:
+            logger.info(f"[{self.name}] Shared one call between {call.duplicates + 1} callers.")
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, bool]:
+        """
+        Returns `(result, shared)` where `shared` is True when the result came from a
+        call started by another caller. Followers receive a copy of the result so the
+        callers cannot mutate each other's data.
+        """
+        call, leader = self.join(key)
+        if not leader:
+            return self.wait(key, call), True
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, False
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+fetch_flight = SingleFlight("fetch")
+llm_flight = SingleFlight("llm")
+def _prompt_key(prompt: Any) -> str:
+    if hasattr(prompt, "to_string"):
+        return prompt.to_string()
+    if isinstance(prompt, list):
+        return "\n".join(str(getattr(message, "content", message)) for message in prompt)
+    return str(prompt)
+def _call_llm(span: Any, key: Hashable, model_name: str, invoke: Callable[..., Any], prompt: Any, config: RunnableConfig, priority: Optional[int], raw: Callable[[Any], Any]) -> Any:
+    start_time = time.time()
+    dispatch_times = []
+    def _dispatched(*args: Any, **kwargs: Any) -> Any:
+        dispatch_times.append(time.time())
+        return invoke(*args, **kwargs)
+    try:
+        response, shared = llm_flight.do(key, llm_scheduler.run, model_name, _dispatched, prompt, config=config, priority=priority)
+    except Exception:
+        record_llm_call(model_name, None, time.time() - start_time, error=True, dispatched_at=next(iter(dispatch_times), None))
+        raise
+    record_cache_lookup("llm_inflight", shared)
+    span.set_attribute("llm.shared", shared)
+    # The tokens of a shared call are accounted to the caller that made it.
+    message = None if shared else raw(response)
+    record_llm_call(model_name, message, time.time() - start_time, cached=shared, dispatched_at=next(iter(dispatch_times), None))
+    if shared:
+        return response
+    record_llm_usage(model_name, message)
+    tokens = usage_tokens(message)
+    if tokens is not None:
+        span.set_attributes({"llm.prompt_tokens": tokens[0], "llm.completion_tokens": tokens[1]})
+    return response
+def coalesce_llm(llm_model: Any, schema: Optional[Type[BaseModel]] = None, priority: Optional[int] = None) -> Runnable:
+    """
+    Wraps a chat model so identical prompts sent concurrently to the same model,
+    from any request, share one in-flight LLM call.
+    With a `schema` the model answers through its native JSON-schema-constrained
+    output and the runnable returns the validated answer as a dict, raising
+    `StructuredOutputError` when the response does not parse into the schema.
+    Calls go through `llm_scheduler`; `priority` overrides the priority of the context.
+    """
+    model_name = getattr(llm_model, "model", None) or getattr(llm_model, "model_name", None) or type(llm_model).__name__
+    temperature = getattr(llm_model, "temperature", None)
+    if schema is None:
+        def _invoke(prompt: Any, config: RunnableConfig) -> Any:
+            key = (model_name, temperature, _prompt_key(prompt))
+            with start_span("llm call", {"llm.model": model_name}) as span:
+                return _call_llm(span, key, model_name, llm_model.invoke, prompt, config, priority, raw=lambda response: response)
+        return RunnableLambda(_invoke, name=f"Coalesced[{model_name}]")
+    structured_model = llm_model.with_structured_output(schema, method="json_mode", include_raw=True)
+    schema_key = json.dumps(schema.model_json_schema(), sort_keys=True)
+    def _invoke_structured(prompt: Any, config: RunnableConfig) -> Any:
+        key = (model_name, temperature, schema_key, _prompt_key(prompt))
+        with start_span("llm call", {"llm.model": model_name, "llm.schema": schema.__name__}) as span:
+            response = _call_llm(span, key, model_name, structured_model.invoke, prompt, config, priority, raw=lambda response: response.get("raw"))
+        if response.get("parsing_error") is not None or response.get("parsed") is None:
+            raise StructuredOutputError(f"Structured output did not match schema '{schema.__name__}': {response.get('parsing_error')}")
+        parsed = response["parsed"]
+        return parsed.model_dump() if isinstance(parsed, BaseModel) else parsed
+    return RunnableLambda(_invoke_structured, name=f"CoalescedStructured[{model_name}]")
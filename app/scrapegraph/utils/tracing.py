@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+TRACER_NAME = "app.scrapegraph"
+class _NoopSpan:
+    """Stands in for a span when opentelemetry is not installed."""
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+    def end(self) -> None:
+        pass
+def _clean(attributes: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Span attributes must be primitives; drop unset values instead of recording "None".
+    return {key: value if isinstance(value, (str, bool, int, float)) else str(value) for key, value in (attributes or {}).items() if value is not None}
+@contextmanager
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, end_on_exit: bool = True) -> Iterator[Any]:
+    """
+    Opens an OpenTelemetry span as a child of the current one. Spans follow the context
+    into threads started with a copied context (asyncio.to_thread, LangChain's executors).
+    Exceptions are recorded on the span. Without an SDK configured, spans are not recorded.
+    With `end_on_exit` False the span stays open after the block, until `span.end()`.
+    """
+    if trace is None:
+        yield _NoopSpan()
+        return
+    with trace.get_tracer(TRACER_NAME).start_as_current_span(name, attributes=_clean(attributes), end_on_exit=end_on_exit) as span:
+        yield span
+def set_span_attributes(**attributes: Any) -> None:
+    """Adds attributes to the current span, if any."""
+    if trace is not None:
+        trace.get_current_span().set_attributes(_clean(attributes))
@@ -0,0 +1,74 @@
+import re
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref_src", "ref_url", "_ga", "_gl", "spm", "cmpid", "soc_src", "soc_trk", "outputtype",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "oly_")
+EQUIVALENT_SUBDOMAINS = ("www.", "m.", "mobile.", "amp.")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+_amp_path_pattern = re.compile(r"(/amp)+/?$|\.amp(?=\.html?$|$)", re.IGNORECASE)
+# A scheme other than http(s): "ftp://...", or an opaque one like "mailto:" that is not a host:port pair.
+_other_scheme_pattern = re.compile(r"^(?!https?:)[a-z][a-z0-9+.-]*:(//|(?!\d))", re.IGNORECASE)
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+def clean_url(url: str) -> str:
+    """Strips surrounding punctuation, the fragment and tracking parameters, keeping the URL fetchable."""
+    url = url.strip().strip('.,;)"\'')
+    if _other_scheme_pattern.match(url):
+        return url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(key)])
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+def canonicalize_url(url: str) -> str:
+    """
+    Returns the identity key of a URL: variants that differ only in scheme (http vs
+    https), `www.`/mobile/AMP subdomains, default ports, AMP paths, trailing slashes,
+    fragments, tracking parameters or query parameter order share the same key.
+    The key is meant for comparison, not for fetching. URLs with other schemes (e.g.
+    `mailto:`) and URLs that cannot be parsed are returned as they are.
+    """
+    url = clean_url(url)
+    if _other_scheme_pattern.match(url):
+        return url
+    try:
+        parts = urlsplit(url if "://" in url else f"https://{url}")
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    for prefix in EQUIVALENT_SUBDOMAINS:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    netloc = host if port is None or str(port) == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    path = _amp_path_pattern.sub("", parts.path) or "/"
+    path = re.sub(r"/{2,}", "/", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit(("https" if scheme in DEFAULT_PORTS else scheme, netloc, path, query, ""))
+def dedupe_urls(urls: Iterable[str], limit: Optional[int] = None) -> List[str]:
+    """
+    Collapses equivalent URLs, keeping the first (highest ranked) occurrence of each
+    in its cleaned form and the original order. Stops after `limit` distinct URLs.
+    """
+    seen = set()
+    distinct: List[str] = []
+    for url in urls:
+        if not url:
+            continue
+        key = canonicalize_url(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        distinct.append(clean_url(url))
+        if limit is not None and len(distinct) >= limit:
+            break
+    return distinct
@@ -0,0 +1,82 @@
+import posixpath
+from typing import Dict, List, Optional
+from urllib.parse import SplitResult, parse_qsl, urlsplit
+from ..helpers.default_filters import filter_dict
+from .domain_quality import DomainQualityStore, get_domain
+from .logging import get_logger
+logger = get_logger(__name__)
+RANK_K = 10
+LANG_PENALTY = 0.5
+SAME_DOMAIN_PENALTY = 0.5
+TOKEN_YIELD_TARGET = 2000
+def _matches(parts: SplitResult, pattern: str) -> bool:
+    """
+    Matches a filter pattern against the parsed URL: "/de" against whole path segments,
+    ".js" against the file extension, "lang=" against query parameter names and
+    "facebook.com" against the host and its subdomains. Anything else is a substring test.
+    """
+    if pattern.startswith("/"):
+        wanted = [segment for segment in pattern.split("/") if segment]
+        segments = [segment for segment in parts.path.split("/") if segment]
+        return bool(wanted) and any(segments[i:i + len(wanted)] == wanted for i in range(len(segments) - len(wanted) + 1))
+    if pattern.startswith("."):
+        return posixpath.splitext(parts.path)[1] == pattern
+    if pattern.endswith("="):
+        return any(name == pattern[:-1] for name, _ in parse_qsl(parts.query, keep_blank_values=True))
+    if "." in pattern and "/" not in pattern:
+        host = parts.hostname or ""
+        return host == pattern or host.endswith(f".{pattern}")
+    return pattern in parts.geturl()
+def _quality_factor(store: Optional[DomainQualityStore], domain: str, min_samples: int, max_failure_rate: float) -> Optional[float]:
+    """Returns the domain multiplier, or None when the domain is chronically failing."""
+    if store is None:
+        return 1.0
+    stats = store.get_stats(domain)
+    if stats.fetches < min_samples:
+        return 1.0
+    if stats.failure_rate > max_failure_rate:
+        return None
+    token_yield = min(stats.avg_useful_tokens / TOKEN_YIELD_TARGET, 1.0) if stats.parsed_pages else 0.5
+    return (1.0 - stats.failure_rate) * (0.5 + 0.5 * token_yield) * (0.5 + 0.5 * stats.survival_rate)
+def rank_urls(
+    urls: List[str],
+    quality_store: Optional[DomainQualityStore] = None,
+    filters: Optional[Dict] = None,
+    min_samples: int = 5,
+    max_failure_rate: float = 0.8,
+) -> List[str]:
+    """
+    Re-ranks search result URLs so browser and LLM budget goes to pages most likely
+    to pay off. URLs matching `irrelevant_keywords` or from chronically failing
+    domains are dropped; language-specific URLs, repeated domains (when
+    `diff_domain_filter` is set) and domains with a poor fetch, token-yield or
+    validation history are ranked down. The search rank is the base score.
+    """
+    filters = filters or filter_dict
+    irrelevant_keywords = [keyword.lower() for keyword in filters.get("irrelevant_keywords", [])]
+    lang_indicators = [indicator.lower() for indicator in filters.get("lang_indicators", [])]
+    scored = []
+    domain_counts: Dict[str, int] = {}
+    for position, url in enumerate(urls):
+        try:
+            parts = urlsplit(url.lower() if "://" in url else f"https://{url.lower()}")
+        except ValueError:
+            logger.debug(f"Skipping unparseable URL: {url}")
+            continue
+        if any(_matches(parts, keyword) for keyword in irrelevant_keywords):
+            logger.debug(f"Skipping irrelevant URL: {url}")
+            continue
+        domain = get_domain(url)
+        quality = _quality_factor(quality_store, domain, min_samples, max_failure_rate)
+        if quality is None:
+            logger.info(f"Skipping URL from chronically failing domain {domain}: {url}")
+            continue
+        score = quality / (RANK_K + position)
+        if any(_matches(parts, indicator) for indicator in lang_indicators):
+            score *= LANG_PENALTY
+        if filters.get("diff_domain_filter"):
+            score *= SAME_DOMAIN_PENALTY ** domain_counts.get(domain, 0)
+            domain_counts[domain] = domain_counts.get(domain, 0) + 1
+        scored.append((score, position, url))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [url for _, _, url in scored]
@@ -0,0 +1,141 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .metrics import usage_tokens
+# USD per million (prompt, completion) tokens, matched by the longest model name prefix.
+DEFAULT_PRICING: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.0),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+_pricing: Dict[str, Tuple[float, float]] = dict(DEFAULT_PRICING)
+_ledgers_var: contextvars.ContextVar = contextvars.ContextVar("usage_ledgers", default=())
+_node_var: contextvars.ContextVar = contextvars.ContextVar("usage_node", default=None)
+_source_var: contextvars.ContextVar = contextvars.ContextVar("usage_source", default=None)
+_retry_var: contextvars.ContextVar = contextvars.ContextVar("usage_retry", default=False)
+def configure_pricing(overrides: Dict[str, Iterable[float]]) -> None:
+    """Adds or replaces model prices, in USD per million (prompt, completion) tokens."""
+    _pricing.update({model: tuple(prices) for model, prices in overrides.items()})
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    name = model.split("/")[-1]
+    matches = [prefix for prefix in _pricing if name.startswith(prefix)]
+    return _pricing[max(matches, key=len)] if matches else None
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price = model_price(model)
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+def _totals(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = {"calls": 0, "cached_calls": 0, "failed_calls": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost_usd": 0.0, "latency_s": 0.0}
+    for record in records:
+        totals["calls"] += 1
+        totals["cached_calls"] += int(record["cached"])
+        totals["failed_calls"] += int(record["error"])
+        totals["retries"] += int(record["retry"])
+        totals["prompt_tokens"] += record["prompt_tokens"]
+        totals["completion_tokens"] += record["completion_tokens"]
+        totals["total_tokens"] += record["prompt_tokens"] + record["completion_tokens"]
+        totals["cost_usd"] += record["cost_usd"]
+        totals["latency_s"] += record["latency_s"]
+    totals["cost_usd"] = round(totals["cost_usd"], 6)
+    totals["latency_s"] = round(totals["latency_s"], 3)
+    return totals
+class UsageLedger:
+    """
+    The LLM calls made in one scope (a request, a graph run or a node). Calls are
+    appended atomically and also counted by every enclosing ledger, so concurrent
+    nodes and sub-graphs never mix their numbers.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: List[Dict[str, Any]] = []
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(record)
+    def records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._records)
+    def totals(self) -> Dict[str, Any]:
+        return _totals(self.records())
+    def active_time(self) -> float:
+        """Seconds during which at least one call was running, from its dispatch; time spent queued for a slot is left out."""
+        active, end = 0.0, None
+        for started_at, finished_at in sorted((record["started_at"], record["finished_at"]) for record in self.records()):
+            if end is None or started_at > end:
+                active += finished_at - started_at
+                end = finished_at
+            elif finished_at > end:
+                active += finished_at - end
+                end = finished_at
+        return active
+    def summary(self) -> Dict[str, Any]:
+        """Totals, rolled up per model, per node and per source URL."""
+        records = self.records()
+        summary = _totals(records)
+        for group, field in (("by_model", "model"), ("by_node", "node"), ("by_source", "source")):
+            grouped: Dict[str, List[Dict[str, Any]]] = {}
+            for record in records:
+                if record[field] is not None:
+                    grouped.setdefault(record[field], []).append(record)
+            summary[group] = {key: _totals(items) for key, items in grouped.items()}
+        unpriced = sorted({record["model"] for record in records if model_price(record["model"]) is None})
+        if unpriced:
+            summary["unpriced_models"] = unpriced
+        return summary
+@contextmanager
+def usage_scope(node: Optional[str] = None, source: Optional[str] = None) -> Iterator[UsageLedger]:
+    """
+    Opens a ledger for the LLM calls made in this context (and in threads copying it).
+    `node` and `source` label the calls made inside, down to the innermost scope setting them.
+    """
+    ledger = UsageLedger()
+    tokens = [(_ledgers_var, _ledgers_var.set(_ledgers_var.get() + (ledger,)))]
+    if node is not None:
+        tokens.append((_node_var, _node_var.set(node)))
+    if source is not None:
+        tokens.append((_source_var, _source_var.set(source)))
+    try:
+        yield ledger
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+@contextmanager
+def llm_retry(active: bool = True) -> Iterator[None]:
+    """Marks the LLM calls made in this context as retries of a failed attempt."""
+    token = _retry_var.set(active or _retry_var.get())
+    try:
+        yield
+    finally:
+        _retry_var.reset(token)
+def record_llm_call(model: str, message: Any, latency: float, cached: bool = False, error: bool = False, dispatched_at: Optional[float] = None) -> None:
+    """
+    Records one LLM call, with the token usage of its response `message`, in the open ledgers.
+    `dispatched_at` is when the call left the scheduler queue; by default the whole `latency`.
+    """
+    ledgers = _ledgers_var.get()
+    if not ledgers:
+        return
+    finished_at = time.time()
+    prompt_tokens, completion_tokens = usage_tokens(message) or (0, 0)
+    record = {
+        "model": model,
+        "node": _node_var.get(),
+        "source": _source_var.get(),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": cost_usd(model, prompt_tokens, completion_tokens),
+        "latency_s": latency,
+        "started_at": dispatched_at if dispatched_at is not None else finished_at - latency,
+        "finished_at": finished_at,
+        "cached": cached,
+        "retry": _retry_var.get(),
+        "error": error,
+    }
+    for ledger in ledgers:
+        ledger.add(record)
@@ -0,0 +1 @@
+"""Offline load benchmark of the research pipeline: `python -m benchmarks --help`."""
@@ -0,0 +1,70 @@
+import argparse
+import json
+import logging
+import sys
+
+from benchmarks.harness import CORPUS_DIR, run_benchmark
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Load-test the research pipeline offline, against a local HTML corpus, a fake search backend and a fake LLM.",
+    )
+    parser.add_argument("--target", choices=["graph", "api"], default="graph", help="Drive the SearchGraph directly or the research endpoint of the FastAPI app.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=16, help="Requests sent per concurrency level.")
+    parser.add_argument("--mode", choices=["full", "fast", "decompose"], default="full")
+    parser.add_argument("--max-results", type=int, default=3, help="Search results fetched and extracted per request.")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Directory of saved HTML pages to serve.")
+    parser.add_argument("--page-delay", type=float, default=0.0, help="Seconds the corpus server waits before each page.")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fixed seconds per fake LLM call.")
+    parser.add_argument("--llm-input-tps", type=float, default=20000.0, help="Prompt tokens per second of the fake LLM.")
+    parser.add_argument("--llm-output-tps", type=float, default=200.0, help="Completion tokens per second of the fake LLM.")
+    parser.add_argument("--llm-completion-tokens", type=int, default=200, help="Length of the fake LLM's text answers, in tokens.")
+    parser.add_argument("--cassette", help="Replay this recorded cassette instead of the corpus and the fake LLM.")
+    parser.add_argument("--queries", help="File of the queries the cassette was recorded with, one per line.")
+    parser.add_argument("--no-replay-latency", action="store_true", help="Serve cassette responses immediately instead of with their recorded latencies.")
+    parser.add_argument("--output", default="benchmark-report.json", help="Report file; '-' writes it to stdout.")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level.upper())
+    queries = None
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    report = run_benchmark(
+        target=args.target,
+        concurrency_levels=[int(level) for level in args.concurrency.split(",")],
+        requests_per_level=args.requests,
+        mode=args.mode,
+        corpus_dir=args.corpus,
+        page_delay=args.page_delay,
+        llm_options={
+            "latency_s": args.llm_latency,
+            "input_tokens_per_s": args.llm_input_tps,
+            "output_tokens_per_s": args.llm_output_tps,
+            "completion_tokens": args.llm_completion_tokens,
+        },
+        max_results=args.max_results,
+        cassette_path=args.cassette,
+        queries=queries,
+        replay_latency=not args.no_replay_latency,
+    )
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    for level in report["levels"]:
+        print(
+            f"concurrency={level['concurrency']} rps={level['rps']} p50={level['latency_s']['p50']}s "
+            f"p95={level['latency_s']['p95']}s p99={level['latency_s']['p99']}s errors={level['errors']}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+# The fake LLM provider needs no API key, but the settings require one to be set.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.core.config import settings
+from app.core.dynamic_models import create_dynamic_model
+from app.core.llm import DEFAULT_SCHEMA_DEFINITION
+from app.core.research import run_research
+from app.core.scraper import run_search_graph
+from app.scrapegraph.utils import configure_pricing, llm_scheduler, node_timing, open_cassette, register_search_backend, usage_scope
+from app.scrapegraph.utils.search_backends import SearchBackend, SearchResult
+
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+# Schema generation answer of the fake model: no explicit structure, so the default schema is used.
+GENERAL_QUERY_SCHEMA = {"model_name": "GeneralQuery", "description": "General research query.", "fields": []}
+
+
+class _CorpusRequestHandler(SimpleHTTPRequestHandler):
+    page_delay = 0.0
+
+    def do_GET(self):
+        if self.page_delay:
+            time.sleep(self.page_delay)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CorpusServer:
+    """Serves the HTML files of `directory` on a free local port, each response delayed by `page_delay` seconds."""
+
+    def __init__(self, directory: str = CORPUS_DIR, page_delay: float = 0.0):
+        self.directory = directory
+        self.page_delay = page_delay
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "CorpusServer":
+        handler = type("CorpusRequestHandler", (_CorpusRequestHandler,), {"page_delay": self.page_delay})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=self.directory))
+        self._thread = threading.Thread(target=self._server.serve_forever, name="corpus-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def documents(self) -> List[Dict[str, str]]:
+        """URL, title and description of every page of the corpus."""
+        documents = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith((".html", ".htm")):
+                continue
+            with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+                soup = BeautifulSoup(f.read(), "html.parser")
+            description = soup.find("meta", attrs={"name": "description"})
+            documents.append({
+                "url": f"{self.base_url}/{filename}",
+                "title": soup.title.get_text(strip=True) if soup.title else filename,
+                "snippet": description.get("content", "") if description else "",
+            })
+        if not documents:
+            raise ValueError(f"No HTML files found in corpus directory '{self.directory}'.")
+        return documents
+
+
+class CorpusSearchBackend(SearchBackend):
+    """
+    Returns corpus pages for any query, starting at a page chosen by a hash of the query,
+    so the load spreads over the corpus whatever query the (fake) LLM rewrote.
+    """
+    name = "benchmark"
+
+    def __init__(self, documents: List[Dict[str, str]], **kwargs: Any):
+        self.documents = documents
+
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        start = zlib.crc32(query.encode("utf-8")) % len(self.documents)
+        rotated = self.documents[start:] + self.documents[:start]
+        return [
+            SearchResult(url=document["url"], title=document["title"], snippet=document["snippet"], engine=self.name, rank=rank)
+            for rank, document in enumerate(rotated[:max_results], start=1)
+        ]
+
+
+def configure_offline(documents: List[Dict[str, str]], llm_options: Dict[str, Any], max_results: int, workdir: str) -> None:
+    """
+    Points the pipeline at the corpus search backend and the fake LLM provider, and turns
+    off the persistent caches so every request does the full work.
+    """
+    register_search_backend(CorpusSearchBackend.name, lambda **options: CorpusSearchBackend(documents))
+    structured_responses = {"GeneratedSchema": GENERAL_QUERY_SCHEMA, **llm_options.get("structured_responses", {})}
+    settings.LLM_PROVIDER = "fake"
+    settings.LLM_PROVIDER_OPTIONS = {**llm_options, "structured_responses": structured_responses}
+    settings.SEARCH_ENGINES = CorpusSearchBackend.name
+    _disable_caches(max_results, workdir)
+
+
+def _disable_caches(max_results: int, workdir: str) -> None:
+    settings.SCRAPER_MAX_RESULTS = max_results
+    settings.SEARCH_CACHE_ENABLED = False
+    settings.DOMAIN_QUALITY_ENABLED = False
+    settings.SCHEMA_CACHE_ENABLED = False
+    # Read when app.core.jobs is first imported, which only the API target does, after this.
+    settings.JOBS_DB_PATH = os.path.join(workdir, "jobs.db")
+
+
+def benchmark_queries(documents: List[Dict[str, str]], count: int, offset: int = 0) -> List[str]:
+    """Distinct queries, so no request attaches to another one in flight."""
+    return [f"{documents[(offset + i) % len(documents)]['title']} (benchmark request {offset + i})" for i in range(count)]
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    # Nearest-rank percentile of an ascending list.
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def _level_report(concurrency: int, outcomes: List[Tuple[float, Optional[str]]], duration: float, nodes: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = sorted(latency for latency, _ in outcomes)
+    errors: Dict[str, int] = {}
+    for _, error in outcomes:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(outcomes),
+        "errors": sum(errors.values()),
+        "error_types": errors,
+        "duration_s": round(duration, 3),
+        "rps": round(len(outcomes) / duration, 3) if duration else 0.0,
+        "latency_s": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "peak_rss_mb": _peak_rss_mb(),
+        "nodes": nodes,
+        "usage": usage,
+    }
+
+
+def _run_graph_level(queries: List[str], concurrency: int, run: Callable[..., Any]) -> Dict[str, Any]:
+    def _run_one(query: str) -> Tuple[float, Optional[str]]:
+        start = time.perf_counter()
+        try:
+            run(query=query)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            logger.warning(f"Benchmark request '{query}' failed: {e}")
+            return time.perf_counter() - start, type(e).__name__
+
+    with node_timing() as session, usage_scope() as usage:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, _run_one, query) for query in queries]
+            outcomes = [future.result() for future in futures]
+        duration = time.perf_counter() - start
+    return _level_report(concurrency, outcomes, duration, session.node_report(), usage.totals())
+
+
+async def _run_api_level(client: Any, queries: List[str], concurrency: int, mode: str) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run_one(query: str) -> Tuple[float, Optional[str]]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{settings.API_V1_STR}/research/", params={"mode": mode}, json={"query": query})
+                return time.perf_counter() - start, None if response.status_code == 200 else f"HTTP {response.status_code}"
+            except Exception as e:
+                logger.warning(f"Benchmark request '{query}' failed: {e}")
+                return time.perf_counter() - start, type(e).__name__
+
+    with node_timing() as session, usage_scope() as usage:
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(_run_one(query) for query in queries))
+        duration = time.perf_counter() - start
+    return _level_report(concurrency, list(outcomes), duration, session.node_report(), usage.totals())
+
+
+async def _run_api(batches: List[List[str]], concurrency_levels: List[int], mode: str) -> List[Dict[str, Any]]:
+    import httpx
+    from app.main import app
+
+    levels = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for batch, concurrency in zip(batches, concurrency_levels):
+                levels.append(await _run_api_level(client, batch, concurrency, mode))
+    return levels
+
+
+def run_benchmark(
+    target: str = "graph",
+    concurrency_levels: Optional[List[int]] = None,
+    requests_per_level: int = 16,
+    mode: str = "full",
+    corpus_dir: str = CORPUS_DIR,
+    page_delay: float = 0.0,
+    llm_options: Optional[Dict[str, Any]] = None,
+    max_results: int = 3,
+    cassette_path: Optional[str] = None,
+    queries: Optional[List[str]] = None,
+    replay_latency: bool = True,
+) -> Dict[str, Any]:
+    """
+    Runs the research pipeline offline at each concurrency level: the SearchGraph called
+    directly (`target="graph"`) or the research endpoint of the FastAPI app
+    (`target="api"`). By default it uses the local corpus and the fake LLM. With
+    `cassette_path`, it replays a recorded cassette instead. The `queries` are then the
+    recorded ones, cycled through, and the graph target also generates each query's
+    schema, as the recorded requests did. Returns the report: latency percentiles,
+    throughput, errors, peak RSS, per-node wall and CPU time and LLM usage per level.
+    """
+    concurrency_levels = concurrency_levels or [1, 4, 16]
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir, ExitStack() as stack:
+        if cassette_path:
+            if not queries:
+                raise ValueError("Replaying a cassette needs the queries it was recorded with.")
+            stack.enter_context(open_cassette(cassette_path, "replay", replay_latency))
+            _disable_caches(max_results, workdir)
+            batches = [[queries[(index * requests_per_level + i) % len(queries)] for i in range(requests_per_level)] for index in range(len(concurrency_levels))]
+            run_one = partial(run_research, mode=mode)
+            source = {"cassette": cassette_path, "queries": len(queries), "replay_latency": replay_latency}
+        else:
+            server = stack.enter_context(CorpusServer(corpus_dir, page_delay))
+            documents = server.documents()
+            configure_offline(documents, llm_options or {}, max_results, workdir)
+            batches = [benchmark_queries(documents, requests_per_level, offset=index * requests_per_level) for index in range(len(concurrency_levels))]
+            run_one = partial(run_search_graph, dynamic_schema_model=create_dynamic_model(DEFAULT_SCHEMA_DEFINITION), mode=mode)
+            source = {"corpus": corpus_dir, "pages": len(documents), "page_delay_s": page_delay}
+        if target == "api":
+            levels = asyncio.run(_run_api(batches, concurrency_levels, mode))
+        else:
+            llm_scheduler.configure(settings.LLM_MAX_IN_FLIGHT_PER_MODEL)
+            configure_pricing(settings.LLM_PRICING)
+            levels = []
+            for batch, concurrency in zip(batches, concurrency_levels):
+                levels.append(_run_graph_level(batch, concurrency, run_one))
+                logger.info(f"Concurrency {concurrency}: {levels[-1]['rps']} requests/s, p95 {levels[-1]['latency_s']['p95']}s.")
+    return {
+        "target": target,
+        "mode": mode,
+        "created_at": time.time(),
+        "source": source,
+        "llm": {key: value for key, value in settings.LLM_PROVIDER_OPTIONS.items() if key != "structured_responses"},
+        "max_results": max_results,
+        "requests_per_level": requests_per_level,
+        "levels": levels,
+        "peak_rss_mb": _peak_rss_mb(),
+    }